@@ -0,0 +1,250 @@
+"""The dashboard sections as computed before the single-pass aggregator.
+
+Each section filtered, grouped and scanned the bookings on its own.
+`scripts/benchmark_dashboard.py` times these scans against `src.aggregate` to
+measure what the single pass saves. This is a frozen copy kept only as that
+reference; the dashboard is built by `src.aggregate`.
+"""
+
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta
+from statistics import mean
+from typing import Any
+
+from src.bookings.models import Booking
+from src.occupancy import DAY, LONDON, daily_seconds, wall_seconds
+from src.rolling import rolling_means
+
+WINDOWS = (7, 14, 30, 90)
+
+
+def tax_year_start(today: date | None = None) -> date:
+    today = today or datetime.now(LONDON).date()
+    return date(today.year if today >= date(today.year, 4, 6) else today.year - 1, 4, 6)
+
+
+def booking_row(booking: Booking) -> dict[str, Any]:
+    driver = booking.driver.data
+    vehicle = booking.vehicle.data
+    return {
+        "id": booking.id,
+        "start": booking.start_date.isoformat(),
+        "end": booking.end_date.isoformat(),
+        "status": booking.status,
+        "title": booking.title,
+        "bookingType": booking.booking_type,
+        "driverId": driver.id,
+        "driverName": driver.name,
+        "driverEmail": driver.email,
+        "driverPhone": driver.phone_number,
+        "vehicleId": vehicle.id,
+        "registration": vehicle.registration,
+        "vehicle": " ".join(part for part in (vehicle.make, vehicle.model) if part),
+        "vehicleColour": vehicle.colour,
+        "earnings": booking.space_owner_earnings.data.value,
+        "paid": booking.driver_price.data.value,
+    }
+
+
+def earnings(bookings: list[Booking], today: date) -> dict[str, Any]:
+    start = tax_year_start(today)
+    periods: dict[str, dict[date, float]] = {
+        name: defaultdict(float) for name in _period_keys(today)
+    }
+
+    for booking in bookings:
+        day = booking.start_date.astimezone(LONDON).date()
+        amount = booking.space_owner_earnings.data.value
+        for name, key in _period_keys(day).items():
+            periods[name][key] += amount
+
+    return {
+        "total": round(
+            sum(booking.space_owner_earnings.data.value for booking in bookings), 2
+        ),
+        "taxYear": round(
+            sum(
+                booking.space_owner_earnings.data.value
+                for booking in bookings
+                if booking.start_date.astimezone(LONDON).date() >= start
+            ),
+            2,
+        ),
+        "bookings": len(bookings),
+        "periods": {
+            name: [
+                {"date": day.isoformat(), "value": round(value, 2)}
+                for day, value in sorted(values.items())
+            ]
+            for name, values in periods.items()
+        },
+    }
+
+
+def _period_keys(day: date) -> dict[str, date]:
+    return {
+        "day": day,
+        "week": day - timedelta(days=day.weekday()),
+        "month": day.replace(day=1),
+        "quarter": day.replace(month=((day.month - 1) // 3) * 3 + 1, day=1),
+        "year": day.replace(month=1, day=1),
+    }
+
+
+def occupancy(
+    bookings: list[Booking], windows: Sequence[int] = WINDOWS
+) -> dict[str, Any]:
+    if not bookings:
+        return {"windows": list(windows), "minutes": [], "days": []}
+
+    first, seconds = daily_seconds(
+        (wall_seconds(booking.start_date), wall_seconds(booking.end_date))
+        for booking in bookings
+    )
+    dates = [first + timedelta(days=offset) for offset in range(len(seconds))]
+    return {
+        "windows": list(windows),
+        "minutes": _rolling_rows(dates, seconds, windows, scale=DAY),
+        "days": _rolling_rows(dates, [int(value > 0) for value in seconds], windows),
+    }
+
+
+def _rolling_rows(
+    dates: list[date],
+    values: list[int],
+    windows: Sequence[int] = WINDOWS,
+    scale: int = 1,
+) -> list[dict[str, Any]]:
+    means = {
+        str(window): series
+        for window, series in rolling_means(values, windows, scale).items()
+    }
+    return [
+        {
+            "date": day.isoformat(),
+            **{
+                window: None if series[index] is None else round(series[index], 6)
+                for window, series in means.items()
+            },
+        }
+        for index, day in enumerate(dates)
+    ]
+
+
+def drivers(bookings: list[Booking]) -> list[dict[str, Any]]:
+    grouped: dict[int, list[Booking]] = defaultdict(list)
+    for booking in bookings:
+        grouped[booking.driver_id].append(booking)
+
+    rows = []
+    for driver_id, all_bookings in grouped.items():
+        active = [booking for booking in all_bookings if booking.status != "cancelled"]
+        driver = all_bookings[-1].driver.data
+        durations = [_hours(booking) for booking in active]
+        rows.append(
+            {
+                "id": driver_id,
+                "name": driver.name,
+                "email": driver.email,
+                "phone": driver.phone_number,
+                "company": driver.company_name,
+                "profilePhoto": driver.profile_photo,
+                "registeredAt": driver.registration_date.isoformat(),
+                "bookings": len(active),
+                "cancelled": len(all_bookings) - len(active),
+                "earnings": round(
+                    sum(booking.space_owner_earnings.data.value for booking in active),
+                    2,
+                ),
+                "paid": round(
+                    sum(booking.driver_price.data.value for booking in active), 2
+                ),
+                "averageHours": round(mean(durations), 1) if durations else 0,
+                "longestHours": round(max(durations), 1) if durations else 0,
+                "firstBooking": min(
+                    (booking.start_date for booking in active), default=None
+                ),
+                "lastBooking": max(
+                    (booking.start_date for booking in active), default=None
+                ),
+                "vehicles": sorted(
+                    {booking.vehicle.data.registration for booking in all_bookings}
+                ),
+            }
+        )
+    for row in rows:
+        for key in ("firstBooking", "lastBooking"):
+            row[key] = row[key].isoformat() if row[key] else None
+    return sorted(rows, key=lambda row: (-row["earnings"], row["name"]))
+
+
+def driver_highlights(bookings: list[Booking], today: date) -> dict[str, Any]:
+    if not bookings:
+        return {}
+    grouped: dict[int, list[Booking]] = defaultdict(list)
+    for booking in bookings:
+        grouped[booking.driver_id].append(booking)
+
+    earnings = {
+        driver_id: sum(booking.space_owner_earnings.data.value for booking in items)
+        for driver_id, items in grouped.items()
+    }
+    total = sum(earnings.values())
+    repeat = {driver_id for driver_id, items in grouped.items() if len(items) >= 2}
+    longest = max(bookings, key=_hours)
+    weekdays = Counter(
+        booking.start_date.astimezone(LONDON).strftime("%A") for booking in bookings
+    )
+    hours = Counter(booking.start_date.astimezone(LONDON).hour for booking in bookings)
+    first_bookings = {
+        driver_id: min(
+            booking.start_date.astimezone(LONDON).date() for booking in items
+        )
+        for driver_id, items in grouped.items()
+    }
+
+    return {
+        "repeatRate": len(repeat) / len(grouped),
+        "returningRevenueShare": sum(earnings[driver_id] for driver_id in repeat)
+        / total
+        if total
+        else 0,
+        "topThreeRevenueShare": sum(sorted(earnings.values(), reverse=True)[:3]) / total
+        if total
+        else 0,
+        "newThisTaxYear": sum(
+            first >= tax_year_start(today) for first in first_bookings.values()
+        ),
+        "busiestWeekday": weekdays.most_common(1)[0][0],
+        "busiestHour": f"{hours.most_common(1)[0][0]:02d}:00",
+        "longestStay": {
+            "driver": longest.driver.data.name,
+            "hours": round(_hours(longest), 1),
+            "date": longest.start_date.date().isoformat(),
+        },
+    }
+
+
+def vehicles(bookings: list[Booking]) -> list[dict[str, Any]]:
+    vehicles = {booking.vehicle_id: booking.vehicle.data for booking in bookings}
+    return [
+        {
+            "id": vehicle.id,
+            "registration": vehicle.registration,
+            "make": vehicle.make,
+            "model": vehicle.model,
+            "colour": vehicle.colour,
+            "primary": vehicle.is_primary,
+            "autoPay": vehicle.auto_pay,
+        }
+        for vehicle in sorted(
+            vehicles.values(), key=lambda vehicle: vehicle.registration
+        )
+    ]
+
+
+def _hours(booking: Booking) -> float:
+    return (booking.end_date - booking.start_date).total_seconds() / 3600
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Time dashboard decoding and aggregation on synthetic bookings.
+
+Compares full and fast decoding, one aggregation pass with the separate
+per-section scans it replaced, and the size and parse time of dashboard
+schema versions 2 and 3. The separate scans are the pre-aggregator code kept
+in `benchmarks/reference_dashboard.py`.
+
+Run with `PYTHONPATH=. uv run scripts/benchmark_dashboard.py --bookings 100000`.
+"""
+
+import argparse
+import gzip
+import json
+import time
+from datetime import datetime
+
+from benchmarks import reference_dashboard as reference
+from src import columnar
+from src.aggregate import Aggregator
+from src.bookings.decode import decode
+from src.bookings.models import BookingResponse
+from src.dashboard import LONDON, _document
+from tests.sample_data import synthetic
+
+
+def separate_scans(data: BookingResponse, now: datetime) -> None:
+    active = [booking for booking in data.items if booking.status != "cancelled"]
+    [
+        reference.booking_row(booking)
+        for booking in sorted(data.items, key=lambda b: b.start_date)
+    ]
+    reference.earnings(active, now.date())
+    reference.occupancy(active)
+    reference.drivers(data.items)
+    reference.driver_highlights(active, now.date())
+    reference.vehicles(data.items)
+
+
+def single_pass(data: BookingResponse, now: datetime) -> None:
+    Aggregator(now.date()).extend(data.items).result()
+
+
+def best_of(repeat: int, run, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--drivers", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = json.dumps(synthetic(args.bookings, args.drivers)).encode()
+    full = best_of(args.repeat, decode, raw, "full")
+    fast = best_of(args.repeat, decode, raw, "fast")
+    data = BookingResponse.model_validate_json(raw)
+    now = datetime.now(LONDON)
+    separate = best_of(args.repeat, separate_scans, data, now)
+    single = best_of(args.repeat, single_pass, data, now)
+    print(f"{args.bookings} bookings ({len(raw) / 1e6:.1f} MB), best of {args.repeat}")
+    print(f"  full decode     {full:8.3f}s")
+    print(f"  fast decode     {fast:8.3f}s  ({full / fast:.1f}x)")
+    print(f"  separate scans  {separate:8.3f}s")
+    print(f"  single pass     {single:8.3f}s  ({separate / single:.1f}x)")
+
+    dashboard = _document(now, now, Aggregator(now.date()).extend(data.items).result())
+    for version, document in ((2, dashboard), (3, columnar.encode(dashboard))):
+        encoded = json.dumps(document, indent=2, ensure_ascii=False).encode()
+        parse = best_of(args.repeat, json.loads, encoded)
+        print(
+            f"  schema {version}  {len(encoded) / 1e6:6.1f} MB"
+            f"  {len(gzip.compress(encoded)) / 1e6:6.2f} MB gzip"
+            f"  parse {parse:6.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
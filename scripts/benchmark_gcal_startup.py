@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = [
+#     "boto3",
+#     "cryptography",
+#     "google-api-python-client",
+#     "google-auth-httplib2",
+#     "httplib2",
+#     "pydantic",
+# ]
+# ///
+"""Time setting up Calendar clients in gcal.py, per call against cached.
+
+Before the client was cached, every listing page and every write batch parsed
+the service account key and built a new client, and each new client fetched
+its own access token on first use. This times that against `gcal.get_client`
+and `gcal.batch_post`, which are set up once per process. Token requests need
+the network, so they are counted rather than timed.
+
+Run with `PYTHONPATH=. uv run scripts/benchmark_gcal_startup.py`.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import time
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+
+def service_account_json() -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return json.dumps(
+        {
+            "type": "service_account",
+            "client_email": "benchmark@example.iam.gserviceaccount.com",
+            "private_key": pem.decode(),
+            "token_uri": "https://oauth2.googleapis.com/token",
+        }
+    )
+
+
+def load_gcal():
+    for name in ("CALENDAR_ID", "JP_S3_BUCKET", "JP_S3_KEY"):
+        os.environ.setdefault(name, "benchmark")
+    spec = importlib.util.spec_from_file_location(
+        "gcal", Path(__file__).with_name("gcal.py")
+    )
+    assert spec and spec.loader
+    gcal = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gcal)
+    return gcal
+
+
+def per_call_client() -> None:
+    """The setup gcal.get_client did on every call."""
+    info = json.loads(os.environ["GOOGLE_SERVICE_ACCOUNT_JSON"])
+    credentials = service_account.Credentials.from_service_account_info(
+        info, scopes=["https://www.googleapis.com/auth/calendar"]
+    )
+    build("calendar", "v3", credentials=credentials)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--calls",
+        type=int,
+        default=5,
+        help="Client uses per run: listing pages plus write batches",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["GOOGLE_SERVICE_ACCOUNT_JSON"] = service_account_json()
+    started = time.perf_counter()
+    gcal = load_gcal()
+    imported = time.perf_counter() - started
+
+    before, after = [], []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        for _ in range(args.calls):
+            per_call_client()
+        before.append(time.perf_counter() - started)
+
+        gcal.get_credentials.cache_clear()
+        gcal.get_client.cache_clear()
+        gcal.batch_post.cache_clear()
+        started = time.perf_counter()
+        for _ in range(args.calls):
+            gcal.get_client()
+            gcal.batch_post()
+        after.append(time.perf_counter() - started)
+
+    print(f"Importing gcal.py          {imported * 1000:8.1f} ms")
+    print(f"Client per call, {args.calls} calls   {min(before) * 1000:8.1f} ms")
+    print(f"Cached client, {args.calls} calls     {min(after) * 1000:8.1f} ms")
+    print(f"Token requests             {args.calls:8d} → 1")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Time decoding, the booking table, each section, serialisation and calendar diffing.
+
+Runs on synthetic exports of each size given, writes the timings as JSON and
+compares them with a stored baseline, exiting non-zero when any step has
+slowed down by more than the tolerance.
+
+Run with `PYTHONPATH=. uv run scripts/benchmark_suite.py --sizes 10000 100000`
+and record a baseline on the same machine with `--save-baseline`.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from src import columnar
+from src.aggregate import (
+    Aggregator,
+    driver_highlights,
+    drivers,
+    earnings,
+    occupancy,
+    vehicles,
+)
+from src.bookings.decode import decode
+from src.bookings.models import BookingResponse
+from src.bookings.table import BookingTable
+from src.calendar_sync import booking_to_event, reconcile
+from src.dashboard import LONDON, _booking_row, _document
+from tests.sample_data import synthetic
+
+BASELINE = Path("benchmarks/baseline.json")
+# Steps faster than this are too noisy to flag
+NOISE_FLOOR = 0.005
+
+
+def scenario(bookings: int) -> dict[str, Any]:
+    """Generator settings for an export of `bookings`, roughly like ours."""
+    return {
+        "bookings": bookings,
+        "drivers": max(4, bookings // 50),
+        "density": 1.0,
+        "cancelled": 0.05,
+        "multi_day": 0.02,
+        "dst": 0.01,
+    }
+
+
+def best_of(repeat: int, run: Callable[..., Any], *args: Any) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def calendar_events(data: BookingResponse) -> list[dict[str, Any]]:
+    """Events as the calendar would hold them, one in ten of them stale."""
+    events = []
+    for number, booking in enumerate(data.items):
+        event = {"id": f"event{booking.id}", **booking_to_event(booking)}
+        if number % 10 == 0:
+            event["summary"] = "Stale"
+            event["extendedProperties"] = {
+                "private": {"booking_id": str(booking.id), "data_hash": "stale"}
+            }
+        events.append(event)
+    return events
+
+
+def time_steps(settings: dict[str, Any], repeat: int) -> dict[str, float]:
+    generator = {key: value for key, value in settings.items() if key != "bookings"}
+    raw = json.dumps(synthetic(settings["bookings"], zone=LONDON, **generator))
+    data = BookingResponse.model_validate_json(raw)
+    now = datetime.now(LONDON)
+    today = now.date()
+    # Sections are timed on one table, as the build shares it between them
+    table = BookingTable.from_bookings(data.items)
+    active = table.take(~table.is_status("cancelled"))
+    dashboard = _document(now, now, Aggregator(today).extend(data.items).result())
+    events = calendar_events(data)
+    steps: dict[str, tuple[Callable[..., Any], tuple[Any, ...]]] = {
+        "decode.full": (decode, (raw, "full")),
+        "decode.fast": (decode, (raw, "fast")),
+        "section.bookings": (
+            lambda: [
+                _booking_row(booking)
+                for booking in sorted(data.items, key=lambda b: b.start_date)
+            ],
+            (),
+        ),
+        "table.build": (BookingTable.from_bookings, (data.items,)),
+        "section.earnings": (earnings, (active, today)),
+        "section.occupancy": (occupancy, (active,)),
+        "section.drivers": (drivers, (table,)),
+        "section.driverHighlights": (driver_highlights, (active, today)),
+        "section.vehicles": (vehicles, (table,)),
+        "aggregate.singlePass": (
+            lambda: Aggregator(today).extend(data.items).result(),
+            (),
+        ),
+        "serialise.schema2": (json.dumps, (dashboard,)),
+        "serialise.schema3": (lambda: json.dumps(columnar.encode(dashboard)), ()),
+        "calendar.diff": (reconcile, (data.items, events)),
+    }
+    return {name: best_of(repeat, run, *args) for name, (run, args) in steps.items()}
+
+
+def regressions(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Steps slower than their baseline by more than `tolerance`, described."""
+    before = {run["name"]: run["timings"] for run in baseline["runs"]}
+    found = []
+    for run in results["runs"]:
+        for step, seconds in run["timings"].items():
+            previous = before.get(run["name"], {}).get(step)
+            if (
+                previous
+                and seconds > previous * (1 + tolerance)
+                and seconds - previous > NOISE_FLOOR
+            ):
+                found.append(
+                    f"{run['name']} {step}: {previous:.3f}s → {seconds:.3f}s "
+                    f"(+{seconds / previous - 1:.0%})"
+                )
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000], metavar="BOOKINGS"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("benchmarks/results.json"),
+        help="Where to write the timings",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Slowdown against the baseline to flag, as a fraction",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Also write the timings as the new baseline",
+    )
+    args = parser.parse_args()
+
+    runs = []
+    for size in args.sizes:
+        settings = scenario(size)
+        timings = time_steps(settings, args.repeat)
+        runs.append({"name": str(size), "settings": settings, "timings": timings})
+        print(f"{size} bookings, best of {args.repeat}")
+        for step, seconds in timings.items():
+            print(f"  {step:26} {seconds:8.3f}s")
+    results = {
+        "generatedAt": datetime.now(LONDON).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "runs": runs,
+    }
+    for path in (args.output, *([args.baseline] if args.save_baseline else [])):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Wrote {args.output}")
+
+    if args.save_baseline or not args.baseline.exists():
+        return
+    found = regressions(results, json.loads(args.baseline.read_text()), args.tolerance)
+    for regression in found:
+        print(f"Regression: {regression}")
+    if found:
+        sys.exit(1)
+    print(f"No step slower than {args.baseline} by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
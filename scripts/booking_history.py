@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+
+import boto3
+
+from src.bookings.archive import S3Store, SnapshotArchive, decompress, dumps
+from src.dashboard import LONDON, build_dashboard
+from src.history import BookingHistory
+
+
+def sync(history: BookingHistory, bucket: str, prefix: str) -> int:
+    """Add legacy `bookings_*.json` objects, then the snapshot archive."""
+    s3 = boto3.client("s3")
+    added = 0
+    keys = sorted(
+        item["Key"]
+        for page in s3.get_paginator("list_objects_v2").paginate(
+            Bucket=bucket, Prefix="bookings_"
+        )
+        for item in page.get("Contents", [])
+        if item["Key"].endswith(".json")
+    )
+    for key in keys:
+        if key not in history.sources:
+            body = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+            added += history.add(key, json.loads(decompress(body)))
+
+    archive = SnapshotArchive(S3Store(s3, bucket, prefix))
+    for entry in archive.entries():
+        source = f"{prefix}{entry.hash}@{entry.fields['fetchedAt']}"
+        if source not in history.sources:
+            added += history.add(
+                source, {**entry.fields, "items": archive.items(entry.hash)}
+            )
+    return added
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Query the local history of archived bookings snapshots"
+    )
+    parser.add_argument("history", type=Path, help="Local directory of the history")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync_parser = commands.add_parser("sync", help="Add new snapshots from S3")
+    sync_parser.add_argument("bucket")
+    sync_parser.add_argument("--prefix", default="snapshots/")
+
+    booking_parser = commands.add_parser("booking", help="Print a booking's changes")
+    booking_parser.add_argument("id", type=int)
+
+    dashboard_parser = commands.add_parser(
+        "dashboard", help="Build the dashboard as it was at a past time"
+    )
+    dashboard_parser.add_argument("destination", type=Path)
+    dashboard_parser.add_argument(
+        "--at", type=datetime.fromisoformat, help="ISO timestamp with offset"
+    )
+    args = parser.parse_args()
+
+    history = BookingHistory(args.history)
+    if args.command == "sync":
+        added = sync(history, args.bucket, args.prefix)
+        history.save()
+        print(f"Added {added} snapshots; {len(history.snapshots)} in total")
+    elif args.command == "booking":
+        for version in history.lifecycle(args.id):
+            booking = version.booking
+            change = "removed" if booking is None else booking.status
+            print(f"{version.fetched_at.isoformat()}  {change}")
+    else:
+        now = args.at.astimezone(LONDON) if args.at else None
+        dashboard = build_dashboard(dumps(history.export(args.at)), now=now)
+        args.destination.write_text(json.dumps(dashboard, indent=2, ensure_ascii=False))
+        print(
+            f"Prepared {dashboard['summary']['bookings']} bookings → {args.destination}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,31 @@
 # dependencies = [
 #     "playwright",
 #     "boto3",
+#     "httpx",
 # ]
 # ///
 
 import asyncio
 import json
 import os
-import re
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import boto3
-from playwright.async_api import async_playwright
+import httpx
+
+from src.bookings.archive import S3Store, SnapshotArchive, compress, decompress, dumps
+from src.bookings.fetch import (
+    Page,
+    UnsortedPages,
+    fetch_changes,
+    fetch_pages,
+    merge,
+    page_getter,
+    parse_page,
+    session_cookies,
+)
 
 BASE = "https://www.justpark.com"
 API = f"{BASE}/api/v5/bookings/received"
@@ -26,41 +38,79 @@ JP_API_KEY = os.getenv("JP_API_KEY")
 
 PER_PAGE = int(os.getenv("JP_PER_PAGE", "150"))
 MAX_PAGES = int(os.getenv("JP_MAX_PAGES", "100"))
+# Page requests in flight at once after the first page
+CONCURRENCY = int(os.getenv("JP_CONCURRENCY", "4"))
+# "http" calls the API with the session cookies; "browser" goes through headless Chromium
+FETCH_MODE = os.getenv("JP_FETCH_MODE", "http")
 INCLUDE = os.getenv("JP_INCLUDE", "driver_price,vehicle,driver,space_owner_earnings")
+# Optional sort parameter; incremental syncs need pages newest first
+SORT = os.getenv("JP_SORT", "")
+# "full" crawls every page. "incremental" is opt-in until the API's order is verified: it stops at the first
+# page with nothing new since the previous snapshot in S3, and still crawls fully when page 1 does not hold
+# the newest bookings or JP_FULL_REFRESH_HOURS have passed since the last full crawl
+SYNC = os.getenv("JP_SYNC", "full")
+ARCHIVE_PREFIX = os.getenv("JP_ARCHIVE_PREFIX", "snapshots/")
+FULL_REFRESH = timedelta(hours=float(os.getenv("JP_FULL_REFRESH_HOURS", "24")))
 
 
-def write_s3_data(data):
+def read_s3_data():
     s3 = boto3.client("s3")
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    s3.put_object(Bucket=os.getenv("JP_S3_BUCKET"), Key=os.getenv("JP_S3_KEY", "bookings.json"), Body=data)
-    s3.put_object(Bucket=os.getenv("JP_S3_BUCKET"), Key=f"bookings_{timestamp}.json", Body=data)
+    try:
+        obj = s3.get_object(Bucket=os.getenv("JP_S3_BUCKET"), Key=os.getenv("JP_S3_KEY", "bookings.json"))
+    except s3.exceptions.NoSuchKey:
+        return None
+    return json.loads(decompress(obj["Body"].read()))
 
 
-async def main():
-    if not STATE_PATH.exists():
-        print(f"ERROR: session state not found at {STATE_PATH}", file=sys.stderr)
-        sys.exit(2)
-    if not JP_API_KEY:
-        print("ERROR: set JP_API_KEY (value from request header)", file=sys.stderr)
-        sys.exit(2)
+def write_s3_data(payload):
+    # The latest snapshot, compressed, plus a content-addressed history entry
+    s3 = boto3.client("s3")
+    bucket = os.getenv("JP_S3_BUCKET")
+    s3.put_object(
+        Bucket=bucket,
+        Key=os.getenv("JP_S3_KEY", "bookings.json"),
+        Body=compress(dumps(payload)),
+        ContentType="application/json",
+    )
+    entry = SnapshotArchive(S3Store(s3, bucket, ARCHIVE_PREFIX)).put(payload)
+    print(f"Archived snapshot {entry.hash[:12]} under {ARCHIVE_PREFIX}")
+
+
+def request_headers():
+    return {
+        "accept": "application/json, text/plain, */*",
+        "jp-api-key": JP_API_KEY,
+        "x-jp-device": "",
+        "x-jp-partner": "",
+    }
+
+
+def query_params():
+    return {"include": INCLUDE, **({"sort": SORT} if SORT else {})}
+
+
+async def fetch_http(crawl):
+    # Reuse the browser login's cookies from a pooled client; no browser needed.
+    cookies = httpx.Cookies()
+    for cookie in session_cookies(STATE_PATH):
+        cookies.set(*cookie)
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(cookies=cookies, headers=request_headers(), limits=limits, timeout=30) as client:
+        return await crawl(page_getter(client, API, PER_PAGE, query_params()))
+
+
+async def fetch_browser(crawl):
+    from playwright.async_api import async_playwright
 
     async with async_playwright() as p:
         # Create a context that loads the saved cookies/localStorage
         browser = await p.chromium.launch(headless=True)
         ctx = await browser.new_context(storage_state=str(STATE_PATH))
+        headers = request_headers()
 
-        all_items = []
-        page_no = 1
-        headers = {
-            "accept": "application/json, text/plain, */*",
-            "jp-api-key": JP_API_KEY,
-            "x-jp-device": "",
-            "x-jp-partner": "",
-        }
-
-        while page_no <= MAX_PAGES:
+        async def get_page(page_no: int) -> Page:
             params = {
-                "include": INCLUDE,
+                **query_params(),
                 "page": str(page_no),
                 "per_page": str(PER_PAGE),
             }
@@ -68,40 +118,52 @@ async def main():
             if not resp.ok:
                 body = await resp.text()
                 raise RuntimeError(f"HTTP {resp.status} on page {page_no}: {body[:300]}")
+            return parse_page(await resp.json(), PER_PAGE, resp.headers.get("link", ""))
 
-            data = await resp.json()
-            # common shapes
-            if isinstance(data, list):
-                items = data
-            elif isinstance(data, dict):
-                for k in ("data", "results", "bookings", "items"):
-                    if isinstance(data.get(k), list):
-                        items = data[k]
-                        break
-                else:
-                    items = []
-            else:
-                items = []
-
-            all_items.extend(items)
-
-            link = resp.headers.get("link", "")
-            has_next = bool(re.search(r'rel="?next"?', link, re.I)) or (len(items) == PER_PAGE)
-            if not has_next:
-                break
-
-            page_no += 1
-            await asyncio.sleep(0.25)
-
-        payload = {
-            "fetchedAt": datetime.utcnow().isoformat() + "Z",
-            "total": len(all_items),
-            "items": all_items,
-        }
-        data = json.dumps(payload, indent=2)
-        write_s3_data(data)
-
+        all_items = await crawl(get_page)
         await browser.close()
+        return all_items
+
+
+async def main():
+    if not STATE_PATH.exists():
+        print(f"ERROR: session state not found at {STATE_PATH}", file=sys.stderr)
+        sys.exit(2)
+    if not JP_API_KEY:
+        print("ERROR: set JP_API_KEY (value from request header)", file=sys.stderr)
+        sys.exit(2)
+    if SYNC not in ("incremental", "full"):
+        print(f"ERROR: JP_SYNC must be incremental or full, not {SYNC!r}", file=sys.stderr)
+        sys.exit(2)
+    if FETCH_MODE not in ("http", "browser"):
+        print(f"ERROR: JP_FETCH_MODE must be http or browser, not {FETCH_MODE!r}", file=sys.stderr)
+        sys.exit(2)
+
+    fetch = fetch_http if FETCH_MODE == "http" else fetch_browser
+    now = datetime.utcnow()
+    previous = None if SYNC == "full" else read_s3_data()
+    full_fetched_at = previous and previous.get("fullFetchedAt")
+    if not full_fetched_at or now - datetime.fromisoformat(full_fetched_at.rstrip("Z")) > FULL_REFRESH:
+        all_items = await fetch(lambda get_page: fetch_pages(get_page, MAX_PAGES, CONCURRENCY))
+        full_fetched_at = now.isoformat() + "Z"
+    else:
+        try:
+            changes = await fetch(lambda get_page: fetch_changes(get_page, previous["items"], MAX_PAGES))
+        except UnsortedPages as error:
+            print(f"Pages are not newest first ({error}); crawling every page", file=sys.stderr)
+            all_items = await fetch(lambda get_page: fetch_pages(get_page, MAX_PAGES, CONCURRENCY))
+            full_fetched_at = now.isoformat() + "Z"
+        else:
+            all_items = merge(changes, previous["items"])
+            print(f"Fetched {len(changes)} recent bookings since {previous['fetchedAt']}")
+
+    payload = {
+        "fetchedAt": now.isoformat() + "Z",
+        "fullFetchedAt": full_fetched_at,
+        "total": len(all_items),
+        "items": all_items,
+    }
+    write_s3_data(payload)
 
 
 if __name__ == "__main__":
@@ -4,45 +4,72 @@
 #     "boto3",
 #     "google-api-python-client",
 #     "google-api-python-client-stubs",
+#     "google-auth-httplib2",
+#     "httplib2",
 #     "pydantic",
 #     "types-boto3[s3]",
 # ]
 # ///
 
 import datetime
-import hashlib
 import json
 import logging
 import os
+import queue
+import sys
+from functools import cache, partial
 from typing import TYPE_CHECKING, cast
 
 import boto3
+import google.auth.exceptions
+import httplib2
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
 from zoneinfo import ZoneInfo
 
-from src.bookings.models import Booking, BookingResponse
+from src import batch
+from src.bookings.archive import decompress
+from src.bookings.decode import DecodeMode, decode
+from src.bookings.models import BookingResponse
+from src.calendar_sync import TZ, EventIndex, Plan, SyncTokenExpired, booking_to_event, reconcile
 
 if TYPE_CHECKING:
-    from googleapiclient._apis.calendar.v3 import CalendarResource, Event, EventDateTime
+    from googleapiclient._apis.calendar.v3 import CalendarResource, Event
 
 logger = logging.getLogger(__name__)
 
-TZ = "Europe/London"
 CALENDAR_ID = os.environ["CALENDAR_ID"]
 S3_BUCKET = os.environ["JP_S3_BUCKET"]
 S3_KEY = os.environ["JP_S3_KEY"]
-
-
-def get_data() -> BookingResponse:
+# Mirror of the calendar's events, kept in the bookings bucket between runs
+INDEX_KEY = os.getenv("JP_CALENDAR_INDEX_KEY", "calendar/events.json")
+# Seconds before a Calendar API request times out
+HTTP_TIMEOUT = 60
+# What a batch POST raises when it never got an answer, including a failed token refresh; batch.execute retries them
+TRANSPORT_ERRORS = (
+    OSError,
+    httplib2.HttpLib2Error,
+    google.auth.exceptions.TransportError,
+    google.auth.exceptions.RefreshError,
+)
+# "fast" skips fields the calendar never shows; booking_hash covers only shown
+# fields, so both modes give the same hashes.
+DECODE_MODE = cast("DecodeMode", os.getenv("JP_DECODE", "full"))
+
+
+def get_data(mode: DecodeMode = DECODE_MODE) -> BookingResponse:
     if not S3_BUCKET or not S3_KEY:
         raise ValueError("S3_BUCKET and S3_KEY environment variables must be set")
     s3 = boto3.client("s3")
     obj = s3.get_object(Bucket=S3_BUCKET, Key=S3_KEY)
-    return BookingResponse.model_validate_json(obj["Body"].read())
+    return cast("BookingResponse", decode(decompress(obj["Body"].read()), mode))
 
 
-def get_client() -> "CalendarResource":
+@cache
+def get_credentials() -> service_account.Credentials:
     service_account_info = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON")
     if not service_account_info:
         raise ValueError("GOOGLE_SERVICE_ACCOUNT_JSON environment variable is not set")
@@ -52,146 +79,107 @@ def get_client() -> "CalendarResource":
     except json.JSONDecodeError:
         raise ValueError("Invalid JSON in GOOGLE_SERVICE_ACCOUNT_JSON environment variable")
 
-    creds = service_account.Credentials.from_service_account_info(
+    return service_account.Credentials.from_service_account_info(
         service_account_data, scopes=["https://www.googleapis.com/auth/calendar"]
     )
-    service = build("calendar", "v3", credentials=creds)
-    return cast("CalendarResource", service)
 
 
-def booking_to_html(booking: Booking, s3_url: str | None = None) -> str:
-    vehicle = booking.vehicle.data
-    driver = booking.driver.data
-    parts = [
-        f"<p><strong>Booking ID:</strong> {booking.id}</p>",
-        f"<p><strong>Driver:</strong> {driver.name}</p>",
-        f"<p><strong>Email:</strong> {driver.email}</p>",
-        f"<p><strong>Phone:</strong> {driver.phone_number or 'N/A'}</p>",
-        f"<p><strong>Vehicle:</strong> {vehicle.registration or 'N/A'} - {vehicle.make or 'N/A'} {vehicle.model or ''} ({vehicle.colour or 'N/A'})</p>",
-        f"<p><strong>Start:</strong> {booking.start_date.astimezone(ZoneInfo(TZ)).strftime('%Y-%m-%d %H:%M')}</p>",
-        f"<p><strong>End:</strong> {booking.end_date.astimezone(ZoneInfo(TZ)).strftime('%Y-%m-%d %H:%M')}</p>",
-        f"<p><strong>Paid:</strong> {booking.driver_price.data.formatted}</p>",
-        f"<p><strong>Earnings:</strong> {booking.space_owner_earnings.data.formatted}</p>",
-    ]
-    if s3_url:
-        parts.append(f'<p><a href="{s3_url}">View all bookings</a></p>')
-    return "".join(parts)
-
-
-def push_bookings_to_calendar(bookings: list[Booking]) -> None:
-    service = get_client()
+def authorised_http() -> AuthorizedHttp:
+    return AuthorizedHttp(get_credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT))
+
 
-    if not bookings:
-        logger.info("No bookings to push to calendar")
-        return
+@cache
+def get_client() -> "CalendarResource":
+    """The process's one Calendar client, built from the discovery document
+    bundled with google-api-python-client so that building it never fetches."""
+    document = get_static_doc("calendar", "v3")
+    if document is None:
+        raise SystemExit("google-api-python-client has no bundled Calendar discovery document; upgrade it")
+    service = build_from_document(document, http=authorised_http())
+    return cast("CalendarResource", service)
 
-    def callback(request_id, response, exception):
-        if exception is not None:
-            logger.error(f"Error creating event for request {request_id}: {exception}")
-        else:
-            logger.info(f"Successfully created event for booking_id={request_id}")
 
-    batch = service.new_batch_http_request()
-    for booking in bookings:
+@cache
+def batch_post() -> batch.Post:
+    """The process's `batch.Post`. Each request borrows an idle connection from a
+    pool, so connections are reused across batches but never shared by two
+    threads at once, which httplib2 does not allow."""
+    idle: queue.SimpleQueue[AuthorizedHttp] = queue.SimpleQueue()
+
+    def post(url: str, body: bytes, headers: dict[str, str]) -> tuple[int, dict[str, str], bytes]:
+        try:
+            http = idle.get_nowait()
+        except queue.Empty:
+            http = authorised_http()
+        try:
+            response, content = http.request(url, "POST", body=body, headers=headers)
+        finally:
+            idle.put(http)
+        return response.status, response, content
+
+    return post
+
+
+def write_events(plan: Plan) -> batch.BatchResult:
+    """Apply `plan` to the calendar; the writes are independent and go out together."""
+    requests = {}
+    for event_id in plan.delete:
+        requests[f"delete-{event_id}"] = batch.delete_event(CALENDAR_ID, event_id)
+    for event_id, fields in plan.patch.items():
+        logger.info(f"Patching {', '.join(fields)} of event ID: {event_id}")
+        requests[f"patch-{event_id}"] = batch.patch_event(CALENDAR_ID, event_id, fields)
+    for event in plan.insert:
+        booking_id = event["extendedProperties"]["private"]["booking_id"]
         logger.info(
-            "Adding booking to batch: booking_id=%s status=%s start=%s end=%s",
-            booking.id,
-            booking.status,
-            booking.start_date.isoformat(),
-            booking.end_date.isoformat(),
-        )
-        event = booking_to_event(booking)
-        batch.add(
-            service.events().insert(calendarId=CALENDAR_ID, body=event),
-            callback=callback,
-            request_id=str(booking.id),
+            "Inserting booking_id=%s start=%s end=%s", booking_id, event["start"]["dateTime"], event["end"]["dateTime"]
         )
-
-    logger.info(f"Executing batch request with {len(bookings)} events")
-    batch.execute()
+        requests[f"insert-{booking_id}"] = batch.insert_event(CALENDAR_ID, event)
+
+    result = batch.execute(requests, batch_post(), errors=TRANSPORT_ERRORS)
+    for request_id, reply in result.failed.items():
+        logger.error(f"Failed {request_id} after {result.rounds} rounds: {reply.status} {reply.body}")
+    logger.info(
+        f"Wrote {len(result.succeeded)} of {len(requests)} events in {result.rounds} rounds, "
+        f"{result.retried} retried, {len(result.failed)} failed"
+    )
+    return result
 
 
-def delete_events(event_ids: list[str]) -> None:
+def list_page(params: dict[str, str]) -> dict:
+    """One page of events; a rejected sync token raises SyncTokenExpired."""
     service = get_client()
-
-    def callback(request_id, response, exception):
-        if exception is not None:
-            logger.error(f"Error deleting event for request {request_id}: {exception}")
-        else:
-            logger.info(f"Successfully deleted event with ID: {request_id}")
-
-    batch = service.new_batch_http_request()
-    for event_id in event_ids:
-        logger.info(f"Adding delete request to batch for event ID: {event_id}")
-        batch.add(
-            service.events().delete(calendarId=CALENDAR_ID, eventId=event_id), callback=callback, request_id=event_id
-        )
-
-    logger.info(f"Executing batch delete request with {len(event_ids)} events")
-    batch.execute()
-
-
-def booking_hash(booking: Booking) -> str:
-    return hashlib.md5(booking.model_dump_json().encode()).hexdigest()
+    try:
+        return service.events().list(calendarId=CALENDAR_ID, maxResults=2500, **params).execute()
+    except HttpError as error:
+        if error.resp.status == 410:
+            raise SyncTokenExpired from error
+        raise
 
 
-def booking_to_event(booking: Booking) -> "Event":
-    title = booking.vehicle.data.registration or "BPMA Track booked"
-    start = {
-        "dateTime": booking.start_date.isoformat(),
-        "timeZone": TZ,
-    }
-    end = {
-        "dateTime": booking.end_date.isoformat(),
-        "timeZone": TZ,
-    }
+def load_index() -> EventIndex:
+    s3 = boto3.client("s3")
+    try:
+        obj = s3.get_object(Bucket=S3_BUCKET, Key=INDEX_KEY)
+    except s3.exceptions.NoSuchKey:
+        return EventIndex()
+    return EventIndex.loads(obj["Body"].read())
 
-    data_hash = booking_hash(booking)
 
-    private_props = {"booking_id": booking.id, "data_hash": data_hash}
-    return {
-        "summary": title,
-        "description": booking_to_html(booking),
-        "start": cast("EventDateTime", start),
-        "end": cast("EventDateTime", end),
-        "extendedProperties": {"private": private_props},
-    }
+def save_index(index: EventIndex) -> None:
+    s3 = boto3.client("s3")
+    s3.put_object(Bucket=S3_BUCKET, Key=INDEX_KEY, Body=index.dumps(), ContentType="application/json")
 
 
 def list_events_after(after_date: datetime.date) -> list["Event"]:
-    service = get_client()
-
-    tz = ZoneInfo(TZ)
-    time_min = datetime.datetime.combine(after_date, datetime.time.min, tzinfo=tz).isoformat()
-
-    logger.info(f"Listing events after {time_min}")
-    events_result = (
-        service.events()
-        .list(
-            calendarId=CALENDAR_ID,
-            timeMin=time_min,
-            singleEvents=True,
-            orderBy="startTime",
-        )
-        .execute()
-    )
-    return events_result.get("items", [])
-
-
-def get_insert_delete(future_bookings: list[Booking], events: list["Event"]) -> tuple[list[Booking], list["Event"]]:
-    booking_hashes = {booking_hash(booking): booking for booking in future_bookings}
-    event_hashes = {
-        hash: event
-        for event in events
-        if (hash := event.get("extendedProperties", {}).get("private", {}).get("data_hash"))
-    }
-    deleted_event_hashes = set(event_hashes) - set(booking_hashes)
-    new_booking_hashes = set(booking_hashes) - set(event_hashes)
-
-    return (
-        list(booking_hashes[hash] for hash in new_booking_hashes if booking_hashes[hash].status != "cancelled"),
-        list(event_hashes[hash] for hash in deleted_event_hashes),
+    """Events ending after `after_date` starts, from the synced local index."""
+    index = load_index()
+    sync = index.sync(list_page)
+    logger.info(
+        f"{'Full' if sync.full else 'Incremental'} calendar sync: {sync.pages} pages, "
+        f"{sync.changed} events changed, {sync.removed} removed"
     )
+    save_index(index)
+    return cast("list[Event]", index.events_after(after_date, ZoneInfo(TZ)))
 
 
 def main() -> None:
@@ -201,12 +189,11 @@ def main() -> None:
     events = list_events_after(today)
     logger.info(f"Found {len(events)} events after {today}")
 
-    to_insert, to_delete = get_insert_delete(future_bookings, events)
-    logger.info(f"{len(to_insert)} bookings to insert, {len(to_delete)} events to delete")
-    if to_delete:
-        delete_events([event["id"] for event in to_delete if "id" in event])
-    if to_insert:
-        push_bookings_to_calendar(to_insert)
+    plan = reconcile(future_bookings, events, partial(booking_to_event, version=bookings.fetchedAt))
+    logger.info(f"{len(plan.insert)} events to insert, {len(plan.patch)} to patch, {len(plan.delete)} to delete")
+    result = write_events(plan)
+    if result.failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
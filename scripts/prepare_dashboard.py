@@ -1,14 +1,39 @@
 #!/usr/bin/env python3
 import argparse
 import json
+import posixpath
 import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
 from functools import cache
 from pathlib import Path
+from typing import IO, Any
 from urllib.parse import urlparse
 
 import boto3
+from botocore.exceptions import ClientError
 
-from src.dashboard import build_dashboard
+from src import columnar, patch
+from src.bookings.archive import compress, decompress, open_decompressed
+from src.build_stats import BuildStats, timed
+from src.dashboard import (
+    BOOKING_SHARD,
+    FRESHNESS,
+    build_dashboard,
+    build_dashboard_incremental,
+    build_dashboard_stream,
+    content_hash,
+    shard_dashboard,
+)
+from src.portfolio import PARTITION_FIELDS, build_portfolio
+from src.state import DashboardState
+
+# Sidecar suffix for each --compress encoding
+SIDECARS = {"gzip": ".gz", "br": ".br"}
+# Destination {id} of the rollup when partitioning
+PORTFOLIO = "portfolio"
+# S3 object metadata key holding the content_hash of the stored document
+HASH_METADATA = "content-hash"
 
 
 @cache
@@ -24,33 +49,243 @@ def s3_client():
 
 def read(uri: str) -> bytes:
     if uri == "-":
-        return sys.stdin.buffer.read()
+        return decompress(sys.stdin.buffer.read())
     if not uri.startswith("s3://"):
-        return Path(uri).read_bytes()
+        return decompress(Path(uri).read_bytes())
     parsed = urlparse(uri)
-    return (
+    return decompress(
         s3_client()
         .get_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"))["Body"]
         .read()
     )
 
 
-def write(uri: str, payload: bytes) -> None:
+def read_optional(uri: str) -> bytes | None:
+    try:
+        return read(uri)
+    except FileNotFoundError:
+        return None
+    except ClientError as error:
+        if error.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise
+
+
+@contextmanager
+def open_source(uri: str) -> Iterator[IO[bytes]]:
+    if uri == "-":
+        yield open_decompressed(sys.stdin.buffer)
+    elif not uri.startswith("s3://"):
+        with open(uri, "rb") as source:
+            yield open_decompressed(source)
+    else:
+        parsed = urlparse(uri)
+        body = s3_client().get_object(
+            Bucket=parsed.netloc, Key=parsed.path.lstrip("/")
+        )["Body"]
+        try:
+            yield open_decompressed(body)
+        finally:
+            body.close()
+
+
+def head(uri: str) -> dict[str, Any] | None:
+    parsed = urlparse(uri)
+    try:
+        return s3_client().head_object(
+            Bucket=parsed.netloc, Key=parsed.path.lstrip("/")
+        )
+    except ClientError as error:
+        if error.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise
+
+
+def exists(uri: str) -> bool:
+    if uri.startswith("s3://"):
+        return head(uri) is not None
+    return Path(uri).exists()
+
+
+def stored_hash(uri: str) -> str | None:
+    """The content hash of the document already at `uri`, if there is one."""
+    if uri.startswith("s3://"):
+        stored = head(uri)
+        return stored["Metadata"].get(HASH_METADATA) if stored else None
+    existing = read_optional(uri)
+    try:
+        return content_hash(json.loads(existing)) if existing else None
+    except ValueError:
+        return None
+
+
+def write(
+    uri: str, payload: bytes, digest: str | None = None, encoding: str | None = None
+) -> None:
     if not uri.startswith("s3://"):
         path = Path(uri)
         path.parent.mkdir(parents=True, exist_ok=True)
         path.write_bytes(payload)
         return
     parsed = urlparse(uri)
+    extra = {"ContentEncoding": encoding} if encoding else {}
     s3_client().put_object(
         Bucket=parsed.netloc,
         Key=parsed.path.lstrip("/"),
         Body=payload,
         ContentType="application/json",
         CacheControl="no-store",
+        Metadata={HASH_METADATA: digest} if digest else {},
+        **extra,
     )
 
 
+@cache
+def brotli():
+    try:
+        import brotli
+    except ImportError:
+        raise SystemExit(
+            "Brotli sidecars need the brotli package, for example "
+            "`uv run --with brotli scripts/prepare_dashboard.py ...`"
+        ) from None
+    return brotli
+
+
+def encode(payload: bytes, encoding: str) -> bytes:
+    return compress(payload) if encoding == "gzip" else brotli().compress(payload)
+
+
+def serialise(document: dict[str, Any], indent: int | None) -> bytes:
+    separators = None if indent else (",", ":")
+    return json.dumps(
+        document, indent=indent, separators=separators, ensure_ascii=False
+    ).encode()
+
+
+def publish(
+    uri: str,
+    document: dict[str, Any],
+    indent: int | None,
+    encodings: list[str],
+    stats: BuildStats | None = None,
+) -> list[str]:
+    """Write `document` and its compressed sidecars unless `uri` already holds it.
+
+    Returns the URIs written. An unchanged document still gets any sidecar
+    that is missing, so adding --compress later fills them in.
+    """
+    digest = content_hash(document)
+    targets = {uri: None} | {
+        uri + SIDECARS[encoding]: encoding for encoding in encodings
+    }
+    if stored_hash(uri) == digest:
+        targets = {
+            target: encoding
+            for target, encoding in targets.items()
+            if encoding and not exists(target)
+        }
+    if not targets:
+        return []
+    with timed(stats, "encode.json"):
+        payload = serialise(document, indent)
+    for target, encoding in targets.items():
+        body = payload
+        if encoding:
+            with timed(stats, f"encode.{encoding}"):
+                body = encode(payload, encoding)
+        write(target, body, digest, encoding)
+    return list(targets)
+
+
+def publish_patch(
+    uri: str, previous: bytes, document: dict[str, Any], indent: int | None
+) -> list[str]:
+    """Write the patch from the `previous` build at `uri` to `document`.
+
+    Patches are taken between row-based documents, so a schema 3 build is
+    decoded first and its patch applies to the decoded previous build. `to`
+    is then the etag of the decoded build, serialised as `document` is, which
+    is what applying the patch gives. A sharded dashboard's patch covers its
+    index; booking shards are replaced whole.
+    """
+    before = json.loads(previous)
+    if before.get("schemaVersion") == columnar.SCHEMA_VERSION:
+        before = columnar.decode(before)
+    if document["schemaVersion"] == columnar.SCHEMA_VERSION:
+        document = columnar.decode(document)
+    previous_etag = patch.etag(previous)
+    target = posixpath.join(
+        posixpath.dirname(uri), patch.DASHBOARD_PATCH.format(etag=previous_etag)
+    )
+    body = patch.diff(
+        before, document, previous_etag, patch.etag(serialise(document, indent))
+    )
+    write(target, serialise(body, None))
+    return [target]
+
+
+def publish_freshness(
+    uri: str, dashboard: dict[str, Any], indent: int | None
+) -> list[str]:
+    """Write when the dashboard at `uri` was fetched and built, changed or not."""
+    target = posixpath.join(posixpath.dirname(uri), FRESHNESS)
+    freshness = {key: dashboard[key] for key in ("fetchedAt", "generatedAt")}
+    write(target, serialise(freshness, indent))
+    return [target]
+
+
+def output(
+    dashboard: dict[str, Any],
+    destination: str,
+    args: argparse.Namespace,
+    stats: BuildStats | None = None,
+) -> list[str]:
+    """Write `dashboard` to `destination` as the options ask; the URIs written."""
+    index, shards = dashboard, {}
+    if args.shard:
+        with timed(stats, "encode.shard"):
+            index, shards = shard_dashboard(dashboard)
+    if args.schema == 3:
+        with timed(stats, "encode.columnar"):
+            index = columnar.encode(index)
+            shards = {
+                month: columnar.encode(shard, index) for month, shard in shards.items()
+            }
+    # The patch is taken against the build being replaced, before it is
+    previous = read_optional(destination) if args.patch else None
+    written = []
+    for month, shard in shards.items():
+        written += publish(
+            posixpath.join(
+                posixpath.dirname(destination), BOOKING_SHARD.format(month=month)
+            ),
+            shard,
+            args.indent,
+            args.compress,
+            stats,
+        )
+    written += publish(destination, index, args.indent, args.compress, stats)
+    if previous and destination in written:
+        written += publish_patch(destination, previous, index, args.indent)
+    return written + publish_freshness(destination, index, args.indent)
+
+
+def publish_portfolio(
+    portfolio: dict[str, Any],
+    parts: dict[int, dict[str, Any]],
+    args: argparse.Namespace,
+    stats: BuildStats | None = None,
+) -> list[str]:
+    """Write each part dashboard to its destination, then the rollup."""
+    written = []
+    for key, part in parts.items():
+        written += output(part, args.destination.format(id=key), args, stats)
+    rollup = args.destination.format(id=PORTFOLIO)
+    written += publish(rollup, portfolio, args.indent, args.compress, stats)
+    return written + publish_freshness(rollup, portfolio, args.indent)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Prepare the compact dashboard payload from JustPark bookings"
@@ -61,15 +296,145 @@ def main() -> None:
     parser.add_argument(
         "destination", help="Local path or s3:// URI for the dashboard JSON"
     )
+    parser.add_argument(
+        "--decode",
+        choices=("fast", "full"),
+        default="fast",
+        help="Validate only the fields the dashboard reads, or the full booking model",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Decode bookings incrementally instead of loading the whole source; "
+        "memory still grows with the number of bookings the dashboard lists",
+    )
+    parser.add_argument(
+        "--schema",
+        type=int,
+        choices=(2, 3),
+        default=2,
+        help="Dashboard schema version; 3 stores the booking rows by column",
+    )
+    parser.add_argument(
+        "--shard",
+        action="store_true",
+        help="Write the booking rows to monthly files under bookings/ next to the "
+        "destination, leaving only an index of months in the destination",
+    )
+    parser.add_argument(
+        "--indent",
+        type=int,
+        help="Indent the JSON by this many spaces instead of writing it minified",
+    )
+    parser.add_argument(
+        "--compress",
+        action="append",
+        choices=sorted(SIDECARS),
+        default=[],
+        help="Also write a pre-compressed sidecar (.gz or .br) of each document; "
+        "repeat for both",
+    )
+    parser.add_argument(
+        "--patch",
+        action="store_true",
+        help="Also write patches/<previous etag>.json next to the destination, "
+        "turning the dashboard or index it replaces into the new one",
+    )
+    parser.add_argument(
+        "--written",
+        help="Append the path of every file actually written to this file; "
+        "documents whose content hash matches the destination are skipped",
+    )
+    parser.add_argument(
+        "--partition",
+        choices=sorted(PARTITION_FIELDS),
+        help="Build one dashboard per listing or owner, in parallel, to the "
+        "destination with {id} replaced by its id, and a portfolio rollup to "
+        f"{{id}} = {PORTFOLIO}",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Processes for --partition; defaults to one per core",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time decoding, each section and encoding and print the timings to "
+        "stderr; the dashboard's buildStats holds all but the encoding, which "
+        "comes after it is added",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="With --profile, also record each stage's peak memory (much slower)",
+    )
+    parser.add_argument(
+        "--state",
+        help="Local path or s3:// URI of the aggregation state; only bookings "
+        "changed since it was saved are decoded, and it is rewritten afterwards",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore any saved --state and rebuild it from the whole export",
+    )
     args = parser.parse_args()
+    if "br" in args.compress:
+        brotli()
+    if args.partition and (args.state or args.stream):
+        parser.error(
+            "--partition builds from the whole export, without --state or --stream"
+        )
+    if args.partition and "{id}" not in args.destination:
+        parser.error("--partition needs {id} in the destination")
+    if args.trace_memory and not args.profile:
+        parser.error("--trace-memory needs --profile")
+    stats = BuildStats(memory=args.trace_memory) if args.profile else None
 
-    dashboard = build_dashboard(read(args.source))
-    payload = json.dumps(dashboard, indent=2, ensure_ascii=False).encode()
-    write(args.destination, payload)
+    if args.state:
+        saved = None if args.full else read_optional(args.state)
+        state = DashboardState.loads(saved) if saved else DashboardState()
+        with open_source(args.source) as source:
+            dashboard, changes = build_dashboard_incremental(
+                source, state, mode=args.decode, stats=stats
+            )
+        write(args.state, state.dumps())
+        print(
+            f"{changes.added} added, {changes.changed} changed, "
+            f"{changes.removed} removed, {changes.unchanged} unchanged"
+        )
+    elif args.stream:
+        with open_source(args.source) as source:
+            dashboard = build_dashboard_stream(source, mode=args.decode, stats=stats)
+    elif args.partition:
+        with timed(stats, "build"):
+            dashboard, parts = build_portfolio(
+                read(args.source),
+                args.partition,
+                mode=args.decode,
+                workers=args.workers,
+            )
+    else:
+        dashboard = build_dashboard(read(args.source), mode=args.decode, stats=stats)
+    if stats:
+        # Encoding is still to come, so the block covers decoding and sections;
+        # the encode.* stages appear only in the report on stderr
+        dashboard["buildStats"] = stats.as_dict()
+    if args.partition:
+        written = publish_portfolio(dashboard, parts, args, stats)
+    else:
+        written = output(dashboard, args.destination, args, stats)
+    if args.written:
+        with open(args.written, "a") as listing:
+            listing.writelines(f"{uri}\n" for uri in written)
     print(
         f"Prepared {dashboard['summary']['bookings']} bookings "
-        f"for {dashboard['summary']['drivers']} drivers → {args.destination}"
+        f"for {dashboard['summary']['drivers']} drivers → {args.destination} "
+        f"({len(written)} files written, the rest unchanged)"
     )
+    if stats:
+        print(stats.report(), file=sys.stderr)
 
 
 if __name__ == "__main__":
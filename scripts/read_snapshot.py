@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
+
+import boto3
+
+from src.bookings.archive import (
+    DirectoryStore,
+    S3Store,
+    SnapshotArchive,
+    Store,
+    dumps,
+)
+
+
+def open_store(uri: str) -> Store:
+    if not uri.startswith("s3://"):
+        return DirectoryStore(Path(uri))
+    parsed = urlparse(uri)
+    prefix = parsed.path.lstrip("/")
+    if prefix and not prefix.endswith("/"):
+        prefix += "/"
+    return S3Store(boto3.client("s3"), parsed.netloc, prefix)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild a bookings snapshot from the snapshot archive"
+    )
+    parser.add_argument(
+        "archive", help="Local directory or s3:// URI prefix of the archive"
+    )
+    parser.add_argument(
+        "destination", help="Local path for the bookings JSON, or - for stdout"
+    )
+    parser.add_argument(
+        "--at",
+        type=datetime.fromisoformat,
+        help="ISO timestamp with offset; defaults to the latest snapshot",
+    )
+    args = parser.parse_args()
+
+    payload = dumps(SnapshotArchive(open_store(args.archive)).snapshot(args.at))
+    if args.destination == "-":
+        sys.stdout.buffer.write(payload)
+    else:
+        Path(args.destination).write_bytes(payload)
+
+
+if __name__ == "__main__":
+    main()
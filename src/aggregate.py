@@ -0,0 +1,324 @@
+"""Single-pass dashboard aggregation.
+
+Bookings are appended once to a columnar `BookingTable`, which converts their
+times and prices as they arrive. The sections are then vectorised group-bys
+over that table; only the display rows keep per-booking dictionaries.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Sequence
+from datetime import date, datetime, timedelta, timezone
+from functools import cache
+from typing import Any
+
+import numpy as np
+
+from src.bookings.models import Booking
+from src.bookings.table import BookingTable, TableBuilder
+from src.build_stats import BuildStats, timed
+from src.occupancy import DAY, EPOCH_DATE, LONDON, daily_seconds
+from src.rolling import rolling_means
+
+WINDOWS = (7, 14, 30, 90)
+
+
+def tax_year_start(today: date | None = None) -> date:
+    today = today or datetime.now(LONDON).date()
+    return date(today.year if today >= date(today.year, 4, 6) else today.year - 1, 4, 6)
+
+
+class Aggregator:
+    """Collects bookings in one pass and builds every dashboard section."""
+
+    def __init__(self, today: date, windows: Sequence[int] = WINDOWS) -> None:
+        self.today = today
+        self.windows = windows
+        self.table = TableBuilder()
+        self.rows: list[dict[str, Any]] = []
+
+    def add(self, booking: Booking) -> None:
+        self.table.append(booking)
+        self.rows.append(booking_row(booking))
+
+    def extend(self, bookings: Iterable[Booking]) -> Aggregator:
+        for booking in bookings:
+            self.add(booking)
+        return self
+
+    def result(self, stats: BuildStats | None = None) -> dict[str, Any]:
+        with timed(stats, "table"):
+            table = self.table.build()
+        return sections(table, self.rows, self.today, self.windows, stats)
+
+
+def sections(
+    table: BookingTable,
+    rows: list[dict[str, Any]],
+    today: date,
+    windows: Sequence[int] = WINDOWS,
+    stats: BuildStats | None = None,
+) -> dict[str, Any]:
+    """Every dashboard section from a table and its display rows, in table order."""
+    active = table.take(~table.is_status("cancelled"))
+    builders: dict[str, Callable[[], Any]] = {
+        "summary": lambda: summary(table),
+        "bookings": lambda: [
+            rows[index] for index in np.argsort(table.start, kind="stable").tolist()
+        ],
+        "earnings": lambda: earnings(active, today),
+        "occupancy": lambda: occupancy(active, windows),
+        "drivers": lambda: drivers(table),
+        "driverHighlights": lambda: driver_highlights(active, today),
+        "vehicles": lambda: vehicles(table),
+    }
+    body = {}
+    for name, build in builders.items():
+        with timed(stats, f"section.{name}"):
+            body[name] = build()
+    return body
+
+
+def summary(table: BookingTable) -> dict[str, Any]:
+    cancelled = table.is_status("cancelled")
+    return {
+        "bookings": int((~cancelled).sum()),
+        "cancelled": int(cancelled.sum()),
+        "drivers": len(np.unique(table.driver_id[~cancelled])),
+    }
+
+
+def booking_row(booking: Booking) -> dict[str, Any]:
+    driver = booking.driver.data
+    vehicle = booking.vehicle.data
+    return {
+        "id": booking.id,
+        "start": booking.start_date.isoformat(),
+        "end": booking.end_date.isoformat(),
+        "status": booking.status,
+        "title": booking.title,
+        "bookingType": booking.booking_type,
+        "driverId": driver.id,
+        "driverName": driver.name,
+        "driverEmail": driver.email,
+        "driverPhone": driver.phone_number,
+        "vehicleId": vehicle.id,
+        "registration": vehicle.registration,
+        "vehicle": " ".join(part for part in (vehicle.make, vehicle.model) if part),
+        "vehicleColour": vehicle.colour,
+        "earnings": booking.space_owner_earnings.data.value,
+        "paid": booking.driver_price.data.value,
+    }
+
+
+def earnings(table: BookingTable, today: date) -> dict[str, Any]:
+    days = table.local_start // DAY
+    tax_year = epoch_day(tax_year_start(today))
+    return {
+        "total": pounds(table.earnings.sum()),
+        "taxYear": pounds(table.earnings[days >= tax_year].sum()),
+        "bookings": len(table),
+        "periods": {
+            name: [
+                {"date": day, "value": pounds(value)}
+                for day, value in zip(*_grouped_sum(keys, table.earnings))
+            ]
+            for name, keys in period_keys(days).items()
+        },
+    }
+
+
+def period_keys(days: np.ndarray) -> dict[str, np.ndarray]:
+    """Epoch days mapped to the first day of each reporting period."""
+    dates = days.astype("datetime64[D]")
+    months = dates.astype("datetime64[M]")
+    return {
+        "day": dates,
+        "week": dates - (days + 3) % 7,
+        "month": months.astype("datetime64[D]"),
+        "quarter": (months - months.astype(np.int64) % 3).astype("datetime64[D]"),
+        "year": dates.astype("datetime64[Y]").astype("datetime64[D]"),
+    }
+
+
+def _grouped_sum(keys: np.ndarray, values: np.ndarray) -> tuple[list[str], list[int]]:
+    groups, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=values, minlength=len(groups))
+    return np.datetime_as_string(groups).tolist(), sums.astype(np.int64).tolist()
+
+
+def occupancy(table: BookingTable, windows: Sequence[int] = WINDOWS) -> dict[str, Any]:
+    if not len(table):
+        return {"windows": list(windows), "minutes": [], "days": []}
+
+    first, seconds = daily_seconds(
+        zip(table.local_start.tolist(), table.local_end.tolist())
+    )
+    dates = [first + timedelta(days=offset) for offset in range(len(seconds))]
+    return {
+        "windows": list(windows),
+        "minutes": rolling_rows(dates, seconds, windows, scale=DAY),
+        "days": rolling_rows(dates, [int(value > 0) for value in seconds], windows),
+    }
+
+
+def rolling_rows(
+    dates: list[date],
+    values: list[int],
+    windows: Sequence[int] = WINDOWS,
+    scale: int = 1,
+) -> list[dict[str, Any]]:
+    means = {
+        str(window): series
+        for window, series in rolling_means(values, windows, scale).items()
+    }
+    return [
+        {
+            "date": day.isoformat(),
+            **{
+                window: None if series[index] is None else round(series[index], 6)
+                for window, series in means.items()
+            },
+        }
+        for index, day in enumerate(dates)
+    ]
+
+
+def drivers(table: BookingTable) -> list[dict[str, Any]]:
+    ids, first_seen, inverse = np.unique(
+        table.driver_id, return_index=True, return_inverse=True
+    )
+    count = len(ids)
+    active = ~table.is_status("cancelled")
+    rows = np.flatnonzero(active)
+    seconds = table.end - table.start
+    bookings = np.bincount(inverse[active], minlength=count)
+    cancelled = np.bincount(inverse[~active], minlength=count)
+    earned = np.bincount(inverse, weights=table.earnings * active, minlength=count)
+    paid = np.bincount(inverse, weights=table.paid * active, minlength=count)
+    hours = np.bincount(inverse, weights=seconds * active, minlength=count) / 3600
+    longest = np.zeros(count, dtype=np.int64)
+    np.maximum.at(longest, inverse[active], seconds[active])
+    first = last = np.zeros(count, dtype=np.int64)
+    if len(rows):
+        first = rows[_group_first(inverse[active], table.start[active], count)]
+        last = rows[_group_first(inverse[active], -table.start[active], count)]
+
+    registrations: list[set[str]] = [set() for _ in range(count)]
+    for group, code in zip(inverse.tolist(), table.registration.tolist()):
+        registrations[group].add(table.registrations[code])
+
+    result = []
+    # Groups in order of first appearance, so ties keep the export's order
+    for group in np.argsort(first_seen, kind="stable").tolist():
+        driver_id = int(ids[group])
+        driver = table.drivers[driver_id]
+        booked = bool(bookings[group])
+        result.append(
+            {
+                "id": driver_id,
+                "name": driver.name,
+                "email": driver.email,
+                "phone": driver.phone_number,
+                "company": driver.company_name,
+                "profilePhoto": driver.profile_photo,
+                "registeredAt": driver.registration_date.isoformat(),
+                "bookings": int(bookings[group]),
+                "cancelled": int(cancelled[group]),
+                "earnings": pounds(earned[group]) if booked else 0,
+                "paid": pounds(paid[group]) if booked else 0,
+                "averageHours": round(hours[group] / bookings[group], 1)
+                if booked
+                else 0,
+                "longestHours": round(int(longest[group]) / 3600, 1) if booked else 0,
+                "firstBooking": _start_iso(table, first[group]) if booked else None,
+                "lastBooking": _start_iso(table, last[group]) if booked else None,
+                "vehicles": sorted(registrations[group]),
+            }
+        )
+    return sorted(result, key=lambda row: (-row["earnings"], row["name"]))
+
+
+def driver_highlights(table: BookingTable, today: date) -> dict[str, Any]:
+    if not len(table):
+        return {}
+    ids, inverse = np.unique(table.driver_id, return_inverse=True)
+    count = len(ids)
+    earned = np.bincount(inverse, weights=table.earnings, minlength=count)
+    repeat = np.bincount(inverse, minlength=count) >= 2
+    total = earned.sum()
+    days = table.local_start // DAY
+    first_days = np.full(count, np.iinfo(np.int64).max)
+    np.minimum.at(first_days, inverse, days)
+    seconds = table.end - table.start
+    longest = int(np.argmax(seconds))
+
+    return {
+        "repeatRate": int(repeat.sum()) / count,
+        "returningRevenueShare": float(earned[repeat].sum() / total) if total else 0,
+        "topThreeRevenueShare": float(np.sort(earned)[::-1][:3].sum() / total)
+        if total
+        else 0,
+        "newThisTaxYear": int((first_days >= epoch_day(tax_year_start(today))).sum()),
+        "busiestWeekday": weekday_name(_most_common((days + 3) % 7)),
+        "busiestHour": f"{_most_common(table.local_start % DAY // 3600):02d}:00",
+        "longestStay": {
+            "driver": table.drivers[int(table.driver_id[longest])].name,
+            "hours": round(int(seconds[longest]) / 3600, 1),
+            "date": _start_iso(table, longest)[:10],
+        },
+    }
+
+
+def _most_common(values: np.ndarray) -> int:
+    """Most frequent value, breaking ties by first appearance like `Counter`."""
+    groups, first, counts = np.unique(values, return_index=True, return_counts=True)
+    tied = counts == counts.max()
+    return int(groups[tied][np.argmin(first[tied])])
+
+
+@cache
+def weekday_name(weekday: int) -> str:
+    return (date(1970, 1, 5) + timedelta(days=weekday)).strftime("%A")
+
+
+def vehicles(table: BookingTable) -> list[dict[str, Any]]:
+    return [
+        {
+            "id": vehicle.id,
+            "registration": vehicle.registration,
+            "make": vehicle.make,
+            "model": vehicle.model,
+            "colour": vehicle.colour,
+            "primary": vehicle.is_primary,
+            "autoPay": vehicle.auto_pay,
+        }
+        for vehicle in sorted(
+            table.vehicles.values(), key=lambda vehicle: vehicle.registration
+        )
+    ]
+
+
+def _group_first(groups: np.ndarray, values: np.ndarray, count: int) -> np.ndarray:
+    """Position of the first smallest value in each group."""
+    picked = np.zeros(count, dtype=np.int64)
+    if not len(groups):
+        return picked
+    order = np.lexsort((values, groups))
+    sorted_groups = groups[order]
+    heads = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    picked[sorted_groups[heads]] = order[heads]
+    return picked
+
+
+def _start_iso(table: BookingTable, row: int) -> str:
+    offset = timezone(timedelta(seconds=int(table.offset[row])))
+    return datetime.fromtimestamp(int(table.start[row]), offset).isoformat()
+
+
+def epoch_day(day: date) -> int:
+    return (day - EPOCH_DATE).days
+
+
+def pounds(pennies: float) -> float:
+    return round(int(pennies) / 100, 2)
@@ -0,0 +1,253 @@
+"""Google API batch requests, sent in chunks, concurrently, with retries.
+
+A batch is one `multipart/mixed` POST holding several API calls, each an HTTP
+request of its own, and answered by one response part per call. The API takes
+at most 1000 calls per batch, and the Calendar API asks for far fewer, so the
+calls are split into chunks of `CHUNK_SIZE` that are sent `WORKERS` at a time.
+
+A call that fails for a rate limit or a server error is sent again, in a
+later round, after an exponential backoff with full jitter. So is every call
+of a chunk whose POST failed as a whole. Other failures are final. Requests
+are sent through `post`, which makes them testable against a local endpoint
+and lets the caller bring its own authorised HTTP client, along with the
+`errors` its transport raises.
+
+A POST can fail after the API has applied some of its calls, so a retry may
+repeat a call that already took effect. A repeated delete is answered 404 or
+410 and counts as done. A repeated insert creates a second event for the
+same booking, which `calendar_sync.reconcile` deletes on the next run.
+"""
+
+from __future__ import annotations
+
+import email.parser
+import email.policy
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, NamedTuple
+from urllib.parse import quote
+
+CALENDAR_BATCH_URL = "https://www.googleapis.com/batch/calendar/v3"
+# Calls per batch: the Calendar API's recommended ceiling, well under the
+# hard limit of 1000
+CHUNK_SIZE = 50
+WORKERS = 4
+ATTEMPTS = 5
+# Backoff before round n of retries is up to BACKOFF * 2**n seconds, capped
+BACKOFF = 1.0
+MAX_BACKOFF = 32.0
+# 403 reasons that mean "slow down" rather than "not allowed"
+RATE_LIMIT_REASONS = frozenset({"rateLimitExceeded", "userRateLimitExceeded"})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Replies to a delete that mean the event is already gone
+GONE_STATUSES = frozenset({404, 410})
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    body: Any = None
+
+
+class Reply(NamedTuple):
+    status: int
+    body: Any = None
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+class BatchResult(NamedTuple):
+    succeeded: dict[str, Reply]
+    failed: dict[str, Reply]
+    rounds: int
+    retried: int
+
+
+# Sends one POST: url, body and headers to status, headers and body
+Post = Callable[[str, bytes, dict[str, str]], tuple[int, Mapping[str, str], bytes]]
+
+
+def insert_event(calendar_id: str, event: Mapping[str, Any]) -> Request:
+    return Request("POST", _events(calendar_id), event)
+
+
+def patch_event(calendar_id: str, event_id: str, fields: Mapping[str, Any]) -> Request:
+    return Request(
+        "PATCH", f"{_events(calendar_id)}/{quote(event_id, safe='')}", fields
+    )
+
+
+def delete_event(calendar_id: str, event_id: str) -> Request:
+    return Request("DELETE", f"{_events(calendar_id)}/{quote(event_id, safe='')}")
+
+
+def execute(
+    requests: Mapping[str, Request],
+    post: Post,
+    url: str = CALENDAR_BATCH_URL,
+    chunk_size: int = CHUNK_SIZE,
+    workers: int = WORKERS,
+    attempts: int = ATTEMPTS,
+    sleep: Callable[[float], None] = time.sleep,
+    errors: tuple[type[Exception], ...] = (OSError,),
+) -> BatchResult:
+    """Send `requests`, keyed by an id unique among them, as batches to `url`.
+
+    Retryable failures, including a POST raising one of `errors`, are sent
+    again up to `attempts` times in all; the last reply of any call that
+    never succeeded is in `failed`.
+    """
+    succeeded: dict[str, Reply] = {}
+    failed: dict[str, Reply] = {}
+    pending = dict(requests)
+    rounds = retried = 0
+    with ThreadPoolExecutor(workers) as pool:
+        while pending:
+            if rounds:
+                sleep(backoff(rounds))
+                retried += len(pending)
+            rounds += 1
+            chunks = [dict(chunk) for chunk in _chunks(pending.items(), chunk_size)]
+            replies: dict[str, Reply] = {}
+            for chunk_replies in pool.map(
+                lambda chunk: send(chunk, post, url, errors), chunks
+            ):
+                replies.update(chunk_replies)
+            retry = {}
+            for request_id, reply in replies.items():
+                if done(pending[request_id], reply):
+                    succeeded[request_id] = reply
+                elif retryable(reply) and rounds < attempts:
+                    retry[request_id] = pending[request_id]
+                else:
+                    failed[request_id] = reply
+            pending = retry
+    return BatchResult(succeeded, failed, rounds, retried)
+
+
+def send(
+    chunk: Mapping[str, Request],
+    post: Post,
+    url: str,
+    errors: tuple[type[Exception], ...] = (OSError,),
+) -> dict[str, Reply]:
+    """The reply to each request of one batch, by id.
+
+    A failed POST, or a call missing from the response, gets status 0 or the
+    POST's own status, and counts as retryable.
+    """
+    boundary = f"batch_{uuid.uuid4().hex}"
+    body = encode(chunk, boundary)
+    headers = {"Content-Type": f"multipart/mixed; boundary={boundary}"}
+    try:
+        status, response_headers, content = post(url, body, headers)
+    except errors as error:
+        return dict.fromkeys(chunk, Reply(0, str(error) or type(error).__name__))
+    if not 200 <= status < 300:
+        return dict.fromkeys(chunk, Reply(status or 0, _json(content)))
+    replies = decode(content, _header(response_headers, "Content-Type"))
+    return {request_id: replies.get(request_id, Reply(0)) for request_id in chunk}
+
+
+def done(request: Request, reply: Reply) -> bool:
+    """Whether `reply` leaves `request` done, counting a delete of a missing event."""
+    return reply.ok or (request.method == "DELETE" and reply.status in GONE_STATUSES)
+
+
+def retryable(reply: Reply) -> bool:
+    if reply.status == 0 or reply.status in RETRY_STATUSES:
+        return True
+    if reply.status != 403 or not isinstance(reply.body, dict):
+        return False
+    errors = reply.body.get("error", {}).get("errors", [])
+    return any(error.get("reason") in RATE_LIMIT_REASONS for error in errors)
+
+
+def backoff(retry: int) -> float:
+    """Seconds to wait before the `retry`th round of retries, with full jitter."""
+    return random.uniform(0, min(MAX_BACKOFF, BACKOFF * 2 ** (retry - 1)))
+
+
+def encode(requests: Mapping[str, Request], boundary: str) -> bytes:
+    """The `multipart/mixed` body of a batch of `requests`."""
+    parts = []
+    for request_id, request in requests.items():
+        lines = [
+            f"--{boundary}",
+            "Content-Type: application/http",
+            f"Content-ID: <{request_id}>",
+            "",
+            f"{request.method} {request.path} HTTP/1.1",
+        ]
+        if request.body is not None:
+            lines += ["Content-Type: application/json", "", json.dumps(request.body)]
+        else:
+            lines.append("")
+        parts.append("\r\n".join(lines))
+    return "\r\n".join([*parts, f"--{boundary}--", ""]).encode()
+
+
+def decode(content: bytes, content_type: str) -> dict[str, Reply]:
+    """The reply to each call of a batch response, by request id."""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + content
+    )
+    replies = {}
+    for part in message.iter_parts():
+        content_id = str(part.get("Content-ID", "")).strip("<>")
+        request_id = content_id.removeprefix("response-")
+        replies[request_id] = _reply(part.get_payload(decode=True) or b"")
+    return replies
+
+
+def urlopen_post(
+    url: str, body: bytes, headers: dict[str, str]
+) -> tuple[int, Mapping[str, str], bytes]:
+    """A `Post` without authorisation, through `urllib`."""
+    request = urllib.request.Request(url, body, headers, method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+
+def _reply(raw: bytes) -> Reply:
+    head, _, body = raw.replace(b"\r\n", b"\n").partition(b"\n\n")
+    status = int(head.split(maxsplit=2)[1])
+    return Reply(status, _json(body))
+
+
+def _json(content: bytes) -> Any:
+    try:
+        return json.loads(content) if content.strip() else None
+    except ValueError:
+        return content.decode(errors="replace")
+
+
+def _header(headers: Mapping[str, str], name: str) -> str:
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return ""
+
+
+def _events(calendar_id: str) -> str:
+    return f"/calendar/v3/calendars/{quote(calendar_id, safe='')}/events"
+
+
+def _chunks(
+    items: Iterable[tuple[str, Request]], size: int
+) -> Iterable[list[tuple[str, Request]]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
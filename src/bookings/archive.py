@@ -0,0 +1,213 @@
+"""Compressed, content-addressed archive of bookings snapshots.
+
+Snapshots are stored as minified, gzip-compressed JSON. The items of each
+snapshot are addressed by the SHA-256 of their minified JSON, so a fetch that
+returns the same bookings as an earlier one adds only an index entry. A new
+item list is stored as a delta against the previous snapshot, holding the
+booking ids in order and only the bookings that differ, until `max_depth`
+deltas have been chained; then a full copy is stored again.
+
+`index.json` lists every snapshot in the order it was archived, with its
+top-level fields (`fetchedAt`, `total`, ...) and the hash of its items.
+
+`decompress` and `open_decompressed` let readers accept a gzip-compressed or
+plain export alike.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, NamedTuple, Protocol
+
+GZIP_MAGIC = b"\x1f\x8b"
+MAX_DEPTH = 20
+INDEX = "index.json"
+
+
+def dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def compress(raw: bytes) -> bytes:
+    # A fixed mtime keeps identical payloads byte-identical.
+    return gzip.compress(raw, mtime=0)
+
+
+def decompress(raw: bytes) -> bytes:
+    """`raw` itself, or its decompressed content if it is gzip-compressed."""
+    return gzip.decompress(raw) if raw[:2] == GZIP_MAGIC else raw
+
+
+def open_decompressed(source: IO[bytes]) -> IO[bytes]:
+    """A reader over `source` that decompresses it if it is gzip-compressed."""
+    head = source.read(2)
+    rest = io.BufferedReader(_Prefixed(head, source))
+    return gzip.GzipFile(fileobj=rest) if head == GZIP_MAGIC else rest
+
+
+class _Prefixed(io.RawIOBase):
+    """Bytes already read from a stream, followed by the rest of the stream."""
+
+    def __init__(self, head: bytes, source: IO[bytes]) -> None:
+        self.head = head
+        self.source = source
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if self.head:
+            size = min(len(buffer), len(self.head))
+            buffer[:size], self.head = self.head[:size], self.head[size:]
+            return size
+        data = self.source.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def items_hash(items: list[dict[str, Any]]) -> str:
+    return hashlib.sha256(dumps(items)).hexdigest()
+
+
+class Store(Protocol):
+    def get(self, key: str) -> bytes | None: ...
+
+    def put(self, key: str, data: bytes) -> None: ...
+
+    def exists(self, key: str) -> bool: ...
+
+
+class DirectoryStore:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def get(self, key: str) -> bytes | None:
+        path = self.root / key
+        return path.read_bytes() if path.exists() else None
+
+    def put(self, key: str, data: bytes) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / key).write_bytes(data)
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).exists()
+
+
+class S3Store:
+    """Objects under `prefix` in an S3 bucket, through a boto3 client."""
+
+    def __init__(self, client: Any, bucket: str, prefix: str = "") -> None:
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read()
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.client.exceptions.ClientError as error:
+            if error.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return False
+            raise
+        return True
+
+
+class Entry(NamedTuple):
+    hash: str
+    depth: int
+    fields: dict[str, Any]
+
+    @property
+    def fetched_at(self) -> datetime:
+        return datetime.fromisoformat(self.fields["fetchedAt"])
+
+
+class SnapshotArchive:
+    def __init__(self, store: Store, max_depth: int = MAX_DEPTH) -> None:
+        self.store = store
+        self.max_depth = max_depth
+
+    def entries(self) -> list[Entry]:
+        raw = self.store.get(INDEX)
+        return [Entry(*entry) for entry in json.loads(raw)] if raw else []
+
+    def put(self, payload: dict[str, Any]) -> Entry:
+        """Archive `payload`, storing its items only if they are not stored yet.
+
+        The index is read, extended and written back, so two concurrent puts
+        lose one entry; the fetch workflow runs one at a time for this.
+        """
+        entries = self.entries()
+        items = payload["items"]
+        digest = items_hash(items)
+        fields = {key: value for key, value in payload.items() if key != "items"}
+        known = {entry.hash: entry.depth for entry in entries}
+        if digest in known:
+            depth = known[digest]
+        elif entries and entries[-1].depth < self.max_depth and _keyed(items):
+            base = entries[-1]
+            self._put_blob(digest, _delta(base.hash, self.items(base.hash), items))
+            depth = base.depth + 1
+        else:
+            self._put_blob(digest, {"items": items})
+            depth = 0
+        entry = Entry(digest, depth, fields)
+        self.store.put(INDEX, dumps([*entries, entry]))
+        return entry
+
+    def items(self, digest: str) -> list[dict[str, Any]]:
+        """The item list stored under `digest`, applying any chain of deltas."""
+        raw = self.store.get(f"{digest}.json.gz")
+        if raw is None:
+            raise KeyError(f"Snapshot {digest} is not archived")
+        blob = json.loads(decompress(raw))
+        if "items" in blob:
+            return blob["items"]
+        items = {item["id"]: item for item in self.items(blob["base"])}
+        items.update((item["id"], item) for item in blob["upsert"])
+        return [items[booking_id] for booking_id in blob["ids"]]
+
+    def snapshot(self, at: datetime | None = None) -> dict[str, Any]:
+        """The latest snapshot fetched at or before `at`, as originally fetched."""
+        entries = [
+            entry for entry in self.entries() if at is None or entry.fetched_at <= at
+        ]
+        if not entries:
+            raise LookupError(f"No snapshot archived at or before {at}")
+        entry = max(entries, key=lambda entry: entry.fetched_at)
+        return {**entry.fields, "items": self.items(entry.hash)}
+
+    def _put_blob(self, digest: str, blob: dict[str, Any]) -> None:
+        key = f"{digest}.json.gz"
+        if not self.store.exists(key):
+            self.store.put(key, compress(dumps(blob)))
+
+
+def _keyed(items: list[dict[str, Any]]) -> bool:
+    ids = [item.get("id") for item in items]
+    return None not in ids and len(set(ids)) == len(ids)
+
+
+def _delta(
+    base: str, previous: list[dict[str, Any]], items: list[dict[str, Any]]
+) -> dict[str, Any]:
+    before = {item["id"]: item for item in previous}
+    return {
+        "base": base,
+        "ids": [item["id"] for item in items],
+        "upsert": [item for item in items if before.get(item["id"]) != item],
+    }
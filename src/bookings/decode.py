@@ -0,0 +1,166 @@
+"""Slim booking decoding.
+
+`SlimBooking` validates only the fields the dashboard and calendar sync read.
+Nested driver, vehicle and price values are pulled straight out of their
+`{"data": ...}` wrappers into flat fields, which avoids building a model per
+wrapper; the `vehicle`, `driver`, `driver_price` and `space_owner_earnings`
+properties rebuild the nested shape as light tuples, so a `SlimBooking` can be
+used wherever those fields of a `Booking` are read.
+"""
+
+from datetime import datetime
+from functools import cached_property
+from typing import Any, Literal, NamedTuple
+
+from pydantic import AliasPath, BaseModel, Field
+
+from src.bookings.models import BookingResponse
+
+DecodeMode = Literal["full", "fast"]
+
+
+class Wrapped(NamedTuple):
+    """Stand-in for the API's `{"data": ...}` wrappers"""
+
+    data: Any
+
+
+class SlimVehicle(NamedTuple):
+    """Vehicle fields shown on the dashboard and in calendar events"""
+
+    id: int
+    make: str
+    model: str
+    registration: str
+    colour: str | None
+    is_primary: bool
+    auto_pay: bool
+
+
+class SlimDriver(NamedTuple):
+    """Driver fields shown on the dashboard and in calendar events"""
+
+    id: int
+    name: str
+    email: str
+    phone_number: str | None
+    company_name: str
+    profile_photo: str
+    registration_date: datetime
+
+
+class SlimPrice(NamedTuple):
+    """Price fields used for totals and display"""
+
+    value: float
+    pennies: int
+    formatted: str
+
+
+def _data(*path: str) -> Any:
+    return Field(validation_alias=AliasPath(path[0], "data", *path[1:]))
+
+
+class SlimBooking(BaseModel):
+    """Booking fields read by the dashboard and calendar sync"""
+
+    id: int
+    start_date: datetime
+    end_date: datetime
+    listing_id: int
+    owner_id: int
+    driver_id: int
+    vehicle_id: int
+    status: str
+    title: str
+    booking_type: str
+
+    vehicle_data_id: int = _data("vehicle", "id")
+    vehicle_make: str = _data("vehicle", "make")
+    vehicle_model: str = _data("vehicle", "model")
+    vehicle_registration: str = _data("vehicle", "registration")
+    vehicle_colour: str | None = _data("vehicle", "colour")
+    vehicle_is_primary: bool = _data("vehicle", "is_primary")
+    vehicle_auto_pay: bool = _data("vehicle", "auto_pay")
+
+    driver_data_id: int = _data("driver", "id")
+    driver_name: str = _data("driver", "name")
+    driver_email: str = _data("driver", "email")
+    driver_phone_number: str | None = _data("driver", "phone_number")
+    driver_company_name: str = _data("driver", "company_name")
+    driver_profile_photo: str = _data("driver", "profile_photo")
+    driver_registration_date: datetime = _data("driver", "registration_date")
+
+    driver_price_value: float = _data("driver_price", "value")
+    driver_price_pennies: int = _data("driver_price", "pennies")
+    driver_price_formatted: str = _data("driver_price", "formatted")
+
+    earnings_value: float = _data("space_owner_earnings", "value")
+    earnings_pennies: int = _data("space_owner_earnings", "pennies")
+    earnings_formatted: str = _data("space_owner_earnings", "formatted")
+
+    @cached_property
+    def vehicle(self) -> Wrapped:
+        return Wrapped(
+            SlimVehicle(
+                self.vehicle_data_id,
+                self.vehicle_make,
+                self.vehicle_model,
+                self.vehicle_registration,
+                self.vehicle_colour,
+                self.vehicle_is_primary,
+                self.vehicle_auto_pay,
+            )
+        )
+
+    @cached_property
+    def driver(self) -> Wrapped:
+        return Wrapped(
+            SlimDriver(
+                self.driver_data_id,
+                self.driver_name,
+                self.driver_email,
+                self.driver_phone_number,
+                self.driver_company_name,
+                self.driver_profile_photo,
+                self.driver_registration_date,
+            )
+        )
+
+    @cached_property
+    def driver_price(self) -> Wrapped:
+        return Wrapped(
+            SlimPrice(
+                self.driver_price_value,
+                self.driver_price_pennies,
+                self.driver_price_formatted,
+            )
+        )
+
+    @cached_property
+    def space_owner_earnings(self) -> Wrapped:
+        return Wrapped(
+            SlimPrice(
+                self.earnings_value, self.earnings_pennies, self.earnings_formatted
+            )
+        )
+
+
+class SlimBookingResponse(BaseModel):
+    """Booking response holding slim bookings"""
+
+    fetchedAt: datetime = Field(alias="fetchedAt")
+    total: int
+    items: list[SlimBooking]
+
+    model_config = {"populate_by_name": True}
+
+
+def decode(
+    raw: str | bytes, mode: DecodeMode = "fast"
+) -> BookingResponse | SlimBookingResponse:
+    if mode == "full":
+        return BookingResponse.model_validate_json(raw)
+    if mode == "fast":
+        return SlimBookingResponse.model_validate_json(raw)
+    raise ValueError(f"Unknown decode mode: {mode}")
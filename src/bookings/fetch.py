@@ -0,0 +1,190 @@
+"""Paginated fetching of received bookings.
+
+`fetch_pages` reads the first page to learn how many pages there are, then
+requests the rest concurrently with at most `concurrency` requests in flight.
+When the API reports no page count, pages are requested `concurrency` at a
+time until one of them is the last. Items are returned in page order with
+repeated booking ids dropped, since bookings arriving mid-crawl push earlier
+items onto the next page.
+
+`fetch_changes` is the incremental counterpart: it walks newest-first pages
+one at a time and stops at the first page whose bookings all match a previous
+snapshot, and `merge` lays those bookings over that snapshot. It raises
+`UnsortedPages` when the first page does not hold the newest booking ids,
+since the walk is only sound for newest-first pages. Even then, a change to
+an older booking past the first unchanged page is only seen by a full crawl.
+
+The HTTP client is supplied by the caller as a `get_page` coroutine, so this
+module only depends on the standard library. `page_getter` adapts any client
+with an httpx-style async `get`, and `session_cookies` reads the cookies out
+of a Playwright storage state so that client can reuse a browser login.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import re
+import time
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from pathlib import Path
+from typing import Any, NamedTuple
+
+CONCURRENCY = 4
+NEXT_LINK = re.compile(r'rel="?next"?', re.IGNORECASE)
+
+
+class UnsortedPages(Exception):
+    """The first page does not hold the newest bookings, so pages are not
+    newest first and an incremental walk would miss new bookings."""
+
+
+class Page(NamedTuple):
+    items: list[dict[str, Any]]
+    pages: int | None
+    has_next: bool
+
+
+class Cookie(NamedTuple):
+    name: str
+    value: str
+    domain: str
+    path: str
+
+
+GetPage = Callable[[int], Awaitable[Page]]
+
+
+def parse_page(data: Any, per_page: int, link: str = "") -> Page:
+    """Items, page count and next-page flag from one decoded response."""
+    items: list[dict[str, Any]] = []
+    if isinstance(data, list):
+        items = data
+    elif isinstance(data, dict):
+        for key in ("data", "results", "bookings", "items"):
+            if isinstance(data.get(key), list):
+                items = data[key]
+                break
+    has_next = bool(NEXT_LINK.search(link)) or len(items) == per_page
+    return Page(items, page_count(data, per_page), has_next)
+
+
+def page_count(data: Any, per_page: int) -> int | None:
+    """Total pages from the response's pagination metadata, if it has any."""
+    if not isinstance(data, dict):
+        return None
+    meta = data.get("meta")
+    for block in (meta.get("pagination"), meta) if isinstance(meta, dict) else ():
+        if not isinstance(block, dict):
+            continue
+        for key in ("total_pages", "last_page"):
+            if isinstance(block.get(key), int):
+                return block[key]
+        if isinstance(block.get("total"), int):
+            return math.ceil(block["total"] / per_page)
+    return None
+
+
+async def fetch_pages(
+    get_page: GetPage, max_pages: int, concurrency: int = CONCURRENCY
+) -> list[dict[str, Any]]:
+    """Every item from pages `1..max_pages`, in page order and unique by id."""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def bounded(page_no: int) -> Page:
+        async with limit:
+            return await get_page(page_no)
+
+    first = await get_page(1)
+    pages = [first]
+    if first.pages is not None:
+        last = min(first.pages, max_pages)
+        pages += await asyncio.gather(*map(bounded, range(2, last + 1)))
+    else:
+        page_no = 2
+        while pages[-1].has_next and page_no <= max_pages:
+            batch = range(page_no, min(page_no + concurrency, max_pages + 1))
+            for page in await asyncio.gather(*map(bounded, batch)):
+                pages.append(page)
+                if not page.has_next:
+                    break
+            page_no = batch.stop
+    return unique(item for page in pages for item in page.items)
+
+
+async def fetch_changes(
+    get_page: GetPage, previous: Iterable[dict[str, Any]], max_pages: int
+) -> list[dict[str, Any]]:
+    """Items from newest-first pages up to the first one with nothing new."""
+    known = {item.get("id"): item for item in previous}
+    items: list[dict[str, Any]] = []
+    for page_no in range(1, max_pages + 1):
+        page = await get_page(page_no)
+        if page_no == 1:
+            _check_newest_first(page, known)
+        items += page.items
+        if not page.has_next or all(
+            known.get(item.get("id")) == item for item in page.items
+        ):
+            break
+    return unique(items)
+
+
+def _check_newest_first(page: Page, known: Mapping[Any, Any]) -> None:
+    """Raise `UnsortedPages` if a known booking is newer than all of `page`."""
+    ids = [key for key in known if isinstance(key, int)]
+    newest = max((item.get("id") for item in page.items), default=None)
+    if ids and (not isinstance(newest, int) or max(ids) > newest):
+        raise UnsortedPages(
+            f"page 1 ends at booking {newest}, older than known booking {max(ids)}"
+        )
+
+
+def merge(
+    changes: list[dict[str, Any]], previous: Iterable[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """`changes` followed by the previous items they do not replace."""
+    return unique([*changes, *previous])
+
+
+def unique(items: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Items with repeated booking ids dropped, keeping the first occurrence."""
+    seen: set[Any] = set()
+    result = []
+    for item in items:
+        booking_id = item.get("id")
+        if booking_id is not None:
+            if booking_id in seen:
+                continue
+            seen.add(booking_id)
+        result.append(item)
+    return result
+
+
+def page_getter(
+    client: Any, url: str, per_page: int, params: Mapping[str, str] | None = None
+) -> GetPage:
+    """`get_page` for an httpx-style async client, adding the page parameters."""
+
+    async def get_page(page_no: int) -> Page:
+        query = {**(params or {}), "page": str(page_no), "per_page": str(per_page)}
+        response = await client.get(url, params=query)
+        if not response.is_success:
+            raise RuntimeError(
+                f"HTTP {response.status_code} on page {page_no}: {response.text[:300]}"
+            )
+        return parse_page(response.json(), per_page, response.headers.get("link", ""))
+
+    return get_page
+
+
+def session_cookies(path: Path, now: float | None = None) -> list[Cookie]:
+    """Unexpired cookies from a Playwright `storage_state` file."""
+    now = time.time() if now is None else now
+    state = json.loads(path.read_text())
+    return [
+        Cookie(cookie["name"], cookie["value"], cookie["domain"], cookie["path"])
+        for cookie in state.get("cookies", [])
+        if cookie.get("expires", -1) < 0 or cookie["expires"] > now
+    ]
@@ -0,0 +1,132 @@
+"""Incremental decoding of a bookings export.
+
+`BookingStream` reads the export from any binary file-like object in chunks
+and yields validated bookings one at a time, so neither the raw payload nor
+the full list of models has to be held in memory. Top-level fields other than
+`items` are collected as they are passed and are complete once the stream has
+been consumed.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from collections.abc import Iterator
+from datetime import datetime
+from typing import IO, Any
+
+from pydantic import TypeAdapter
+
+from src.bookings.decode import DecodeMode, SlimBooking
+from src.bookings.models import Booking
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+FETCHED_AT = TypeAdapter(datetime)
+
+
+class BookingStream:
+    def __init__(
+        self, source: IO[bytes], mode: DecodeMode = "fast", chunk_size: int = CHUNK_SIZE
+    ) -> None:
+        if mode not in ("fast", "full"):
+            raise ValueError(f"Unknown decode mode: {mode}")
+        self.model = SlimBooking if mode == "fast" else Booking
+        self.source = source
+        self.chunk_size = chunk_size
+        self.fields: dict[str, Any] = {}
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    @property
+    def fetchedAt(self) -> datetime:
+        return FETCHED_AT.validate_python(self.fields["fetchedAt"])
+
+    @property
+    def total(self) -> int:
+        return self.fields["total"]
+
+    def __iter__(self) -> Iterator[Booking | SlimBooking]:
+        for _, item in self.raw_items():
+            yield self.validate(item)
+
+    def validate(self, item: dict[str, Any]) -> Booking | SlimBooking:
+        return self.model.model_validate(item)
+
+    def raw_items(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Each item as its source text and decoded JSON, before validation."""
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == "items":
+                yield from self._array()
+            else:
+                self.fields[key] = self._value()
+            if self._next() == "}":
+                return
+
+    def _array(self) -> Iterator[tuple[str, Any]]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._text_value()
+            if self._next() == "]":
+                return
+
+    def _next(self) -> str:
+        char = self._peek()
+        if char not in ",]}":
+            raise ValueError(f"Unexpected {char!r} in bookings export")
+        self._pos += 1
+        return char
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} in bookings export")
+        self._pos += 1
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Bookings export ended unexpectedly")
+
+    def _value(self) -> Any:
+        return self._text_value()[1]
+
+    def _text_value(self) -> tuple[str, Any]:
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk.
+            if end < len(self._buffer) or not self._fill():
+                start, self._pos = self._pos, end
+                return self._buffer[start:end], value
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self.source.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            self._decoder.decode(b"", final=True)
+            return False
+        self._buffer = self._buffer[self._pos :] + self._decoder.decode(chunk)
+        self._pos = 0
+        return True
@@ -0,0 +1,156 @@
+"""Columnar view of JustPark bookings."""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src.bookings.models import Booking, BookingResponse, Driver, Vehicle
+from src.occupancy import wall_seconds
+
+COLUMNS = (
+    "id",
+    "start",
+    "end",
+    "offset",
+    "local_start",
+    "local_end",
+    "driver_id",
+    "vehicle_id",
+    "status",
+    "earnings",
+    "paid",
+)
+DRIVER_ID = COLUMNS.index("driver_id")
+VEHICLE_ID = COLUMNS.index("vehicle_id")
+STATUS = COLUMNS.index("status")
+
+
+@dataclass(frozen=True)
+class BookingTable:
+    """One contiguous array per booking field plus driver and vehicle lookups.
+
+    `start`/`end` are epoch seconds, `offset` is the UTC offset the start was
+    reported in, `local_start`/`local_end` are London wall-clock seconds (see
+    `src.occupancy`), `status` indexes `statuses` and prices are in pennies.
+    `registration` indexes `registrations` with the registration of the vehicle
+    as each booking reported it, which `vehicles` only keeps the latest of.
+    """
+
+    id: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    offset: np.ndarray
+    local_start: np.ndarray
+    local_end: np.ndarray
+    driver_id: np.ndarray
+    vehicle_id: np.ndarray
+    status: np.ndarray
+    earnings: np.ndarray
+    paid: np.ndarray
+    statuses: tuple[str, ...] = ()
+    drivers: dict[int, Driver] = field(default_factory=dict)
+    vehicles: dict[int, Vehicle] = field(default_factory=dict)
+    registration: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+    registrations: tuple[str, ...] = ()
+
+    @classmethod
+    def from_response(cls, response: BookingResponse) -> BookingTable:
+        return cls.from_bookings(response.items)
+
+    @classmethod
+    def from_bookings(cls, bookings: Iterable[Booking]) -> BookingTable:
+        builder = TableBuilder()
+        for booking in bookings:
+            builder.append(booking)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def is_status(self, status: str) -> np.ndarray:
+        if status not in self.statuses:
+            return np.zeros(len(self), dtype=bool)
+        return self.status == self.statuses.index(status)
+
+    def take(self, rows: np.ndarray) -> BookingTable:
+        return BookingTable(
+            **{column: getattr(self, column)[rows] for column in COLUMNS},
+            statuses=self.statuses,
+            drivers=self.drivers,
+            vehicles=self.vehicles,
+            registration=self.registration[rows],
+            registrations=self.registrations,
+        )
+
+
+def booking_values(booking: Booking) -> tuple[int | str, ...]:
+    """Column values for one booking, in `COLUMNS` order."""
+    start, end = booking.start_date, booking.end_date
+    offset = start.utcoffset()
+    return (
+        booking.id,
+        int(start.timestamp()),
+        int(end.timestamp()),
+        int(offset.total_seconds()) if offset else 0,
+        wall_seconds(start),
+        wall_seconds(end),
+        booking.driver_id,
+        booking.vehicle_id,
+        booking.status,
+        booking.space_owner_earnings.data.pennies,
+        booking.driver_price.data.pennies,
+    )
+
+
+class TableBuilder:
+    """Appends bookings one at a time and freezes them into a `BookingTable`.
+
+    Columns grow as typed arrays, so a streamed export costs eight bytes per
+    field per booking rather than a Python object graph.
+    """
+
+    def __init__(self) -> None:
+        self.columns: dict[str, array] = {
+            column: array("b" if column == "status" else "q") for column in COLUMNS
+        }
+        self.statuses: dict[str, int] = {}
+        self.registration = array("q")
+        self.registrations: dict[str, int] = {}
+        self.drivers: dict[int, Driver] = {}
+        self.vehicles: dict[int, Vehicle] = {}
+
+    def append(self, booking: Booking) -> None:
+        self.append_values(
+            booking_values(booking), booking.driver.data, booking.vehicle.data
+        )
+
+    def append_values(
+        self, values: Sequence[int | str], driver: Driver, vehicle: Vehicle
+    ) -> None:
+        """Append one row in `COLUMNS` order, with the status as its name."""
+        status = values[STATUS]
+        values = list(values)
+        values[STATUS] = self.statuses.setdefault(status, len(self.statuses))
+        for column, value in zip(self.columns.values(), values):
+            column.append(value)
+        self.registration.append(
+            self.registrations.setdefault(vehicle.registration, len(self.registrations))
+        )
+        self.drivers[values[DRIVER_ID]] = driver
+        self.vehicles[values[VEHICLE_ID]] = vehicle
+
+    def build(self) -> BookingTable:
+        return BookingTable(
+            **{column: np.array(values) for column, values in self.columns.items()},
+            statuses=tuple(self.statuses),
+            drivers=self.drivers,
+            vehicles=self.vehicles,
+            registration=np.array(self.registration, dtype=np.int64),
+            registrations=tuple(self.registrations),
+        )
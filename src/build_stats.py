@@ -0,0 +1,84 @@
+"""Opt-in timing and memory tracing of the stages of a dashboard build.
+
+Build functions take an optional `BuildStats` and wrap each stage in
+`timed(stats, name)`, which costs nothing when no stats are collected. A
+stage that runs more than once, like encoding each shard, adds up its time
+and keeps its highest memory peak.
+
+Memory is traced with `tracemalloc`, which slows the build down several
+times over, so it is only switched on when asked for. A stage's peak is the
+most memory allocated during it beyond what was allocated when it started.
+"""
+
+from __future__ import annotations
+
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class Stage:
+    seconds: float = 0.0
+    peak_bytes: int | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        stage: dict[str, Any] = {"seconds": round(self.seconds, 6)}
+        if self.peak_bytes is not None:
+            stage["peakBytes"] = self.peak_bytes
+        return stage
+
+    def __str__(self) -> str:
+        peak = f" {self.peak_bytes / 1e6:9.1f} MB peak" if self.peak_bytes else ""
+        return f"{self.seconds:8.3f}s{peak}"
+
+
+class BuildStats:
+    """Time, and optionally peak memory, per named build stage."""
+
+    def __init__(self, memory: bool = False) -> None:
+        self.memory = memory
+        self.stages: dict[str, Stage] = {}
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if self.memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, Stage())
+            stage.seconds += time.perf_counter() - started
+            if self.memory:
+                peak = tracemalloc.get_traced_memory()[1] - before
+                stage.peak_bytes = max(stage.peak_bytes or 0, peak)
+
+    def as_dict(self) -> dict[str, Any]:
+        """The `buildStats` block of a dashboard: the stages timed so far.
+
+        The block is part of the document being encoded, so it is taken
+        before encoding and never holds the `encode.*` stages.
+        """
+        return {
+            "totalSeconds": round(self.total, 6),
+            "stages": {name: stage.as_dict() for name, stage in self.stages.items()},
+        }
+
+    def report(self) -> str:
+        lines = [f"{name:24} {stage}" for name, stage in self.stages.items()]
+        return "\n".join([*lines, f"{'total':24} {self.total:8.3f}s"])
+
+    @property
+    def total(self) -> float:
+        return sum(stage.seconds for stage in self.stages.values())
+
+
+def timed(stats: BuildStats | None, name: str) -> AbstractContextManager[None]:
+    return stats.stage(name) if stats is not None else nullcontext()
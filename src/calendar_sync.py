@@ -0,0 +1,261 @@
+"""Calendar events for bookings, their reconciliation, and a local event mirror.
+
+Kept apart from `scripts/gcal.py`, which needs the Google API client, so this
+can be tested and benchmarked without it. Events are the plain
+dictionaries the Calendar API returns; each one made from a booking carries
+the booking's `booking_id` and `data_hash` in its private extended
+properties.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Callable, Hashable, Iterable, Mapping
+from datetime import date, datetime, time
+from typing import Any, NamedTuple
+from zoneinfo import ZoneInfo
+
+from src.bookings.models import Booking
+from src.fingerprint import CALENDAR_FIELDS, Fingerprints
+
+Event = Mapping[str, Any]
+
+TZ = "Europe/London"
+
+
+# Fingerprints of the booking fields an event shows, kept for the process
+FINGERPRINTS = Fingerprints(CALENDAR_FIELDS)
+
+
+def booking_hash(booking: Booking, version: Hashable | None = None) -> str:
+    """The `data_hash` of `booking`'s event, memoised when `version` is given."""
+    return FINGERPRINTS.of(booking, version)
+
+
+def private_properties(event: Event) -> Mapping[str, str]:
+    return event.get("extendedProperties", {}).get("private", {})
+
+
+def booking_to_html(booking: Booking, s3_url: str | None = None) -> str:
+    vehicle = booking.vehicle.data
+    driver = booking.driver.data
+    zone = ZoneInfo(TZ)
+    start = booking.start_date.astimezone(zone).strftime("%Y-%m-%d %H:%M")
+    end = booking.end_date.astimezone(zone).strftime("%Y-%m-%d %H:%M")
+    car = (
+        f"{vehicle.registration or 'N/A'} - {vehicle.make or 'N/A'} "
+        f"{vehicle.model or ''} ({vehicle.colour or 'N/A'})"
+    )
+    parts = [
+        f"<p><strong>Booking ID:</strong> {booking.id}</p>",
+        f"<p><strong>Driver:</strong> {driver.name}</p>",
+        f"<p><strong>Email:</strong> {driver.email}</p>",
+        f"<p><strong>Phone:</strong> {driver.phone_number or 'N/A'}</p>",
+        f"<p><strong>Vehicle:</strong> {car}</p>",
+        f"<p><strong>Start:</strong> {start}</p>",
+        f"<p><strong>End:</strong> {end}</p>",
+        f"<p><strong>Paid:</strong> {booking.driver_price.data.formatted}</p>",
+        f"<p><strong>Earnings:</strong> {booking.space_owner_earnings.data.formatted}</p>",
+    ]
+    if s3_url:
+        parts.append(f'<p><a href="{s3_url}">View all bookings</a></p>')
+    return "".join(parts)
+
+
+def booking_to_event(
+    booking: Booking, version: Hashable | None = None
+) -> dict[str, Any]:
+    title = booking.vehicle.data.registration or "BPMA Track booked"
+    start = {
+        "dateTime": booking.start_date.isoformat(),
+        "timeZone": TZ,
+    }
+    end = {
+        "dateTime": booking.end_date.isoformat(),
+        "timeZone": TZ,
+    }
+
+    data_hash = booking_hash(booking, version)
+
+    private_props = {"booking_id": booking.id, "data_hash": data_hash}
+    return {
+        "summary": title,
+        "description": booking_to_html(booking),
+        "start": start,
+        "end": end,
+        "extendedProperties": {"private": private_props},
+    }
+
+
+class Plan(NamedTuple):
+    """Calendar writes that bring the events in line with the bookings."""
+
+    insert: list[dict[str, Any]]
+    # Event id to the fields that differ, for events().patch
+    patch: dict[str, dict[str, Any]]
+    delete: list[str]
+
+
+def reconcile(
+    bookings: Iterable[Booking],
+    events: Iterable[Event],
+    to_event: Callable[[Booking], dict[str, Any]] = booking_to_event,
+) -> Plan:
+    """Match `events` to `bookings` by their `booking_id` property.
+
+    A booking without an event is inserted, and one whose event differs is
+    patched with only the fields that changed. Events of cancelled bookings,
+    of bookings no longer listed, and duplicates for one booking are deleted.
+    Events without a `booking_id` were not made from a booking and are left
+    alone.
+    """
+    by_booking: dict[str, Event] = {}
+    delete = []
+    for event in events:
+        booking_id = private_properties(event).get("booking_id")
+        if booking_id is None:
+            continue
+        if str(booking_id) in by_booking:
+            delete.append(event["id"])
+        else:
+            by_booking[str(booking_id)] = event
+
+    insert = []
+    patch = {}
+    for booking in bookings:
+        event = by_booking.pop(str(booking.id), None)
+        if booking.status == "cancelled":
+            if event is not None:
+                delete.append(event["id"])
+            continue
+        desired = to_event(booking)
+        if event is None:
+            insert.append(desired)
+        elif changes := changed_fields(event, desired):
+            patch[event["id"]] = changes
+    delete += [event["id"] for event in by_booking.values()]
+    return Plan(insert, patch, delete)
+
+
+def changed_fields(event: Event, desired: Mapping[str, Any]) -> dict[str, Any]:
+    """The fields of `desired` that `event` does not already have.
+
+    An event whose `data_hash` matches is unchanged without comparing fields.
+    Times are compared as instants, since the API may report them in another
+    offset than they were written with.
+    """
+    if private_properties(event).get("data_hash") == private_properties(desired).get(
+        "data_hash"
+    ):
+        return {}
+    return {
+        field: value
+        for field, value in desired.items()
+        if not _same(field, event.get(field), value)
+    }
+
+
+def _same(field: str, current: Any, desired: Any) -> bool:
+    if field in ("start", "end") and current and "dateTime" in current:
+        return datetime.fromisoformat(current["dateTime"]) == datetime.fromisoformat(
+            desired["dateTime"]
+        ) and current.get("timeZone") == desired.get("timeZone")
+    if field == "extendedProperties" and current:
+        private = current.get("private", {})
+        return all(
+            private.get(name) == str(value)
+            for name, value in desired["private"].items()
+        )
+    return current == desired
+
+
+INDEX_VERSION = 1
+# Event fields the index keeps: those written from a booking, and the id
+INDEXED_FIELDS = ("id", "summary", "description", "start", "end", "extendedProperties")
+
+ListPage = Callable[[dict[str, str]], Mapping[str, Any]]
+
+
+class SyncTokenExpired(Exception):
+    """The calendar no longer accepts the saved sync token (HTTP 410 Gone)."""
+
+
+class Sync(NamedTuple):
+    full: bool
+    pages: int
+    changed: int
+    removed: int
+
+
+class EventIndex:
+    """A local mirror of a calendar's events, kept fresh with sync tokens.
+
+    The first sync, and any after the calendar invalidates the token, lists
+    every event; later ones fetch only events changed since the last sync,
+    deleted ones included. Only the fields written from a booking are kept.
+    """
+
+    def __init__(
+        self, events: dict[str, dict[str, Any]] | None = None, token: str | None = None
+    ) -> None:
+        self.events = events or {}
+        self.token = token
+
+    @classmethod
+    def loads(cls, raw: str | bytes) -> EventIndex:
+        """Restore a saved index; one from another version starts empty."""
+        data = json.loads(raw)
+        if data.get("version") != INDEX_VERSION:
+            return cls()
+        return cls(data["events"], data["syncToken"])
+
+    def dumps(self) -> bytes:
+        return json.dumps(
+            {"version": INDEX_VERSION, "syncToken": self.token, "events": self.events},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode()
+
+    def sync(self, list_page: ListPage) -> Sync:
+        """Bring the index up to date through `list_page`, which lists one page
+        of events for the given query parameters."""
+        if self.token:
+            try:
+                return self._sync({"syncToken": self.token}, list_page, full=False)
+            except SyncTokenExpired:
+                pass
+        return self._sync({}, list_page, full=True)
+
+    def _sync(self, params: dict[str, str], list_page: ListPage, full: bool) -> Sync:
+        events = {} if full else dict(self.events)
+        pages = changed = removed = 0
+        while True:
+            page = list_page(params)
+            pages += 1
+            for event in page.get("items", []):
+                if event.get("status") == "cancelled":
+                    removed += events.pop(event["id"], None) is not None
+                else:
+                    events[event["id"]] = {
+                        field: event[field]
+                        for field in INDEXED_FIELDS
+                        if field in event
+                    }
+                    changed += 1
+            if "nextPageToken" not in page:
+                break
+            params = {**params, "pageToken": page["nextPageToken"]}
+        self.events, self.token = events, page.get("nextSyncToken")
+        return Sync(full, pages, changed, removed)
+
+    def events_after(self, day: date, zone: ZoneInfo) -> list[dict[str, Any]]:
+        """Events ending after `day` starts in `zone`, like a `timeMin` listing."""
+        start = datetime.combine(day, time.min, tzinfo=zone)
+        return [event for event in self.events.values() if _end(event, zone) > start]
+
+
+def _end(event: Mapping[str, Any], zone: ZoneInfo) -> datetime:
+    end = event.get("end", {})
+    if "dateTime" in end:
+        return datetime.fromisoformat(end["dateTime"])
+    return datetime.combine(date.fromisoformat(end["date"]), time.min, tzinfo=zone)
@@ -0,0 +1,227 @@
+"""Columnar, dictionary-encoded booking rows (dashboard schema version 3).
+
+Version 3 of the dashboard document is version 2 with `bookings` stored by
+column instead of as one object per row. Start and end times are epoch
+seconds, with the UTC offsets they were reported in kept in `startOffset` and
+`endOffset` (seconds) so the ISO strings can be rebuilt exactly. Statuses,
+titles and booking types hold indexes into a per-column dictionary of
+distinct values. Each row's driver and vehicle are an index into the
+document's own `drivers` and `vehicles` tables, which already hold their ids,
+names, contact details, registrations, makes, models and colours:
+
+    {"length": 2,
+     "columns": {"id": [1, 2], "start": [...], "status": [0, 0],
+                 "driverIndex": [4, 4], "vehicleIndex": [0, 1], ...},
+     "dictionaries": {"status": ["confirmed"], ...},
+     "overrides": {"driverPhone": [[1, "07700 900000"]]}}
+
+The tables keep the latest details of each driver and vehicle, while a row
+keeps those of its own booking. Where the two differ, as when a driver has
+since changed their phone number, the row's value is listed in `overrides`
+as a `[position, value]` pair, so rows decode exactly.
+
+Monthly booking shards use the same encoding as version 2 of the shard
+format, with indexes into the tables of the dashboard index they belong to.
+Each build sorts those tables afresh, so the index and its shards carry a
+`tablesVersion` digest of the tables, and a shard only decodes against the
+index it was built with. `decode` turns either back into its row-based
+version.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from functools import cache
+from typing import Any
+
+SCHEMA_VERSION = 3
+SHARD_VERSION = 2
+NUMBER_COLUMNS = ("id", "earnings", "paid")
+TEXT_COLUMNS = ("status", "title", "bookingType")
+# Row keys read from the driver or vehicle a row refers to, id first
+DRIVER_KEYS = ("driverId", "driverName", "driverEmail", "driverPhone")
+VEHICLE_KEYS = ("vehicleId", "registration", "vehicle", "vehicleColour")
+# Row keys in version 2 order
+ROW_KEYS = (
+    "id",
+    "start",
+    "end",
+    "status",
+    "title",
+    "bookingType",
+    "driverId",
+    "driverName",
+    "driverEmail",
+    "driverPhone",
+    "vehicleId",
+    "registration",
+    "vehicle",
+    "vehicleColour",
+    "earnings",
+    "paid",
+)
+
+
+def encode(
+    document: dict[str, Any], tables: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """A version 2 dashboard, or a booking shard, with its rows by column.
+
+    A sharded dashboard index has no rows and only changes version; shards
+    move from version 1 to 2. A shard's rows refer to the `drivers` and
+    `vehicles` of `tables`, its dashboard index; a dashboard's to its own.
+    """
+    dashboard = "summary" in document
+    encoded = {
+        **document,
+        "schemaVersion": SCHEMA_VERSION if dashboard else SHARD_VERSION,
+    }
+    if dashboard:
+        encoded["tablesVersion"] = tables_version(document)
+    if "bookings" in document:
+        tables = _tables(document, tables)
+        encoded["tablesVersion"] = tables_version(tables)
+        encoded["bookings"] = encode_rows(
+            document["bookings"], tables["drivers"], tables["vehicles"]
+        )
+    return encoded
+
+
+def decode(
+    document: dict[str, Any], tables: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """The row-based form of a document made by `encode` with the same `tables`.
+
+    Raises ValueError if the rows were encoded against other tables.
+    """
+    decoded = {**document, "schemaVersion": 2 if "summary" in document else 1}
+    decoded.pop("tablesVersion", None)
+    if "bookings" in document:
+        tables = _tables(document, tables)
+        if document.get("tablesVersion") != tables_version(tables):
+            raise ValueError("Booking shard was built against other tables")
+        decoded["bookings"] = decode_rows(
+            document["bookings"], tables["drivers"], tables["vehicles"]
+        )
+    return decoded
+
+
+def tables_version(tables: dict[str, Any]) -> str:
+    """A digest of the `drivers` and `vehicles` tables rows refer to."""
+    canonical = json.dumps(
+        [tables["drivers"], tables["vehicles"]],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def encode_rows(
+    rows: list[dict[str, Any]],
+    drivers: list[dict[str, Any]],
+    vehicles: list[dict[str, Any]],
+) -> dict[str, Any]:
+    """`rows` by column; every row's driver and vehicle must be in the tables."""
+    columns: dict[str, list[Any]] = {
+        column: [row[column] for row in rows] for column in NUMBER_COLUMNS
+    }
+    for column in ("start", "end"):
+        moments = [datetime.fromisoformat(row[column]) for row in rows]
+        columns[column] = [int(moment.timestamp()) for moment in moments]
+        columns[f"{column}Offset"] = [_offset(moment) for moment in moments]
+    dictionaries: dict[str, list[Any]] = {}
+    for column in TEXT_COLUMNS:
+        codes: dict[Any, int] = {}
+        columns[column] = [codes.setdefault(row[column], len(codes)) for row in rows]
+        dictionaries[column] = list(codes)
+    overrides: dict[str, list[list[Any]]] = {}
+    for column, keys, table, details in _references(drivers, vehicles):
+        positions = {entry["id"]: position for position, entry in enumerate(table)}
+        known = [details(entry) for entry in table]
+        indexes = columns[column] = []
+        for position, row in enumerate(rows):
+            index = positions[row[keys[0]]]
+            indexes.append(index)
+            for key, value in zip(keys[1:], known[index][1:]):
+                if row[key] != value:
+                    overrides.setdefault(key, []).append([position, row[key]])
+    return {
+        "length": len(rows),
+        "columns": columns,
+        "dictionaries": dictionaries,
+        "overrides": overrides,
+    }
+
+
+def decode_rows(
+    block: dict[str, Any],
+    drivers: list[dict[str, Any]],
+    vehicles: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    columns = block["columns"]
+    values = {column: columns[column] for column in NUMBER_COLUMNS} | {
+        column: [block["dictionaries"][column][code] for code in columns[column]]
+        for column in TEXT_COLUMNS
+    }
+    for column in ("start", "end"):
+        values[column] = [
+            datetime.fromtimestamp(seconds, _zone(offset)).isoformat()
+            for seconds, offset in zip(columns[column], columns[f"{column}Offset"])
+        ]
+    for column, keys, table, details in _references(drivers, vehicles):
+        known = [details(entry) for entry in table]
+        referenced = [known[index] for index in columns[column]]
+        for field, key in enumerate(keys):
+            values[key] = [entry[field] for entry in referenced]
+    for key, pairs in block["overrides"].items():
+        for position, value in pairs:
+            values[key][position] = value
+    return [dict(zip(ROW_KEYS, row)) for row in zip(*(values[key] for key in ROW_KEYS))]
+
+
+def _tables(document: dict[str, Any], tables: dict[str, Any] | None) -> dict[str, Any]:
+    tables = document if tables is None else tables
+    if "drivers" not in tables or "vehicles" not in tables:
+        raise ValueError("Booking shards need the tables of their dashboard index")
+    return tables
+
+
+def _references(
+    drivers: list[dict[str, Any]], vehicles: list[dict[str, Any]]
+) -> list[
+    tuple[
+        str,
+        tuple[str, ...],
+        list[dict[str, Any]],
+        Callable[[dict[str, Any]], tuple[Any, ...]],
+    ]
+]:
+    return [
+        ("driverIndex", DRIVER_KEYS, drivers, _driver_details),
+        ("vehicleIndex", VEHICLE_KEYS, vehicles, _vehicle_details),
+    ]
+
+
+def _driver_details(driver: dict[str, Any]) -> tuple[Any, ...]:
+    """A `drivers` entry as the values of `DRIVER_KEYS`."""
+    return driver["id"], driver["name"], driver["email"], driver["phone"]
+
+
+def _vehicle_details(vehicle: dict[str, Any]) -> tuple[Any, ...]:
+    """A `vehicles` entry as the values of `VEHICLE_KEYS`, as `booking_row` shows it."""
+    name = " ".join(part for part in (vehicle["make"], vehicle["model"]) if part)
+    return vehicle["id"], vehicle["registration"], name, vehicle["colour"]
+
+
+@cache
+def _zone(offset: int) -> timezone:
+    return timezone(timedelta(seconds=offset))
+
+
+def _offset(moment: datetime) -> int:
+    offset = moment.utcoffset()
+    return int(offset.total_seconds()) if offset else 0
@@ -0,0 +1,128 @@
+"""Fingerprints of the booking fields that a calendar event or dashboard shows.
+
+A fingerprint hashes only the fields a consumer renders, so a change to any
+other field, such as `photos`, leaves it as it was and rewrites nothing. The
+values are read along fixed paths, in the order the paths are listed, from a
+`Booking`, a `SlimBooking` or a raw export item alike, encoded as compact JSON
+and hashed with BLAKE2b.
+
+Fingerprints from models and from raw items are not comparable: a model's
+times are `datetime`s, whose ISO form need not match the source text. Each
+consumer fingerprints one or the other.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Hashable
+from datetime import datetime
+from functools import cache
+from operator import attrgetter
+from typing import Any
+
+FieldPath = tuple[str, ...]
+
+# Everything `booking_to_event` and `booking_to_html` render
+CALENDAR_FIELDS: tuple[FieldPath, ...] = (
+    ("id",),
+    ("start_date",),
+    ("end_date",),
+    ("driver", "data", "name"),
+    ("driver", "data", "email"),
+    ("driver", "data", "phone_number"),
+    ("vehicle", "data", "registration"),
+    ("vehicle", "data", "make"),
+    ("vehicle", "data", "model"),
+    ("vehicle", "data", "colour"),
+    ("driver_price", "data", "formatted"),
+    ("space_owner_earnings", "data", "formatted"),
+)
+# Everything a dashboard state record is built from: the table values, the
+# slim driver and vehicle and the display row
+DASHBOARD_FIELDS: tuple[FieldPath, ...] = (
+    ("id",),
+    ("start_date",),
+    ("end_date",),
+    ("status",),
+    ("title",),
+    ("booking_type",),
+    ("driver_id",),
+    ("vehicle_id",),
+    ("driver", "data", "id"),
+    ("driver", "data", "name"),
+    ("driver", "data", "email"),
+    ("driver", "data", "phone_number"),
+    ("driver", "data", "company_name"),
+    ("driver", "data", "profile_photo"),
+    ("driver", "data", "registration_date"),
+    ("vehicle", "data", "id"),
+    ("vehicle", "data", "make"),
+    ("vehicle", "data", "model"),
+    ("vehicle", "data", "registration"),
+    ("vehicle", "data", "colour"),
+    ("vehicle", "data", "is_primary"),
+    ("vehicle", "data", "auto_pay"),
+    ("driver_price", "data", "value"),
+    ("driver_price", "data", "pennies"),
+    ("space_owner_earnings", "data", "value"),
+    ("space_owner_earnings", "data", "pennies"),
+)
+
+
+def fingerprint(booking: Any, fields: tuple[FieldPath, ...]) -> str:
+    """The hash of `fields` of `booking`, a model or a raw export item."""
+    if isinstance(booking, dict):
+        values: Any = [_item(booking, path) for path in fields]
+    else:
+        values = _attributes(fields)(booking)
+    return hashlib.blake2b(_encode(values).encode(), digest_size=16).hexdigest()
+
+
+class Fingerprints:
+    """Fingerprints over `fields`, memoised per booking id and source version.
+
+    `version` must change whenever the source of a booking may have, like the
+    `fetchedAt` of its export. Only the latest version of each booking is
+    kept, so the memo holds one entry per booking id.
+    """
+
+    def __init__(self, fields: tuple[FieldPath, ...]) -> None:
+        self.fields = fields
+        self.memo: dict[Any, tuple[Hashable, str]] = {}
+
+    def of(self, booking: Any, version: Hashable | None = None) -> str:
+        if version is None:
+            return fingerprint(booking, self.fields)
+        booking_id = booking["id"] if isinstance(booking, dict) else booking.id
+        memo = self.memo.get(booking_id)
+        if memo is not None and memo[0] == version:
+            return memo[1]
+        digest = fingerprint(booking, self.fields)
+        self.memo[booking_id] = (version, digest)
+        return digest
+
+
+@cache
+def _attributes(fields: tuple[FieldPath, ...]) -> attrgetter[Any]:
+    return attrgetter(*(".".join(path) for path in fields))
+
+
+def _item(item: dict[str, Any], path: FieldPath) -> Any:
+    value: Any = item
+    for name in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+def _isoformat(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot fingerprint {type(value).__name__}")
+
+
+_encode = json.JSONEncoder(
+    ensure_ascii=False, separators=(",", ":"), default=_isoformat
+).encode
@@ -0,0 +1,162 @@
+"""Local, indexed history of archived bookings snapshots.
+
+`BookingHistory` keeps every distinct version of every booking once, appended
+to `versions.jsonl`, and an index in `index.json` of the snapshots it has seen
+and, per booking id, the snapshots at which the booking changed:
+`[snapshot number, version hash]`, with a `null` hash when the booking dropped
+out of the export. Reconstructing a past export or a booking's lifecycle then
+reads only the versions it needs, by offset, rather than every snapshot.
+
+Snapshots must be added in the order they were fetched. Reconstructed exports
+list bookings in the order they were first archived.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from bisect import bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from src.bookings.archive import dumps
+from src.bookings.models import Booking, BookingResponse
+
+HISTORY_VERSION = 1
+INDEX = "index.json"
+VERSIONS = "versions.jsonl"
+
+
+class Snapshot(NamedTuple):
+    source: str
+    fields: dict[str, Any]
+
+    @property
+    def fetched_at(self) -> datetime:
+        return datetime.fromisoformat(self.fields["fetchedAt"])
+
+
+class Version(NamedTuple):
+    fetched_at: datetime
+    booking: Booking | None
+
+
+class BookingHistory:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.snapshots: list[Snapshot] = []
+        self.bookings: dict[int, list[tuple[int, str | None]]] = {}
+        self.offsets: dict[str, tuple[int, int]] = {}
+        raw = (root / INDEX).read_bytes() if (root / INDEX).exists() else None
+        data = json.loads(raw) if raw else {}
+        if data.get("version") == HISTORY_VERSION:
+            self.snapshots = [Snapshot(*snapshot) for snapshot in data["snapshots"]]
+            self.bookings = {
+                int(booking_id): [tuple(change) for change in changes]
+                for booking_id, changes in data["bookings"].items()
+            }
+            self.offsets = {
+                digest: tuple(offset) for digest, offset in data["offsets"].items()
+            }
+        self.sources = {snapshot.source for snapshot in self.snapshots}
+
+    def add(self, source: str, payload: dict[str, Any]) -> bool:
+        """Record the export `payload` read from `source`, unless already added."""
+        if source in self.sources:
+            return False
+        snapshot = Snapshot(
+            source, {key: value for key, value in payload.items() if key != "items"}
+        )
+        if self.snapshots and snapshot.fetched_at < self.snapshots[-1].fetched_at:
+            raise ValueError(f"{source} was fetched before the last added snapshot")
+
+        number = len(self.snapshots)
+        present = set()
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / VERSIONS, "ab") as versions:
+            for item in payload["items"]:
+                raw = dumps(item)
+                digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+                if digest not in self.offsets:
+                    self.offsets[digest] = (versions.tell(), len(raw))
+                    versions.write(raw + b"\n")
+                present.add(item["id"])
+                changes = self.bookings.setdefault(item["id"], [])
+                if not changes or changes[-1][1] != digest:
+                    changes.append((number, digest))
+        for booking_id, changes in self.bookings.items():
+            if booking_id not in present and changes[-1][1] is not None:
+                changes.append((number, None))
+
+        self.snapshots.append(snapshot)
+        self.sources.add(source)
+        return True
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / INDEX).write_bytes(
+            dumps(
+                {
+                    "version": HISTORY_VERSION,
+                    "snapshots": self.snapshots,
+                    "bookings": self.bookings,
+                    "offsets": self.offsets,
+                }
+            )
+        )
+
+    def export(self, at: datetime | None = None) -> dict[str, Any]:
+        """The export as of the latest snapshot fetched at or before `at`."""
+        number = self._snapshot_at(at)
+        digests = [
+            digest
+            for changes in self.bookings.values()
+            if (digest := _as_of(changes, number)) is not None
+        ]
+        items = self._items(digests)
+        return {**self.snapshots[number].fields, "items": items}
+
+    def response(self, at: datetime | None = None) -> BookingResponse:
+        return BookingResponse.model_validate(self.export(at))
+
+    def lifecycle(self, booking_id: int) -> list[Version]:
+        """Each change to a booking, with `None` once it dropped out of the export."""
+        changes = self.bookings.get(booking_id, [])
+        items = iter(self._items([digest for _, digest in changes if digest]))
+        return [
+            Version(
+                self.snapshots[number].fetched_at,
+                Booking.model_validate(next(items)) if digest else None,
+            )
+            for number, digest in changes
+        ]
+
+    def _snapshot_at(self, at: datetime | None) -> int:
+        if at is None:
+            number = len(self.snapshots)
+        else:
+            number = bisect_right(
+                self.snapshots, at, key=lambda snapshot: snapshot.fetched_at
+            )
+        if not number:
+            raise LookupError(f"No snapshot fetched at or before {at}")
+        return number - 1
+
+    def _items(self, digests: list[str]) -> list[dict[str, Any]]:
+        items = []
+        with open(self.root / VERSIONS, "rb") as versions:
+            for digest in digests:
+                offset, length = self.offsets[digest]
+                versions.seek(offset)
+                items.append(json.loads(versions.read(length)))
+        return items
+
+
+def _as_of(changes: list[tuple[int, str | None]], number: int) -> str | None:
+    digest = None
+    for changed, version in changes:
+        if changed > number:
+            break
+        digest = version
+    return digest
@@ -0,0 +1,50 @@
+"""Sweep-line occupancy over London wall-clock time.
+
+Intervals are integer seconds on the London wall clock (see `wall_seconds`), so
+every local day is exactly 86400 seconds long and midnights are multiples of
+`DAY`, including the days the clocks change.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+LONDON = ZoneInfo("Europe/London")
+DAY = 86400
+EPOCH = datetime(1970, 1, 1)
+EPOCH_DATE = EPOCH.date()
+
+
+def wall_seconds(moment: datetime) -> int:
+    return int((moment.astimezone(LONDON).replace(tzinfo=None) - EPOCH).total_seconds())
+
+
+def merge(intervals: Iterable[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[list[int]] = []
+    for start, end in sorted(
+        interval for interval in intervals if interval[0] < interval[1]
+    ):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def daily_seconds(intervals: Iterable[tuple[int, int]]) -> tuple[date, list[int]]:
+    """Covered seconds per local day from the first start day to the last end day."""
+    intervals = list(intervals)
+    first = min(start for start, _ in intervals) // DAY
+    last = max(end for _, end in intervals) // DAY
+    covered = [0] * (last - first + 1)
+
+    for start, end in merge(intervals):
+        day = start // DAY
+        while start < end:
+            cut = min(end, (day + 1) * DAY)
+            covered[day - first] += cut - start
+            start, day = cut, day + 1
+
+    return EPOCH_DATE + timedelta(days=first), covered
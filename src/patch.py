@@ -0,0 +1,167 @@
+"""Patches between consecutive dashboard builds.
+
+A patch lists the operations that turn the previous dashboard into the next
+one, so a client holding the previous build need not download the whole
+document again:
+
+    {"schemaVersion": 1, "from": "<etag>", "to": "<etag>", "operations": [
+        {"op": "set", "path": ["summary", "bookings"], "value": 22},
+        {"op": "unset", "path": ["driverHighlights", "longestStay"]},
+        {"op": "rows", "path": ["bookings"], "key": "id",
+         "upsert": [{...}], "remove": [101]}]}
+
+Booking, driver and vehicle rows, and the points of every earnings and
+occupancy series, are patched row by row: only added and changed rows are
+sent, removed rows by key. `order` lists every key only when the rows do not
+end up in their natural order, which keeps surviving rows where they were and
+appends new ones. Everything else is set wholesale where it differs.
+
+`from` and `to` are the MD5 digests of the serialised builds, as R2 and S3
+report them in their ETags for single-part uploads. `to` is the digest of the
+document `apply` returns, so for a schema 3 build, which is patched in its
+row-based form, it is the digest of that form rather than of the upload.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+from typing import Any
+
+PATCH_VERSION = 1
+# Patch path relative to the dashboard, named after the build it applies to
+DASHBOARD_PATCH = "patches/{etag}.json"
+# Lists patched row by row, with the key that identifies a row; "*" matches
+# any one path segment
+KEYED_ROWS = {
+    ("bookings",): "id",
+    ("drivers",): "id",
+    ("vehicles",): "id",
+    ("earnings", "periods", "*"): "date",
+    ("occupancy", "minutes"): "date",
+    ("occupancy", "days"): "date",
+}
+
+Path = tuple[str, ...]
+
+
+def etag(payload: bytes) -> str:
+    return hashlib.md5(payload, usedforsecurity=False).hexdigest()
+
+
+def diff(
+    previous: dict[str, Any],
+    current: dict[str, Any],
+    previous_etag: str,
+    current_etag: str,
+) -> dict[str, Any]:
+    """The patch that turns the `previous` dashboard into `current`."""
+    operations: list[dict[str, Any]] = []
+    _diff_value(previous, current, (), operations)
+    return {
+        "schemaVersion": PATCH_VERSION,
+        "from": previous_etag,
+        "to": current_etag,
+        "operations": operations,
+    }
+
+
+def apply(document: dict[str, Any], patch: dict[str, Any]) -> dict[str, Any]:
+    """A copy of `document` with `patch` applied; `document` is left as is."""
+    if patch["schemaVersion"] != PATCH_VERSION:
+        raise ValueError(f"Unsupported patch version {patch['schemaVersion']}")
+    patched = copy.deepcopy(document)
+    for operation in patch["operations"]:
+        *parents, name = operation["path"]
+        target = patched
+        for part in parents:
+            target = target[part]
+        if operation["op"] == "set":
+            target[name] = operation["value"]
+        elif operation["op"] == "unset":
+            del target[name]
+        else:
+            target[name] = _apply_rows(target[name], operation)
+    return patched
+
+
+def _diff_value(
+    before: Any, after: Any, path: Path, operations: list[dict[str, Any]]
+) -> None:
+    key = _row_key(path)
+    if (
+        key
+        and isinstance(before, list)
+        and isinstance(after, list)
+        and _keyed(before, key)
+        and _keyed(after, key)
+    ):
+        rows = _diff_rows(before, after, key)
+        if rows:
+            operations.append({"op": "rows", "path": list(path), "key": key, **rows})
+    elif isinstance(before, dict) and isinstance(after, dict):
+        for name in before:
+            if name not in after:
+                operations.append({"op": "unset", "path": [*path, name]})
+        for name, value in after.items():
+            if name not in before:
+                operations.append({"op": "set", "path": [*path, name], "value": value})
+            else:
+                _diff_value(before[name], value, (*path, name), operations)
+    elif before != after:
+        operations.append({"op": "set", "path": list(path), "value": after})
+
+
+def _diff_rows(
+    before: list[dict[str, Any]], after: list[dict[str, Any]], key: str
+) -> dict[str, Any]:
+    old = {row[key]: row for row in before}
+    new = {row[key]: row for row in after}
+    rows: dict[str, Any] = {}
+    upsert = [row for row in after if old.get(row[key]) != row]
+    remove = [row[key] for row in before if row[key] not in new]
+    if upsert:
+        rows["upsert"] = upsert
+    if remove:
+        rows["remove"] = remove
+    if _natural_order(list(old), upsert, remove, key) != list(new):
+        rows["order"] = list(new)
+    return rows
+
+
+def _apply_rows(
+    rows: list[dict[str, Any]], operation: dict[str, Any]
+) -> list[dict[str, Any]]:
+    key = operation["key"]
+    upsert = operation.get("upsert", [])
+    remove = operation.get("remove", [])
+    by_key = {row[key]: row for row in rows} | {row[key]: row for row in upsert}
+    if "order" in operation:
+        order = operation["order"]
+    else:
+        order = _natural_order([row[key] for row in rows], upsert, remove, key)
+    return [by_key[value] for value in order]
+
+
+def _natural_order(
+    keys: list[Any], upsert: list[dict[str, Any]], remove: list[Any], key: str
+) -> list[Any]:
+    removed = set(remove)
+    kept = [value for value in keys if value not in removed]
+    present = set(kept)
+    return kept + [row[key] for row in upsert if row[key] not in present]
+
+
+def _row_key(path: Path) -> str | None:
+    for pattern, key in KEYED_ROWS.items():
+        if len(pattern) == len(path) and all(
+            part in ("*", name) for part, name in zip(pattern, path)
+        ):
+            return key
+    return None
+
+
+def _keyed(rows: list[Any], key: str) -> bool:
+    if not all(isinstance(row, dict) and key in row for row in rows):
+        return False
+    return len({row[key] for row in rows}) == len(rows)
@@ -0,0 +1,33 @@
+"""Trailing rolling means from prefix sums."""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Sequence
+
+
+def prefix_sums(values: Iterable[int]) -> array:
+    sums = array("q", [0])
+    total = 0
+    for value in values:
+        total += value
+        sums.append(total)
+    return sums
+
+
+def rolling_means(
+    values: Sequence[int], windows: Iterable[int], scale: int = 1
+) -> dict[int, list[float | None]]:
+    """Mean of each trailing window divided by `scale`, or None until it is full.
+
+    Values are integers so the sums stay exact however long the series grows.
+    """
+    sums = prefix_sums(values)
+    return {
+        window: [None] * min(window - 1, len(values))
+        + [
+            (sums[end] - sums[end - window]) / (window * scale)
+            for end in range(window, len(values) + 1)
+        ]
+        for window in windows
+    }
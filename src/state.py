@@ -0,0 +1,139 @@
+"""Persisted aggregation state for incremental dashboard rebuilds.
+
+The state keeps, for every booking in the last export, a hash of its source
+text, a fingerprint of the fields the dashboard reads, its `BookingTable`
+column values, the driver and vehicle it references and its display row.
+Updating from a new export only validates and converts bookings whose hash
+is new or different and whose fingerprint is too; everything else, including
+bookings where only unread fields such as `photos` changed, is reused as is.
+Hashing the text is several times faster than fingerprinting, so unchanged
+bookings are told apart by it first.
+
+Sections are regrouped from the restored table on every build rather than
+patched: a booking cannot be taken back out of a merged occupancy interval or
+a per-driver maximum, and the group-bys over the table are cheap next to
+decoding.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from src.aggregate import booking_row
+from src.bookings.decode import SlimDriver, SlimVehicle
+from src.bookings.models import Booking
+from src.bookings.stream import BookingStream
+from src.bookings.table import BookingTable, TableBuilder, booking_values
+from src.fingerprint import DASHBOARD_FIELDS, fingerprint
+
+STATE_VERSION = 2
+
+
+class Record(NamedTuple):
+    hash: str
+    fingerprint: str
+    values: tuple[int | str, ...]
+    driver: SlimDriver
+    vehicle: SlimVehicle
+    row: dict[str, Any]
+
+    @classmethod
+    def of(cls, digest: str, field_hash: str, booking: Booking) -> Record:
+        driver, vehicle = booking.driver.data, booking.vehicle.data
+        return cls(
+            digest,
+            field_hash,
+            booking_values(booking),
+            SlimDriver(*(getattr(driver, name) for name in SlimDriver._fields)),
+            SlimVehicle(*(getattr(vehicle, name) for name in SlimVehicle._fields)),
+            booking_row(booking),
+        )
+
+
+class Changes(NamedTuple):
+    added: int
+    changed: int
+    removed: int
+    unchanged: int
+
+
+class DashboardState:
+    def __init__(self, records: list[Record] | None = None) -> None:
+        self.records = records or []
+
+    @classmethod
+    def loads(cls, raw: str | bytes) -> DashboardState:
+        """Restore a saved state; a state from another version starts empty."""
+        data = json.loads(raw)
+        if data.get("version") != STATE_VERSION:
+            return cls()
+        return cls(
+            [
+                Record(
+                    digest,
+                    field_hash,
+                    tuple(values),
+                    SlimDriver(*driver[:-1], datetime.fromisoformat(driver[-1])),
+                    SlimVehicle(*vehicle),
+                    row,
+                )
+                for digest, field_hash, values, driver, vehicle, row in data["bookings"]
+            ]
+        )
+
+    def dumps(self) -> bytes:
+        return json.dumps(
+            {
+                "version": STATE_VERSION,
+                "bookings": [
+                    [
+                        record.hash,
+                        record.fingerprint,
+                        record.values,
+                        [
+                            *record.driver[:-1],
+                            record.driver.registration_date.isoformat(),
+                        ],
+                        record.vehicle,
+                        record.row,
+                    ]
+                    for record in self.records
+                ],
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode()
+
+    def update(self, stream: BookingStream) -> Changes:
+        """Replace the records with the export in `stream`, reusing unchanged ones."""
+        previous = {record.values[0]: record for record in self.records}
+        records = []
+        added = changed = 0
+        for text, item in stream.raw_items():
+            digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+            record = previous.get(item.get("id"))
+            if record is not None and record.hash == digest:
+                records.append(record)
+                continue
+            fingerprinted = fingerprint(item, DASHBOARD_FIELDS)
+            if record is not None and record.fingerprint == fingerprinted:
+                record = record._replace(hash=digest)
+            else:
+                added += record is None
+                changed += record is not None
+                record = Record.of(digest, fingerprinted, stream.validate(item))
+            records.append(record)
+
+        seen = {record.values[0] for record in records}
+        removed = sum(booking_id not in seen for booking_id in previous)
+        self.records = records
+        return Changes(added, changed, removed, len(records) - added - changed)
+
+    def table(self) -> tuple[BookingTable, list[dict[str, Any]]]:
+        builder = TableBuilder()
+        for record in self.records:
+            builder.append_values(record.values, record.driver, record.vehicle)
+        return builder.build(), [record.row for record in self.records]
@@ -0,0 +1,425 @@
+"""SQLite store of bookings with the dashboard's per-driver and money sections.
+
+`BookingStore` upserts bookings into normalised `bookings`, `drivers`,
+`vehicles` and `prices` tables, a batch per transaction, and computes the
+earnings, drivers and vehicles sections as SQL aggregates over them. The
+results match `src.aggregate`; SQL does the grouping and summing, and Python
+only rounds and formats, so rounding follows Python's rules.
+
+Drivers and vehicles are keyed by the ids the bookings reference and keep the
+details from the most recently upserted booking, as `BookingTable` does. Each
+booking also keeps the registration it was made with, which a driver's
+vehicles are listed by, and the ordinal it was first upserted at, which
+breaks ties between drivers as the export order does in `src.aggregate`.
+
+A database written with another `SCHEMA_VERSION` is emptied when opened.
+
+Nothing builds dashboards from the store yet: `prepare_dashboard` still uses
+`src.aggregate`, and the store is a library for callers that keep bookings
+in a database file between runs.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from src.aggregate import epoch_day, pounds, tax_year_start
+from src.bookings.models import Booking
+from src.occupancy import DAY, wall_seconds
+
+BATCH_SIZE = 1000
+# Stored as the database's user_version; bump when the tables change
+SCHEMA_VERSION = 2
+TABLES = ("prices", "bookings", "vehicles", "drivers")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drivers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone_number TEXT,
+    company_name TEXT NOT NULL,
+    profile_photo TEXT NOT NULL,
+    registration_date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vehicles (
+    id INTEGER PRIMARY KEY,
+    data_id INTEGER NOT NULL,
+    make TEXT NOT NULL,
+    model TEXT NOT NULL,
+    registration TEXT NOT NULL,
+    colour TEXT,
+    is_primary INTEGER NOT NULL,
+    auto_pay INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY,
+    start_date INTEGER NOT NULL,
+    end_date INTEGER NOT NULL,
+    utc_offset INTEGER NOT NULL,
+    local_start INTEGER NOT NULL,
+    listing_id INTEGER NOT NULL,
+    owner_id INTEGER NOT NULL,
+    driver_id INTEGER NOT NULL REFERENCES drivers (id),
+    vehicle_id INTEGER NOT NULL REFERENCES vehicles (id),
+    registration TEXT NOT NULL,
+    status TEXT NOT NULL,
+    title TEXT NOT NULL,
+    booking_type TEXT NOT NULL,
+    seen INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prices (
+    booking_id INTEGER NOT NULL REFERENCES bookings (id),
+    kind TEXT NOT NULL,
+    value REAL NOT NULL,
+    pennies INTEGER NOT NULL,
+    formatted TEXT NOT NULL,
+    PRIMARY KEY (booking_id, kind)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bookings_start_date ON bookings (start_date);
+CREATE INDEX IF NOT EXISTS bookings_driver_id ON bookings (driver_id);
+CREATE INDEX IF NOT EXISTS bookings_status ON bookings (status);
+CREATE INDEX IF NOT EXISTS bookings_listing_id ON bookings (listing_id);
+"""
+
+UPSERT_DRIVER = """
+INSERT INTO drivers VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    name = excluded.name,
+    email = excluded.email,
+    phone_number = excluded.phone_number,
+    company_name = excluded.company_name,
+    profile_photo = excluded.profile_photo,
+    registration_date = excluded.registration_date
+"""
+UPSERT_VEHICLE = """
+INSERT INTO vehicles VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    data_id = excluded.data_id,
+    make = excluded.make,
+    model = excluded.model,
+    registration = excluded.registration,
+    colour = excluded.colour,
+    is_primary = excluded.is_primary,
+    auto_pay = excluded.auto_pay
+"""
+UPSERT_BOOKING = """
+INSERT INTO bookings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    start_date = excluded.start_date,
+    end_date = excluded.end_date,
+    utc_offset = excluded.utc_offset,
+    local_start = excluded.local_start,
+    listing_id = excluded.listing_id,
+    owner_id = excluded.owner_id,
+    driver_id = excluded.driver_id,
+    vehicle_id = excluded.vehicle_id,
+    registration = excluded.registration,
+    status = excluded.status,
+    title = excluded.title,
+    booking_type = excluded.booking_type
+"""
+UPSERT_PRICE = """
+INSERT INTO prices VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (booking_id, kind) DO UPDATE SET
+    value = excluded.value,
+    pennies = excluded.pennies,
+    formatted = excluded.formatted
+"""
+
+# Bookings joined to their prices, as a subquery for the aggregates below.
+PRICED = """
+SELECT
+    bookings.*,
+    earnings.pennies AS earnings,
+    paid.pennies AS paid
+FROM bookings
+JOIN prices AS earnings
+    ON earnings.booking_id = bookings.id AND earnings.kind = 'space_owner_earnings'
+JOIN prices AS paid
+    ON paid.booking_id = bookings.id AND paid.kind = 'driver_price'
+"""
+
+# Period starts for an epoch day `day`, weeks starting on Monday.
+PERIODS = {
+    "day": "date(day * 86400, 'unixepoch')",
+    "week": "date((day - (day + 3) % 7) * 86400, 'unixepoch')",
+    "month": "date(day * 86400, 'unixepoch', 'start of month')",
+    "quarter": "date(day * 86400, 'unixepoch', 'start of month', "
+    "printf('-%d months', (strftime('%m', day * 86400, 'unixepoch') - 1) % 3))",
+    "year": "date(day * 86400, 'unixepoch', 'start of year')",
+}
+
+
+class BookingStore:
+    def __init__(self, path: Path | str = ":memory:") -> None:
+        self.connection = sqlite3.connect(path)
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            with self.connection:
+                for table in TABLES:
+                    self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+                self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def upsert(self, bookings: Iterable[Booking], batch_size: int = BATCH_SIZE) -> int:
+        """Insert or update `bookings`, committing once per batch.
+
+        A booking keeps the ordinal it was first inserted at.
+        """
+        count = 0
+        (seen,) = self.connection.execute(
+            "SELECT coalesce(max(seen) + 1, 0) FROM bookings"
+        ).fetchone()
+        bookings = iter(bookings)
+        while batch := list(islice(bookings, batch_size)):
+            with self.connection:
+                self.connection.executemany(
+                    UPSERT_DRIVER, [_driver_values(booking) for booking in batch]
+                )
+                self.connection.executemany(
+                    UPSERT_VEHICLE, [_vehicle_values(booking) for booking in batch]
+                )
+                self.connection.executemany(
+                    UPSERT_BOOKING,
+                    [
+                        _booking_values(booking, seen + position)
+                        for position, booking in enumerate(batch, count)
+                    ],
+                )
+                self.connection.executemany(
+                    UPSERT_PRICE,
+                    [price for booking in batch for price in _price_values(booking)],
+                )
+            count += len(batch)
+        return count
+
+    def earnings(self, today: date) -> dict[str, Any]:
+        """The earnings section, over bookings that are not cancelled."""
+        active = f"""
+            SELECT earnings, local_start / {DAY} AS day
+            FROM ({PRICED}) WHERE status != 'cancelled'
+        """
+        total, tax_year, bookings = self.connection.execute(
+            f"""
+            SELECT
+                coalesce(sum(earnings), 0),
+                coalesce(sum(CASE WHEN day >= ? THEN earnings END), 0),
+                count(*)
+            FROM ({active})
+            """,
+            (epoch_day(tax_year_start(today)),),
+        ).fetchone()
+        return {
+            "total": pounds(total),
+            "taxYear": pounds(tax_year),
+            "bookings": bookings,
+            "periods": {
+                name: [
+                    {"date": period, "value": pounds(value)}
+                    for period, value in self.connection.execute(
+                        f"""
+                        SELECT {key} AS period, sum(earnings)
+                        FROM ({active}) GROUP BY period ORDER BY period
+                        """
+                    )
+                ]
+                for name, key in PERIODS.items()
+            },
+        }
+
+    def drivers(self) -> list[dict[str, Any]]:
+        rows = self.connection.execute(
+            f"""
+            WITH
+                priced AS ({PRICED}),
+                active AS (
+                    SELECT
+                        driver_id,
+                        count(*) AS bookings,
+                        sum(earnings) AS earnings,
+                        sum(paid) AS paid,
+                        sum(end_date - start_date) AS seconds,
+                        max(end_date - start_date) AS longest
+                    FROM priced WHERE status != 'cancelled' GROUP BY driver_id
+                ),
+                first AS (
+                    SELECT driver_id, min(start_date) AS start_date, utc_offset
+                    FROM priced WHERE status != 'cancelled' GROUP BY driver_id
+                ),
+                last AS (
+                    SELECT driver_id, max(start_date) AS start_date, utc_offset
+                    FROM priced WHERE status != 'cancelled' GROUP BY driver_id
+                ),
+                registrations AS (
+                    SELECT
+                        driver_id,
+                        json_group_array(DISTINCT registration) AS list,
+                        min(seen) AS seen
+                    FROM bookings GROUP BY driver_id
+                )
+            SELECT
+                drivers.*,
+                coalesce(active.bookings, 0),
+                (SELECT count(*) FROM bookings
+                 WHERE bookings.driver_id = drivers.id AND status = 'cancelled'),
+                coalesce(active.earnings, 0),
+                coalesce(active.paid, 0),
+                active.seconds,
+                active.longest,
+                first.start_date,
+                first.utc_offset,
+                last.start_date,
+                last.utc_offset,
+                registrations.list
+            FROM drivers
+            JOIN registrations ON registrations.driver_id = drivers.id
+            LEFT JOIN active ON active.driver_id = drivers.id
+            LEFT JOIN first ON first.driver_id = drivers.id
+            LEFT JOIN last ON last.driver_id = drivers.id
+            ORDER BY registrations.seen
+            """
+        )
+        result = []
+        for (
+            driver_id,
+            name,
+            email,
+            phone,
+            company,
+            photo,
+            registered,
+            bookings,
+            cancelled,
+            earned,
+            paid,
+            seconds,
+            longest,
+            first,
+            first_offset,
+            last,
+            last_offset,
+            registrations,
+        ) in rows:
+            result.append(
+                {
+                    "id": driver_id,
+                    "name": name,
+                    "email": email,
+                    "phone": phone,
+                    "company": company,
+                    "profilePhoto": photo,
+                    "registeredAt": registered,
+                    "bookings": bookings,
+                    "cancelled": cancelled,
+                    "earnings": pounds(earned) if bookings else 0,
+                    "paid": pounds(paid) if bookings else 0,
+                    "averageHours": round(seconds / 3600 / bookings, 1)
+                    if bookings
+                    else 0,
+                    "longestHours": round(longest / 3600, 1) if bookings else 0,
+                    "firstBooking": _iso(first, first_offset) if bookings else None,
+                    "lastBooking": _iso(last, last_offset) if bookings else None,
+                    "vehicles": sorted(json.loads(registrations)),
+                }
+            )
+        # Rows come in order of first appearance, so ties keep it
+        return sorted(result, key=lambda row: (-row["earnings"], row["name"]))
+
+    def vehicles(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "id": data_id,
+                "registration": registration,
+                "make": make,
+                "model": model,
+                "colour": colour,
+                "primary": bool(is_primary),
+                "autoPay": bool(auto_pay),
+            }
+            for data_id, registration, make, model, colour, is_primary, auto_pay in (
+                self.connection.execute(
+                    """
+                    SELECT
+                        data_id, registration, make, model, colour, is_primary,
+                        auto_pay
+                    FROM vehicles
+                    WHERE id IN (SELECT vehicle_id FROM bookings)
+                    ORDER BY registration, id
+                    """
+                )
+            )
+        ]
+
+
+def _driver_values(booking: Booking) -> tuple[Any, ...]:
+    driver = booking.driver.data
+    return (
+        booking.driver_id,
+        driver.name,
+        driver.email,
+        driver.phone_number,
+        driver.company_name,
+        driver.profile_photo,
+        driver.registration_date.isoformat(),
+    )
+
+
+def _vehicle_values(booking: Booking) -> tuple[Any, ...]:
+    vehicle = booking.vehicle.data
+    return (
+        booking.vehicle_id,
+        vehicle.id,
+        vehicle.make,
+        vehicle.model,
+        vehicle.registration,
+        vehicle.colour,
+        vehicle.is_primary,
+        vehicle.auto_pay,
+    )
+
+
+def _booking_values(booking: Booking, seen: int) -> tuple[Any, ...]:
+    start = booking.start_date
+    offset = start.utcoffset()
+    return (
+        booking.id,
+        int(start.timestamp()),
+        int(booking.end_date.timestamp()),
+        int(offset.total_seconds()) if offset else 0,
+        wall_seconds(start),
+        booking.listing_id,
+        booking.owner_id,
+        booking.driver_id,
+        booking.vehicle_id,
+        booking.vehicle.data.registration,
+        booking.status,
+        booking.title,
+        booking.booking_type,
+        seen,
+    )
+
+
+def _price_values(booking: Booking) -> list[tuple[Any, ...]]:
+    return [
+        (booking.id, kind, price.value, price.pennies, price.formatted)
+        for kind, price in (
+            ("driver_price", booking.driver_price.data),
+            ("space_owner_earnings", booking.space_owner_earnings.data),
+        )
+    ]
+
+
+def _iso(start: int, offset: int) -> str:
+    return datetime.fromtimestamp(
+        start, timezone(timedelta(seconds=offset))
+    ).isoformat()
@@ -1,5 +1,9 @@
 import json
-from datetime import datetime, timedelta
+import random
+from datetime import UTC, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+LONDON = ZoneInfo("Europe/London")
 
 
 def payload() -> dict:
@@ -81,6 +85,77 @@ def payload() -> dict:
     }
 
 
+def synthetic(
+    bookings: int,
+    drivers: int = 200,
+    seed: int = 0,
+    *,
+    density: float = 1.0,
+    cancelled: float = 0.05,
+    multi_day: float = 0.0,
+    dst: float = 0.0,
+    zone: ZoneInfo | None = None,
+) -> dict:
+    """A reproducible export of `bookings` random bookings.
+
+    `density` scales how many bookings overlap at a time (about 7.5 at 1.0),
+    `cancelled` is the share of cancelled bookings, `multi_day` the share of
+    stays lasting one to fourteen days and `dst` the share placed across a UK
+    clock change. Times are reported in UTC, or in `zone` if given. With the
+    defaults the output is the same for a given seed as before these options.
+    """
+    rng = random.Random(seed)
+    base = datetime.fromisoformat("2022-01-03T07:00:00+00:00")
+    slots = int(bookings * 8 / density)
+    changes = _clock_changes(base.year, (base + timedelta(minutes=15 * slots)).year)
+    items = []
+    for booking_id in range(1, bookings + 1):
+        driver_id = rng.randrange(1, drivers + 1)
+        start = base + timedelta(minutes=15 * rng.randrange(slots))
+        duration = timedelta(minutes=15 * rng.randrange(2, 4 * 30))
+        if multi_day and rng.random() < multi_day:
+            duration += timedelta(days=rng.randrange(1, 15))
+        if dst and rng.random() < dst:
+            change = rng.choice(changes)
+            start = change - timedelta(minutes=15 * rng.randrange(1, 4 * 12))
+            duration = change - start + timedelta(minutes=15 * rng.randrange(1, 4 * 12))
+        end = start + duration
+        if zone:
+            start, end = start.astimezone(zone), end.astimezone(zone)
+        items.append(
+            booking(
+                booking_id,
+                start,
+                end,
+                driver_id,
+                f"Driver {driver_id}",
+                f"driver{driver_id}@example.com",
+                f"07{driver_id:09d}" if driver_id % 4 else None,
+                f"SY{driver_id % 100:02d} {driver_id:03d}",
+                "Ford",
+                "Focus",
+                round(4 + duration.total_seconds() / 3600 * 0.85, 2),
+                "cancelled" if rng.random() < cancelled else "confirmed",
+            )
+        )
+    return {
+        "fetchedAt": "2026-06-28T13:18:00Z",
+        "total": len(items),
+        "items": items,
+    }
+
+
+def _clock_changes(first: int, last: int) -> list[datetime]:
+    """UK clock changes in the years `first` to `last`: 01:00 UTC on the last
+    Sundays of March and October."""
+    changes = []
+    for year in range(first, last + 1):
+        for month in (3, 10):
+            day = datetime(year, month, 31, 1, tzinfo=UTC)
+            changes.append(day - timedelta(days=(day.weekday() + 1) % 7))
+    return changes
+
+
 def booking(
     booking_id: int,
     start: datetime,
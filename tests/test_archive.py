@@ -0,0 +1,82 @@
+import copy
+import io
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from src.bookings.archive import (
+    DirectoryStore,
+    SnapshotArchive,
+    compress,
+    decompress,
+    dumps,
+    open_decompressed,
+)
+from src.bookings.stream import BookingStream
+from src.dashboard import build_dashboard
+from tests.sample_data import synthetic
+
+NOW = datetime(2026, 6, 28, 15, 0, tzinfo=ZoneInfo("Europe/London"))
+
+
+def fetches():
+    """Five consecutive exports with new, changed, removed and repeated bookings."""
+    payload = synthetic(40, drivers=6)
+    history = []
+    for hour in range(5):
+        payload = copy.deepcopy(payload)
+        payload["fetchedAt"] = f"2026-06-28T1{hour}:00:00Z"
+        if hour in (1, 3):
+            payload["items"][hour]["status"] = "cancelled"
+            payload["items"].pop(10 + hour)
+        payload["total"] = len(payload["items"])
+        history.append(payload)
+    return history
+
+
+class SnapshotArchiveTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+
+    def test_rebuilds_every_snapshot(self):
+        archive = SnapshotArchive(DirectoryStore(self.root), max_depth=2)
+        history = fetches()
+        entries = [archive.put(payload) for payload in history]
+
+        self.assertEqual([entry.depth for entry in entries], [0, 1, 1, 2, 2])
+        self.assertEqual(len(list(self.root.glob("*.json.gz"))), 3)
+        for payload in history:
+            at = datetime.fromisoformat(payload["fetchedAt"])
+            self.assertEqual(archive.snapshot(at), payload)
+        self.assertEqual(archive.snapshot(), history[-1])
+        with self.assertRaises(LookupError):
+            archive.snapshot(datetime.fromisoformat("2026-06-28T09:00:00Z"))
+
+    def test_chains_restart_with_a_full_copy(self):
+        archive = SnapshotArchive(DirectoryStore(self.root), max_depth=1)
+        history = fetches()
+        history[2]["items"].append(history[2]["items"][0])
+        entries = [archive.put(payload) for payload in history]
+        self.assertEqual([entry.depth for entry in entries], [0, 1, 0, 1, 1])
+        self.assertEqual(archive.snapshot(), history[-1])
+
+    def test_compressed_exports_read_like_plain_ones(self):
+        raw = dumps(synthetic(30, drivers=5))
+        self.assertEqual(decompress(compress(raw)), raw)
+        self.assertEqual(decompress(raw), raw)
+        for data in (raw, compress(raw)):
+            stream = BookingStream(open_decompressed(io.BytesIO(data)), chunk_size=7)
+            self.assertEqual(len(list(stream)), 30)
+        self.assertEqual(
+            build_dashboard(decompress(compress(raw)), now=NOW),
+            build_dashboard(json.dumps(json.loads(raw), indent=2), now=NOW),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
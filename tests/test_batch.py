@@ -0,0 +1,247 @@
+import email.parser
+import email.policy
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.batch import (
+    Reply,
+    Request,
+    backoff,
+    delete_event,
+    execute,
+    insert_event,
+    patch_event,
+    retryable,
+    urlopen_post,
+)
+
+RATE_LIMITED = {"error": {"errors": [{"reason": "rateLimitExceeded"}]}}
+FORBIDDEN = {"error": {"errors": [{"reason": "forbidden"}]}}
+
+
+class FakeBatchEndpoint(ThreadingHTTPServer):
+    """A batch endpoint that answers each call from a script of statuses.
+
+    `script` maps a request id to the statuses to answer it with, in turn;
+    calls not in it, and calls past the end of their script, succeed.
+    `failed_posts` whole POSTs are answered 503 before any call is read.
+    """
+
+    def __init__(self, script=None, failed_posts=0, delay=0.0):
+        super().__init__(("127.0.0.1", 0), BatchHandler)
+        self.script = {key: list(value) for key, value in (script or {}).items()}
+        self.failed_posts = failed_posts
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.chunks = []
+        self.calls = []
+        self.in_flight = self.most_in_flight = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/batch/calendar/v3"
+
+    def answer(self, request_id):
+        with self.lock:
+            statuses = self.script.get(request_id)
+            return statuses.pop(0) if statuses else 200
+
+
+class BatchHandler(BaseHTTPRequestHandler):
+    server: FakeBatchEndpoint
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with server.lock:
+            server.in_flight += 1
+            server.most_in_flight = max(server.most_in_flight, server.in_flight)
+            failed = server.failed_posts > 0
+            server.failed_posts -= failed
+        time.sleep(server.delay)
+        try:
+            if failed:
+                self.respond(503, "application/json", b'{"error": {}}')
+                return
+            parts = self.parts(body)
+            with server.lock:
+                server.chunks.append([request_id for request_id, _ in parts])
+                server.calls += [request for _, request in parts]
+            boundary = "batch_reply"
+            lines = []
+            for request_id, _ in parts:
+                status = server.answer(request_id)
+                reply = RATE_LIMITED if status == 403 else {"id": request_id}
+                lines += [
+                    f"--{boundary}",
+                    "Content-Type: application/http",
+                    f"Content-ID: <response-{request_id}>",
+                    "",
+                    f"HTTP/1.1 {status} Status",
+                    "Content-Type: application/json; charset=UTF-8",
+                    "",
+                    json.dumps(reply),
+                ]
+            lines += [f"--{boundary}--", ""]
+            self.respond(
+                200,
+                f"multipart/mixed; boundary={boundary}",
+                "\r\n".join(lines).encode(),
+            )
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def parts(self, body):
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        parts = []
+        for part in message.iter_parts():
+            request_line = part.get_payload(decode=True).decode().splitlines()[0]
+            parts.append((str(part["Content-ID"]).strip("<>"), request_line))
+        return parts
+
+    def respond(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def deletes(count):
+    return {
+        f"event{number}": delete_event("cal", f"event{number}")
+        for number in range(count)
+    }
+
+
+class ExecuteTest(unittest.TestCase):
+    def setUp(self):
+        self.delays = []
+
+    def run_batches(self, endpoint, requests, post=urlopen_post, **options):
+        self.addCleanup(endpoint.server_close)
+        self.addCleanup(endpoint.shutdown)
+        return execute(
+            requests, post, endpoint.url, sleep=self.delays.append, **options
+        )
+
+    def test_splits_into_chunks_sent_concurrently(self):
+        endpoint = FakeBatchEndpoint(delay=0.05)
+        result = self.run_batches(endpoint, deletes(230), chunk_size=50, workers=3)
+        self.assertEqual(len(result.succeeded), 230)
+        self.assertEqual((result.failed, result.rounds, result.retried), ({}, 1, 0))
+        self.assertEqual(
+            sorted(len(chunk) for chunk in endpoint.chunks), [30, 50, 50, 50, 50]
+        )
+        self.assertIn(endpoint.most_in_flight, (2, 3))
+        self.assertEqual(result.succeeded["event7"], Reply(200, {"id": "event7"}))
+        self.assertEqual(self.delays, [])
+
+    def test_retries_rate_limits_and_server_errors(self):
+        endpoint = FakeBatchEndpoint({"event1": [429], "event2": [503, 403]})
+        result = self.run_batches(endpoint, deletes(4))
+        self.assertEqual(len(result.succeeded), 4)
+        self.assertEqual((result.rounds, result.retried), (3, 3))
+        self.assertEqual(
+            endpoint.chunks,
+            [[f"event{n}" for n in range(4)], ["event1", "event2"], ["event2"]],
+        )
+        self.assertEqual(len(self.delays), 2)
+
+    def test_gives_up_after_attempts(self):
+        endpoint = FakeBatchEndpoint({"event0": [500] * 5, "event1": [400]})
+        result = self.run_batches(endpoint, deletes(3), attempts=3)
+        self.assertEqual(list(result.succeeded), ["event2"])
+        self.assertEqual(
+            {key: reply.status for key, reply in result.failed.items()},
+            {"event0": 500, "event1": 400},
+        )
+        self.assertEqual(result.rounds, 3)
+
+    def test_retries_failed_posts(self):
+        endpoint = FakeBatchEndpoint(failed_posts=1)
+        result = self.run_batches(endpoint, deletes(2))
+        self.assertEqual(len(result.succeeded), 2)
+        self.assertEqual((result.rounds, result.retried), (2, 2))
+
+    def test_retries_posts_raising_given_errors(self):
+        class TransportError(Exception):
+            pass
+
+        posts = []
+
+        def post(url, body, headers):
+            posts.append(url)
+            if len(posts) == 1:
+                raise TransportError("Unable to find the server")
+            return urlopen_post(url, body, headers)
+
+        endpoint = FakeBatchEndpoint()
+        result = self.run_batches(
+            endpoint, deletes(2), post, errors=(OSError, TransportError)
+        )
+        self.assertEqual(len(result.succeeded), 2)
+        self.assertEqual((result.rounds, result.retried), (2, 2))
+        posts.clear()
+        with self.assertRaises(TransportError):
+            execute(deletes(1), post, endpoint.url)
+
+    def test_deletes_of_missing_events_succeed(self):
+        endpoint = FakeBatchEndpoint({"event0": [404], "event1": [410], "patch": [404]})
+        requests = {**deletes(2), "patch": patch_event("cal", "event2", {})}
+        result = self.run_batches(endpoint, requests)
+        self.assertEqual(sorted(result.succeeded), ["event0", "event1"])
+        self.assertEqual(result.succeeded["event0"].status, 404)
+        self.assertEqual(list(result.failed), ["patch"])
+        self.assertEqual(result.rounds, 1)
+
+    def test_requests_reach_the_api_paths(self):
+        endpoint = FakeBatchEndpoint()
+        requests = {
+            "insert": insert_event("a@group.calendar.google.com", {"summary": "x"}),
+            "patch": patch_event("primary", "event 1", {"summary": "y"}),
+            "delete": delete_event("primary", "event2"),
+        }
+        self.run_batches(endpoint, requests)
+        self.assertEqual(
+            endpoint.calls,
+            [
+                "POST /calendar/v3/calendars/a%40group.calendar.google.com/events HTTP/1.1",
+                "PATCH /calendar/v3/calendars/primary/events/event%201 HTTP/1.1",
+                "DELETE /calendar/v3/calendars/primary/events/event2 HTTP/1.1",
+            ],
+        )
+
+
+class RetryTest(unittest.TestCase):
+    def test_retryable(self):
+        self.assertTrue(retryable(Reply(429)))
+        self.assertTrue(retryable(Reply(503)))
+        self.assertTrue(retryable(Reply(0, "connection refused")))
+        self.assertTrue(retryable(Reply(403, RATE_LIMITED)))
+        self.assertFalse(retryable(Reply(403, FORBIDDEN)))
+        self.assertFalse(retryable(Reply(404)))
+
+    def test_backoff_grows_and_is_capped(self):
+        for retry, ceiling in ((1, 1.0), (3, 4.0), (10, 32.0)):
+            delays = [backoff(retry) for _ in range(200)]
+            self.assertTrue(all(0 <= delay <= ceiling for delay in delays))
+            self.assertGreater(max(delays), ceiling / 2)
+
+    def test_request_without_body(self):
+        self.assertEqual(delete_event("cal", "e").body, None)
+        self.assertIsInstance(insert_event("cal", {}), Request)
+
+
+if __name__ == "__main__":
+    unittest.main()
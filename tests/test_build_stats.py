@@ -0,0 +1,84 @@
+import io
+import json
+import tracemalloc
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src.build_stats import BuildStats
+from src.dashboard import (
+    build_dashboard,
+    build_dashboard_incremental,
+    build_dashboard_stream,
+    content_hash,
+)
+from src.state import DashboardState
+from tests.sample_data import synthetic
+
+NOW = datetime(2026, 6, 28, 15, 0, tzinfo=ZoneInfo("Europe/London"))
+SECTIONS = [
+    "section.summary",
+    "section.bookings",
+    "section.earnings",
+    "section.occupancy",
+    "section.drivers",
+    "section.driverHighlights",
+    "section.vehicles",
+]
+
+
+class BuildStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.raw = json.dumps(synthetic(200, drivers=10)).encode()
+
+    def test_stages_of_each_build(self):
+        plain = build_dashboard(self.raw, now=NOW)
+        builds = {
+            "full": lambda stats: build_dashboard(self.raw, now=NOW, stats=stats),
+            "stream": lambda stats: build_dashboard_stream(
+                io.BytesIO(self.raw), now=NOW, stats=stats
+            ),
+            "incremental": lambda stats: build_dashboard_incremental(
+                io.BytesIO(self.raw), DashboardState(), now=NOW, stats=stats
+            )[0],
+        }
+        for name, build in builds.items():
+            with self.subTest(name):
+                stats = BuildStats()
+                self.assertEqual(build(stats), plain)
+                self.assertEqual(
+                    [stage for stage in stats.stages if stage.startswith("section.")],
+                    SECTIONS,
+                )
+                self.assertIn("decode", stats.stages)
+                self.assertTrue(
+                    all(s.peak_bytes is None for s in stats.stages.values())
+                )
+
+    def test_memory_and_block(self):
+        stats = BuildStats(memory=True)
+        self.addCleanup(tracemalloc.stop)
+        dashboard = build_dashboard(self.raw, now=NOW, stats=stats)
+        block = stats.as_dict()
+        self.assertGreater(block["stages"]["decode"]["peakBytes"], len(self.raw))
+        self.assertAlmostEqual(
+            block["totalSeconds"],
+            sum(stage["seconds"] for stage in block["stages"].values()),
+            places=5,
+        )
+        self.assertIn("section.occupancy", stats.report())
+        self.assertEqual(
+            content_hash({**dashboard, "buildStats": block}), content_hash(dashboard)
+        )
+
+    def test_repeated_stages_add_up(self):
+        stats = BuildStats()
+        for _ in range(3):
+            with stats.stage("encode.json"):
+                json.dumps(list(range(1000)))
+        self.assertEqual(list(stats.stages), ["encode.json"])
+        self.assertGreater(stats.stages["encode.json"].seconds, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
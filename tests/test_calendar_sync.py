@@ -0,0 +1,203 @@
+import unittest
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from src.bookings.models import Booking
+from src.calendar_sync import EventIndex, SyncTokenExpired, booking_to_event, reconcile
+from tests.sample_data import booking
+
+LONDON = ZoneInfo("Europe/London")
+
+
+def event(number, day=10, status="confirmed"):
+    return {
+        "id": f"event{number}",
+        "status": status,
+        "etag": f'"{number}"',
+        "summary": f"SY{number:02d} ABC",
+        "start": {"dateTime": f"2026-07-{day:02d}T09:00:00+01:00"},
+        "end": {"dateTime": f"2026-07-{day:02d}T17:00:00+01:00"},
+        "extendedProperties": {
+            "private": {"booking_id": str(number), "data_hash": f"hash{number}"}
+        },
+    }
+
+
+class FakeCalendar:
+    """events().list paging and sync tokens, like the Calendar API."""
+
+    def __init__(self, events, page_size=3):
+        self.events = {item["id"]: item for item in events}
+        self.page_size = page_size
+        self.changes = []
+        self.generation = 0
+        self.expired = False
+        self.requests = []
+
+    def change(self, item):
+        self.events[item["id"]] = item
+        self.changes.append(item)
+
+    def list_page(self, params):
+        self.requests.append(params)
+        if "syncToken" in params:
+            if self.expired or params["syncToken"] != f"token{self.generation}":
+                raise SyncTokenExpired
+            items = self.changes
+        else:
+            items = [
+                item for item in self.events.values() if item["status"] != "cancelled"
+            ]
+        start = int(params.get("pageToken", 0))
+        page = {"items": items[start : start + self.page_size]}
+        if start + self.page_size < len(items):
+            page["nextPageToken"] = str(start + self.page_size)
+        else:
+            self.generation += 1
+            self.changes = []
+            page["nextSyncToken"] = f"token{self.generation}"
+        return page
+
+
+class EventIndexTest(unittest.TestCase):
+    def test_full_then_incremental_sync(self):
+        calendar = FakeCalendar([event(number) for number in range(8)])
+        index = EventIndex()
+        sync = index.sync(calendar.list_page)
+        self.assertEqual((sync.full, sync.pages, sync.changed), (True, 3, 8))
+        self.assertEqual(len(index.events), 8)
+        self.assertNotIn("etag", index.events["event0"])
+
+        calendar.change(event(2, status="cancelled"))
+        calendar.change({**event(3), "summary": "Renamed"})
+        calendar.change(event(9))
+        index = EventIndex.loads(index.dumps())
+        sync = index.sync(calendar.list_page)
+        self.assertEqual(
+            (sync.full, sync.pages, sync.changed, sync.removed), (False, 1, 2, 1)
+        )
+        self.assertEqual(calendar.requests[-1], {"syncToken": "token1"})
+        self.assertNotIn("event2", index.events)
+        self.assertEqual(index.events["event3"]["summary"], "Renamed")
+        self.assertIn("event9", index.events)
+        self.assertEqual(index.token, "token2")
+
+    def test_expired_token_falls_back_to_full_sync(self):
+        calendar = FakeCalendar([event(number) for number in range(4)])
+        index = EventIndex()
+        index.sync(calendar.list_page)
+        index.events["stale"] = event(99)
+        calendar.expired = True
+        sync = index.sync(calendar.list_page)
+        self.assertTrue(sync.full)
+        self.assertNotIn("stale", index.events)
+        self.assertEqual(len(index.events), 4)
+
+    def test_events_after(self):
+        index = EventIndex(
+            {
+                "event1": event(1, day=9),
+                "event2": event(2, day=10),
+                "allday": {"id": "allday", "end": {"date": "2026-07-11"}},
+            }
+        )
+        self.assertEqual(
+            [item["id"] for item in index.events_after(date(2026, 7, 10), LONDON)],
+            ["event2", "allday"],
+        )
+
+    def test_other_versions_start_empty(self):
+        index = EventIndex.loads(b'{"version": 0, "events": {"a": {}}}')
+        self.assertEqual((index.events, index.token), ({}, None))
+
+
+def sample(number, phone="07700 900000", status="confirmed", hours=8):
+    start = datetime(2026, 7, 10, 9, tzinfo=LONDON)
+    return Booking.model_validate(
+        booking(
+            number,
+            start,
+            start + timedelta(hours=hours),
+            number,
+            "Ada Lovelace",
+            "ada@example.com",
+            phone,
+            f"SY{number:02d} ABC",
+            "Ford",
+            "Focus",
+            40.0,
+            status,
+        )
+    )
+
+
+def stored(item, event_id=None):
+    """The event the calendar holds for `item`, as the API returns it."""
+    desired = booking_to_event(item)
+    private = desired["extendedProperties"]["private"]
+    return {
+        **desired,
+        "id": event_id or f"event{item.id}",
+        "extendedProperties": {
+            "private": {name: str(value) for name, value in private.items()}
+        },
+    }
+
+
+class ReconcileTest(unittest.TestCase):
+    def test_unchanged_events_are_left_alone(self):
+        bookings = [sample(1), sample(2)]
+        plan = reconcile(bookings, [stored(item) for item in bookings])
+        self.assertEqual(plan, ([], {}, []))
+
+    def test_patches_only_changed_fields(self):
+        plan = reconcile([sample(1, phone="07700 900123")], [stored(sample(1))])
+        self.assertEqual(list(plan.patch), ["event1"])
+        self.assertEqual(
+            set(plan.patch["event1"]), {"description", "extendedProperties"}
+        )
+        self.assertIn("07700 900123", plan.patch["event1"]["description"])
+        self.assertEqual((plan.insert, plan.delete), ([], []))
+
+    def test_times_compare_as_instants(self):
+        event = stored(sample(1))
+        event["start"] = {
+            "dateTime": "2026-07-10T08:00:00Z",
+            "timeZone": "Europe/London",
+        }
+        event["extendedProperties"]["private"]["data_hash"] = "stale"
+        plan = reconcile([sample(1)], [event])
+        self.assertEqual(list(plan.patch["event1"]), ["extendedProperties"])
+
+        plan = reconcile([sample(1, hours=9)], [stored(sample(1))])
+        self.assertEqual(
+            set(plan.patch["event1"]), {"end", "description", "extendedProperties"}
+        )
+
+    def test_inserts_and_deletes(self):
+        bookings = [sample(1), sample(2, status="cancelled"), sample(3)]
+        events = [
+            stored(sample(2)),
+            stored(sample(3)),
+            stored(sample(3), event_id="duplicate"),
+            stored(sample(4)),
+            {"id": "personal", "summary": "Dentist"},
+        ]
+        plan = reconcile(bookings, events)
+        self.assertEqual(
+            [
+                item["extendedProperties"]["private"]["booking_id"]
+                for item in plan.insert
+            ],
+            [1],
+        )
+        self.assertEqual(plan.patch, {})
+        self.assertEqual(plan.delete, ["duplicate", "event2", "event4"])
+
+    def test_cancelled_without_event_is_skipped(self):
+        plan = reconcile([sample(1, status="cancelled")], [])
+        self.assertEqual(plan, ([], {}, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import gzip
+import json
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src import columnar
+from src.dashboard import build_dashboard, shard_dashboard
+from tests.sample_data import payload, synthetic
+
+NOW = datetime(2026, 6, 28, 15, 0, tzinfo=ZoneInfo("Europe/London"))
+
+
+class ColumnarTest(unittest.TestCase):
+    def test_round_trips_dashboards(self):
+        for data in (payload(), synthetic(400, drivers=12), synthetic(0)):
+            dashboard = build_dashboard(json.dumps(data), now=NOW)
+            encoded = columnar.encode(dashboard)
+            self.assertEqual(encoded["schemaVersion"], 3)
+            self.assertEqual(encoded["bookings"]["length"], len(dashboard["bookings"]))
+            self.assertEqual(
+                columnar.decode(json.loads(json.dumps(encoded))), dashboard
+            )
+
+    def test_keeps_reported_offsets_across_daylight_saving(self):
+        dashboard = build_dashboard(json.dumps(payload()), now=NOW)
+        tables = dashboard["drivers"], dashboard["vehicles"]
+        rows = dashboard["bookings"][:2]
+        rows[0] = {**rows[0], "start": "2026-03-29T00:30:00+00:00"}
+        rows[1] = {**rows[1], "end": "2026-03-29T02:30:00+01:00"}
+        block = columnar.encode_rows(rows, *tables)
+        columns = block["columns"]
+        self.assertEqual(columns["end"][1] - columns["start"][0], 3600)
+        self.assertEqual(
+            (columns["startOffset"][0], columns["endOffset"][1]), (0, 3600)
+        )
+        self.assertEqual(columnar.decode_rows(block, *tables), rows)
+
+    def test_refers_to_drivers_and_vehicles(self):
+        dashboard = build_dashboard(json.dumps(payload()), now=NOW)
+        block = columnar.encode(dashboard)["bookings"]
+        self.assertEqual(block["overrides"], {})
+        self.assertNotIn("driverName", block["columns"])
+        for row, driver, vehicle in zip(
+            dashboard["bookings"],
+            block["columns"]["driverIndex"],
+            block["columns"]["vehicleIndex"],
+        ):
+            self.assertEqual(dashboard["drivers"][driver]["id"], row["driverId"])
+            self.assertEqual(dashboard["vehicles"][vehicle]["id"], row["vehicleId"])
+
+    def test_keeps_details_that_have_since_changed(self):
+        data = payload()
+        data["items"][0]["driver"]["data"]["phone_number"] = "07700 900000"
+        data["items"][0]["vehicle"]["data"]["colour"] = "Mauve"
+        dashboard = build_dashboard(json.dumps(data), now=NOW)
+        encoded = json.loads(json.dumps(columnar.encode(dashboard)))
+        self.assertEqual(
+            {
+                key: len(pairs)
+                for key, pairs in encoded["bookings"]["overrides"].items()
+            },
+            {"driverPhone": 1, "vehicleColour": 1},
+        )
+        self.assertEqual(columnar.decode(encoded), dashboard)
+
+    def test_shards_round_trip(self):
+        dashboard = build_dashboard(json.dumps(payload()), now=NOW)
+        index, shards = shard_dashboard(dashboard)
+        self.assertEqual(columnar.encode(index)["schemaVersion"], 3)
+        self.assertEqual(columnar.decode(columnar.encode(index)), index)
+        for shard in shards.values():
+            encoded = columnar.encode(shard, index)
+            self.assertEqual(encoded["schemaVersion"], 2)
+            self.assertEqual(columnar.decode(encoded, index), shard)
+            with self.assertRaises(ValueError):
+                columnar.encode(shard)
+
+    def test_shards_only_decode_against_their_own_index(self):
+        dashboard = build_dashboard(json.dumps(payload()), now=NOW)
+        index, shards = shard_dashboard(dashboard)
+        encoded = columnar.encode(index)
+        # A later build that orders the drivers differently
+        rebuilt = {**index, "drivers": index["drivers"][::-1]}
+        for shard in shards.values():
+            block = columnar.encode(shard, encoded)
+            self.assertEqual(block["tablesVersion"], encoded["tablesVersion"])
+            self.assertNotEqual(
+                block["tablesVersion"], columnar.encode(rebuilt)["tablesVersion"]
+            )
+            with self.assertRaises(ValueError):
+                columnar.decode(block, rebuilt)
+
+    def test_smaller_than_rows(self):
+        dashboard = build_dashboard(json.dumps(synthetic(2000, drivers=40)), now=NOW)
+        rows = json.dumps(dashboard["bookings"]).encode()
+        block = columnar.encode_rows(
+            dashboard["bookings"], dashboard["drivers"], dashboard["vehicles"]
+        )
+        columns = json.dumps(block).encode()
+        self.assertLess(len(columns), len(rows) / 2)
+        self.assertLess(len(gzip.compress(columns)), len(gzip.compress(rows)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,8 +3,13 @@ import unittest
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from src.dashboard import build_dashboard, tax_year_start
-from tests.sample_data import payload
+from src.dashboard import (
+    build_dashboard,
+    content_hash,
+    shard_dashboard,
+    tax_year_start,
+)
+from tests.sample_data import payload, synthetic
 
 
 class DashboardTest(unittest.TestCase):
@@ -49,6 +54,66 @@ class DashboardTest(unittest.TestCase):
         self.assertEqual(highlights["longestStay"]["hours"], 19)
         self.assertGreater(highlights["repeatRate"], 0.5)
 
+    def test_bookings_shard_by_month(self):
+        index, shards = shard_dashboard(self.dashboard)
+        self.assertNotIn("bookings", index)
+        self.assertEqual(index["summary"], self.dashboard["summary"])
+        self.assertEqual(list(shards), ["2026-02", "2026-03", "2026-04", "2026-05"])
+        self.assertEqual(
+            index["bookingMonths"],
+            [
+                {"month": month, "count": len(shard["bookings"])}
+                for month, shard in shards.items()
+            ],
+        )
+        self.assertEqual(
+            [row for shard in shards.values() for row in shard["bookings"]],
+            self.dashboard["bookings"],
+        )
+        self.assertTrue(
+            all(
+                row["start"].startswith(month)
+                for month, shard in shards.items()
+                for row in shard["bookings"]
+            )
+        )
+
+    def test_bookings_shard_by_london_month(self):
+        dashboard = {
+            "generatedAt": "2026-06-01T00:00:00+01:00",
+            "bookings": [
+                {"id": 1, "start": "2026-04-30T23:30:00+00:00"},
+                {"id": 2, "start": "2026-04-30T22:30:00+00:00"},
+                {"id": 3, "start": "2026-01-31T23:30:00+00:00"},
+            ],
+        }
+        index, shards = shard_dashboard(dashboard)
+        self.assertEqual(
+            {
+                month: [row["id"] for row in shard["bookings"]]
+                for month, shard in shards.items()
+            },
+            {"2026-01": [3], "2026-04": [2], "2026-05": [1]},
+        )
+        self.assertEqual(
+            index["bookingMonths"],
+            [
+                {"month": "2026-01", "count": 1},
+                {"month": "2026-04", "count": 1},
+                {"month": "2026-05", "count": 1},
+            ],
+        )
+
+    def test_content_hash_ignores_build_timestamps(self):
+        rebuilt = {
+            **json.loads(json.dumps(self.dashboard, indent=2)),
+            "fetchedAt": "2026-06-28T15:05:00+00:00",
+            "generatedAt": "2026-06-28T15:06:00+01:00",
+        }
+        self.assertEqual(content_hash(rebuilt), content_hash(self.dashboard))
+        rebuilt["summary"] = {**rebuilt["summary"], "cancelled": 2}
+        self.assertNotEqual(content_hash(rebuilt), content_hash(self.dashboard))
+
     def test_uk_tax_year(self):
         self.assertEqual(str(tax_year_start(datetime(2026, 4, 5).date())), "2025-04-06")
         self.assertEqual(str(tax_year_start(datetime(2026, 4, 6).date())), "2026-04-06")
@@ -63,6 +128,32 @@ class DashboardTest(unittest.TestCase):
         self.assertEqual(empty["occupancy"]["minutes"], [])
         self.assertEqual(empty["driverHighlights"], {})
 
+    def test_all_cancelled(self):
+        data = synthetic(5, drivers=2)
+        for item in data["items"]:
+            item["status"] = "cancelled"
+        dashboard = build_dashboard(json.dumps(data))
+        self.assertEqual(dashboard["summary"]["cancelled"], 5)
+        for driver in dashboard["drivers"]:
+            self.assertEqual((driver["bookings"], driver["earnings"]), (0, 0))
+            self.assertIsNone(driver["firstBooking"])
+
+    def test_drivers_keep_export_order_and_booked_vehicles(self):
+        data = synthetic(6, drivers=3)
+        for number, item in enumerate(data["items"]):
+            driver_id = 9 - number % 3
+            item["driver_id"] = item["vehicle_id"] = driver_id
+            item["driver"]["data"] = {**item["driver"]["data"], "id": driver_id}
+            item["driver"]["data"]["name"] = "Same Name"
+            item["vehicle"]["data"] = {**item["vehicle"]["data"], "id": driver_id}
+            item["vehicle"]["data"]["registration"] = f"REG{number}"
+            for price in ("space_owner_earnings", "driver_price"):
+                item[price]["data"].update(value=10.0, pennies=1000)
+        drivers = build_dashboard(json.dumps(data))["drivers"]
+        self.assertEqual([driver["id"] for driver in drivers], [9, 8, 7])
+        self.assertEqual(drivers[0]["vehicles"], ["REG0", "REG3"])
+        self.assertIsInstance(drivers[0]["earnings"], float)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,41 @@
+import json
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src.bookings.decode import SlimBookingResponse, decode
+from src.bookings.models import BookingResponse
+from src.dashboard import build_dashboard
+from tests.sample_data import payload, synthetic
+
+NOW = datetime(2026, 6, 28, 15, 0, tzinfo=ZoneInfo("Europe/London"))
+
+
+class DecodeTest(unittest.TestCase):
+    def test_modes(self):
+        raw = json.dumps(payload())
+        self.assertIsInstance(decode(raw, "full"), BookingResponse)
+        self.assertIsInstance(decode(raw, "fast"), SlimBookingResponse)
+        with self.assertRaises(ValueError):
+            decode(raw, "lazy")
+
+    def test_fast_dashboard_matches_full(self):
+        for data in (payload(), synthetic(500, drivers=20)):
+            raw = json.dumps(data)
+            self.assertEqual(
+                build_dashboard(raw, now=NOW, mode="fast"),
+                build_dashboard(raw, now=NOW, mode="full"),
+            )
+
+    def test_slim_fields_match_full_models(self):
+        raw = json.dumps(payload())
+        for slim, full in zip(decode(raw, "fast").items, decode(raw, "full").items):
+            for name in ("vehicle", "driver", "driver_price", "space_owner_earnings"):
+                view = getattr(slim, name).data._asdict()
+                self.assertEqual(
+                    view, getattr(full, name).data.model_dump(include=set(view))
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
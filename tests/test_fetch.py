@@ -0,0 +1,213 @@
+import asyncio
+import copy
+import json
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+from src.bookings.fetch import (
+    Page,
+    UnsortedPages,
+    fetch_changes,
+    fetch_pages,
+    merge,
+    page_getter,
+    parse_page,
+    session_cookies,
+)
+
+PER_PAGE = 10
+
+
+class StandIn(ThreadingHTTPServer):
+    """Serves `items` in pages, later pages answering sooner than earlier ones."""
+
+    daemon_threads = True
+
+    def __init__(self, items, with_meta=True):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.items = items
+        self.with_meta = with_meta
+        self.requested = []
+        self.cookies = set()
+        self.status = 200
+        self.in_flight = self.peak = 0
+        self.lock = threading.Lock()
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: StandIn
+
+    def do_GET(self):
+        if self.server.status != 200:
+            self.send_error(self.server.status)
+            return
+        page_no = int(parse_qs(urlparse(self.path).query)["page"][0])
+        with self.server.lock:
+            self.server.requested.append(page_no)
+            self.server.cookies.add(self.headers.get("Cookie"))
+            self.server.in_flight += 1
+            self.server.peak = max(self.server.peak, self.server.in_flight)
+        time.sleep(0.05 / page_no)
+        items = self.server.items[(page_no - 1) * PER_PAGE : page_no * PER_PAGE]
+        body = {"data": items}
+        if self.server.with_meta:
+            body["meta"] = {"pagination": {"total": len(self.server.items)}}
+        raw = json.dumps(body).encode()
+        with self.server.lock:
+            self.server.in_flight -= 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def api(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/api/v5/bookings/received"
+
+
+def fetch(server, max_pages=100, concurrency=3, previous=None):
+    url = api(server)
+
+    def get(page_no: int) -> Page:
+        with urllib.request.urlopen(f"{url}?page={page_no}") as response:
+            return parse_page(json.load(response), PER_PAGE)
+
+    async def get_page(page_no: int) -> Page:
+        return await asyncio.to_thread(get, page_no)
+
+    if previous is not None:
+        return asyncio.run(fetch_changes(get_page, previous, max_pages))
+    return asyncio.run(fetch_pages(get_page, max_pages, concurrency))
+
+
+class FetchPagesTest(unittest.TestCase):
+    def serve(self, items, with_meta=True):
+        server = StandIn(items, with_meta)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_pages_in_order_with_bounded_concurrency(self):
+        items = [{"id": booking_id} for booking_id in range(95)]
+        server = self.serve(items)
+        self.assertEqual(fetch(server), items)
+        self.assertEqual(sorted(server.requested), list(range(1, 11)))
+        self.assertEqual(server.requested[0], 1)
+        self.assertLessEqual(server.peak, 3)
+        self.assertGreater(server.peak, 1)
+
+    def test_without_page_count(self):
+        items = [{"id": booking_id} for booking_id in range(45)]
+        server = self.serve(items, with_meta=False)
+        self.assertEqual(fetch(server), items)
+        self.assertLessEqual(max(server.requested), 7)
+        self.assertLessEqual(server.peak, 3)
+
+    def test_shifted_items_are_dropped_and_max_pages_is_respected(self):
+        items = [{"id": booking_id} for booking_id in range(30)]
+        items.insert(10, {"id": 9})
+        server = self.serve(items)
+        self.assertEqual(fetch(server, max_pages=2), items[:10] + items[11:20])
+        self.assertEqual(sorted(server.requested), [1, 2])
+
+    def test_incremental_sync_stops_at_the_first_unchanged_page(self):
+        previous = [{"id": booking_id, "status": "booked"} for booking_id in range(60)]
+        latest = [
+            {"id": booking_id, "status": "booked"} for booking_id in range(63, 60, -1)
+        ]
+        latest += copy.deepcopy(previous)
+        latest[8]["status"] = "cancelled"
+        server = self.serve(latest)
+
+        changes = fetch(server, previous=previous)
+        self.assertEqual(changes, latest[:20])
+        self.assertEqual(server.requested, [1, 2])
+        self.assertEqual(merge(changes, previous), latest)
+
+    def test_incremental_sync_rejects_oldest_first_pages(self):
+        previous = [{"id": booking_id} for booking_id in range(30)]
+        server = self.serve([*previous, {"id": 30}])
+        with self.assertRaises(UnsortedPages):
+            fetch(server, previous=previous)
+        self.assertEqual(server.requested, [1])
+
+    def test_incremental_sync_from_an_empty_snapshot_reads_every_page(self):
+        items = [{"id": booking_id} for booking_id in range(25)]
+        server = self.serve(items)
+        self.assertEqual(fetch(server, previous=[]), items)
+        self.assertEqual(server.requested, [1, 2, 3])
+
+    def test_session_cookies_with_a_pooled_client(self):
+        items = [{"id": booking_id} for booking_id in range(25)]
+        server = self.serve(items)
+        state = {
+            "cookies": [
+                {
+                    "name": "session",
+                    "value": "abc",
+                    "domain": "127.0.0.1",
+                    "path": "/",
+                    "expires": -1,
+                },
+                {
+                    "name": "remember",
+                    "value": "xyz",
+                    "domain": "127.0.0.1",
+                    "path": "/",
+                    "expires": 2000.0,
+                },
+                {
+                    "name": "old",
+                    "value": "gone",
+                    "domain": "127.0.0.1",
+                    "path": "/",
+                    "expires": 500.0,
+                },
+            ],
+            "origins": [],
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "session_state.json"
+            path.write_text(json.dumps(state))
+            cookies = session_cookies(path, now=1000.0)
+        self.assertEqual([cookie.name for cookie in cookies], ["session", "remember"])
+
+        async def run():
+            jar = httpx.Cookies()
+            for cookie in cookies:
+                jar.set(*cookie)
+            limits = httpx.Limits(max_connections=2)
+            async with httpx.AsyncClient(cookies=jar, limits=limits) as client:
+                get_page = page_getter(client, api(server), PER_PAGE, {"include": "x"})
+                return await fetch_pages(get_page, 100, concurrency=2)
+
+        self.assertEqual(asyncio.run(run()), items)
+        self.assertEqual(server.cookies, {"session=abc; remember=xyz"})
+
+    def test_http_errors_are_raised(self):
+        server = self.serve([])
+        server.status = 401
+
+        async def run():
+            async with httpx.AsyncClient() as client:
+                return await page_getter(client, api(server), PER_PAGE)(1)
+
+        with self.assertRaisesRegex(RuntimeError, "HTTP 401 on page 1"):
+            asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
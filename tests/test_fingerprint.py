@@ -0,0 +1,79 @@
+import copy
+import json
+import unittest
+
+from src.bookings.decode import decode
+from src.bookings.models import Booking
+from src.calendar_sync import booking_to_event
+from src.fingerprint import (
+    CALENDAR_FIELDS,
+    DASHBOARD_FIELDS,
+    Fingerprints,
+    fingerprint,
+)
+from tests.sample_data import synthetic
+
+
+class FingerprintTest(unittest.TestCase):
+    def setUp(self):
+        self.item = synthetic(1, drivers=1)["items"][0]
+
+    def calendar(self, item):
+        return fingerprint(Booking.model_validate(item), CALENDAR_FIELDS)
+
+    def test_unrendered_fields_are_ignored(self):
+        changed = copy.deepcopy(self.item)
+        changed["photos"] = ["https://example.com/drive.jpg"]
+        changed["driver"]["data"]["profile_photo"] = "https://example.com/me.jpg"
+        self.assertEqual(self.calendar(changed), self.calendar(self.item))
+        self.assertNotEqual(
+            fingerprint(changed, DASHBOARD_FIELDS),
+            fingerprint(self.item, DASHBOARD_FIELDS),
+        )
+
+    def test_rendered_fields_are_hashed(self):
+        for path in CALENDAR_FIELDS[3:]:
+            changed = copy.deepcopy(self.item)
+            parent = changed
+            for name in path[:-1]:
+                parent = parent[name]
+            parent[path[-1]] = "changed"
+            with self.subTest(path=path):
+                self.assertNotEqual(
+                    fingerprint(changed, CALENDAR_FIELDS),
+                    fingerprint(self.item, CALENDAR_FIELDS),
+                )
+
+    def test_decode_modes_agree(self):
+        raw = json.dumps(synthetic(5, drivers=2))
+        full, fast = decode(raw, "full").items, decode(raw, "fast").items
+        self.assertEqual(
+            [fingerprint(booking, CALENDAR_FIELDS) for booking in full],
+            [fingerprint(booking, CALENDAR_FIELDS) for booking in fast],
+        )
+
+    def test_event_carries_the_fingerprint(self):
+        booking = Booking.model_validate(self.item)
+        private = booking_to_event(booking)["extendedProperties"]["private"]
+        self.assertEqual(private["data_hash"], fingerprint(booking, CALENDAR_FIELDS))
+
+    def test_missing_fields_hash_as_null(self):
+        del self.item["driver"]["data"]
+        self.assertEqual(len(fingerprint(self.item, DASHBOARD_FIELDS)), 32)
+
+
+class FingerprintsTest(unittest.TestCase):
+    def test_memoised_per_booking_and_version(self):
+        fingerprints = Fingerprints(CALENDAR_FIELDS)
+        item = synthetic(1, drivers=1)["items"][0]
+        first = fingerprints.of(item, "v1")
+        item["driver"]["data"]["name"] = "Someone Else"
+        self.assertEqual(fingerprints.of(item, "v1"), first)
+        second = fingerprints.of(item, "v2")
+        self.assertNotEqual(second, first)
+        self.assertEqual(fingerprints.of(item), second)
+        self.assertEqual(len(fingerprints.memo), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
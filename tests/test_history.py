@@ -0,0 +1,94 @@
+import copy
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from src.dashboard import build_dashboard
+from src.history import BookingHistory
+from tests.sample_data import synthetic
+
+NOW = datetime(2026, 6, 28, 15, 0, tzinfo=ZoneInfo("Europe/London"))
+
+
+def fetches():
+    """Four exports: one cancellation, one removal, one unchanged fetch."""
+    first = synthetic(30, drivers=5)
+    first["fetchedAt"] = "2026-06-01T08:00:00Z"
+    second = copy.deepcopy(first)
+    second["fetchedAt"] = "2026-06-02T08:00:00Z"
+    second["items"][3]["status"] = "cancelled"
+    third = copy.deepcopy(second)
+    third["fetchedAt"] = "2026-06-03T08:00:00Z"
+    del third["items"][5]
+    fourth = copy.deepcopy(third)
+    fourth["fetchedAt"] = "2026-06-04T08:00:00Z"
+    for payload in (second, third, fourth):
+        payload["total"] = len(payload["items"])
+    return [first, second, third, fourth]
+
+
+def by_id(payload):
+    return {**payload, "items": sorted(payload["items"], key=lambda item: item["id"])}
+
+
+class BookingHistoryTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        self.history = fetches()
+        archive = BookingHistory(self.root)
+        for number, payload in enumerate(self.history):
+            self.assertTrue(archive.add(f"bookings_{number}.json", payload))
+        archive.save()
+
+    def test_point_in_time_exports(self):
+        archive = BookingHistory(self.root)
+        for payload in self.history:
+            at = datetime.fromisoformat(payload["fetchedAt"])
+            self.assertEqual(by_id(archive.export(at)), by_id(payload))
+            self.assertEqual(by_id(archive.export(at.replace(hour=20))), by_id(payload))
+        with self.assertRaises(LookupError):
+            archive.export(datetime.fromisoformat("2026-05-31T00:00:00Z"))
+
+        past = datetime.fromisoformat("2026-06-02T12:00:00Z")
+        self.assertEqual(len(archive.response(past).items), 30)
+        self.assertEqual(
+            build_dashboard(json.dumps(archive.export(past)), now=NOW),
+            build_dashboard(json.dumps(self.history[1]), now=NOW),
+        )
+
+    def test_booking_lifecycle(self):
+        archive = BookingHistory(self.root)
+        cancelled = self.history[0]["items"][3]["id"]
+        removed = self.history[0]["items"][5]["id"]
+        self.assertEqual(
+            [
+                (version.fetched_at.day, version.booking.status)
+                for version in archive.lifecycle(cancelled)
+            ],
+            [(1, self.history[0]["items"][3]["status"]), (2, "cancelled")],
+        )
+        self.assertEqual(
+            [
+                (version.fetched_at.day, version.booking and version.booking.id)
+                for version in archive.lifecycle(removed)
+            ],
+            [(1, removed), (3, None)],
+        )
+
+    def test_versions_are_stored_once_and_sources_added_once(self):
+        archive = BookingHistory(self.root)
+        self.assertFalse(archive.add("bookings_3.json", self.history[3]))
+        self.assertEqual(len(archive.offsets), 31)
+        lines = (self.root / "versions.jsonl").read_bytes().splitlines()
+        self.assertEqual(len(lines), 31)
+        with self.assertRaises(ValueError):
+            archive.add("late.json", self.history[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from datetime import date, datetime, time, timedelta
+
+from src.occupancy import LONDON, daily_seconds, wall_seconds
+
+
+def reference(pairs: list[tuple[datetime, datetime]]) -> tuple[date, list[float]]:
+    pairs = [(start.astimezone(LONDON), end.astimezone(LONDON)) for start, end in pairs]
+    first = min(start.date() for start, _ in pairs)
+    last = max(end.date() for _, end in pairs)
+    minutes = []
+    day = first
+    while day <= last:
+        day_start = datetime.combine(day, time.min, LONDON)
+        day_end = day_start + timedelta(days=1)
+        overlaps = sorted(
+            (max(start, day_start), min(end, day_end))
+            for start, end in pairs
+            if max(start, day_start) < min(end, day_end)
+        )
+        merged: list[list[datetime]] = []
+        for start, end in overlaps:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        minutes.append(
+            min(1440, sum((end - start).total_seconds() / 60 for start, end in merged))
+        )
+        day += timedelta(days=1)
+    return first, minutes
+
+
+def utc(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+class DailySecondsTest(unittest.TestCase):
+    def assertMatchesReference(self, pairs):
+        first, seconds = daily_seconds(
+            (wall_seconds(start), wall_seconds(end)) for start, end in pairs
+        )
+        self.assertEqual((first, [value / 60 for value in seconds]), reference(pairs))
+
+    def test_overlapping_and_multi_day_stays(self):
+        self.assertMatchesReference(
+            [
+                (utc("2026-02-20T09:00:00+00:00"), utc("2026-02-20T12:00:00+00:00")),
+                (utc("2026-02-20T11:00:00+00:00"), utc("2026-02-20T15:30:00+00:00")),
+                (utc("2026-02-21T22:00:00+00:00"), utc("2026-02-25T07:15:00+00:00")),
+                (utc("2026-02-23T10:00:00+00:00"), utc("2026-02-23T11:00:00+00:00")),
+                (utc("2026-03-01T10:00:00+00:00"), utc("2026-03-02T00:00:00+00:00")),
+            ]
+        )
+
+    def test_clock_changes(self):
+        self.assertMatchesReference(
+            [
+                (utc("2026-03-28T20:00:00+00:00"), utc("2026-03-29T03:00:00+00:00")),
+                (utc("2026-03-29T00:30:00+00:00"), utc("2026-03-29T01:30:00+00:00")),
+                (utc("2026-10-24T22:00:00+00:00"), utc("2026-10-25T02:00:00+00:00")),
+                (utc("2026-10-25T00:15:00+00:00"), utc("2026-10-25T00:45:00+00:00")),
+            ]
+        )
+
+    def test_empty_and_reversed_intervals_still_extend_the_range(self):
+        self.assertMatchesReference(
+            [
+                (utc("2026-05-01T10:00:00+00:00"), utc("2026-05-01T10:00:00+00:00")),
+                (utc("2026-05-04T10:00:00+00:00"), utc("2026-05-03T10:00:00+00:00")),
+            ]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import copy
+import json
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src import patch
+from src.dashboard import build_dashboard
+from tests.sample_data import synthetic
+
+NOW = datetime(2026, 6, 28, 15, 0, tzinfo=ZoneInfo("Europe/London"))
+
+
+def build(data, now=NOW):
+    return build_dashboard(json.dumps(data), now=now)
+
+
+def round_trip(previous, current):
+    """The serialised patch between two builds, as a client would receive it."""
+    body = patch.diff(
+        previous, current, patch.etag(b"previous"), patch.etag(b"current")
+    )
+    return json.loads(json.dumps(body))
+
+
+class PatchTest(unittest.TestCase):
+    def setUp(self):
+        self.data = synthetic(300, drivers=10)
+        self.previous = build(self.data)
+
+    def assertPatches(self, current):
+        body = round_trip(self.previous, current)
+        kept = copy.deepcopy(self.previous)
+        self.assertEqual(patch.apply(self.previous, body), current)
+        self.assertEqual(self.previous, kept)
+        return body
+
+    def test_new_cancelled_and_removed_bookings(self):
+        later = copy.deepcopy(self.data)
+        later["items"][4]["status"] = "cancelled"
+        later["items"][9]["driver"]["data"]["name"] = "Renamed Driver"
+        del later["items"][20]
+        added = copy.deepcopy(later["items"][0])
+        added["id"] = 10_000
+        later["items"].append(added)
+        body = self.assertPatches(build(later, NOW.replace(hour=16)))
+
+        rows = {
+            tuple(operation["path"]): operation
+            for operation in body["operations"]
+            if operation["op"] == "rows"
+        }
+        bookings = rows[("bookings",)]
+        self.assertEqual(
+            {row["id"] for row in bookings["upsert"]},
+            {10_000, later["items"][4]["id"], later["items"][9]["id"]},
+        )
+        self.assertEqual(bookings["remove"], [self.data["items"][20]["id"]])
+        self.assertIn(("drivers",), rows)
+        self.assertLess(len(json.dumps(body)), len(json.dumps(self.previous)) / 2)
+
+    def test_reordered_and_unkeyed_values(self):
+        current = copy.deepcopy(self.previous)
+        current["vehicles"].reverse()
+        current["occupancy"]["windows"] = [7, 30]
+        del current["driverHighlights"]["busiestHour"]
+        current["bookingMonths"] = [{"month": "2026-06", "count": 1}]
+        body = self.assertPatches(current)
+        vehicles = next(
+            operation
+            for operation in body["operations"]
+            if operation["path"] == ["vehicles"]
+        )
+        self.assertEqual(vehicles["order"], [row["id"] for row in current["vehicles"]])
+        self.assertNotIn("upsert", vehicles)
+
+    def test_unchanged_build(self):
+        body = self.assertPatches(copy.deepcopy(self.previous))
+        self.assertEqual(body["operations"], [])
+        self.assertEqual(body["from"], patch.etag(b"previous"))
+
+    def test_rejects_other_versions(self):
+        with self.assertRaises(ValueError):
+            patch.apply(self.previous, {"schemaVersion": 2, "operations": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
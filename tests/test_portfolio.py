@@ -0,0 +1,69 @@
+import json
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src.dashboard import build_dashboard
+from src.portfolio import build_portfolio, partition
+from tests.sample_data import synthetic
+
+NOW = datetime(2026, 6, 28, 15, 0, tzinfo=ZoneInfo("Europe/London"))
+
+
+def spread(data, listings, owners):
+    for number, item in enumerate(data["items"]):
+        item["listing_id"] = 100 + number % listings
+        item["owner_id"] = number % owners
+    return json.dumps(data)
+
+
+class PortfolioTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        data = synthetic(600, drivers=20)
+        # One driver whose only bookings were cancelled, on one listing
+        for item in data["items"][:2]:
+            item["driver_id"] = item["vehicle_id"] = 999
+            item["driver"]["data"] = {**item["driver"]["data"], "id": 999}
+            item["vehicle"]["data"] = {**item["vehicle"]["data"], "id": 999}
+            item["status"] = "cancelled"
+        cls.raw = spread(data, listings=3, owners=2)
+        cls.rollup, cls.dashboards = build_portfolio(
+            cls.raw, "listing", now=NOW, workers=2
+        )
+
+    def test_parts_match_serial_builds(self):
+        parts = partition(self.raw, "listing")
+        self.assertEqual(list(parts), [100, 101, 102])
+        self.assertEqual(sum(json.loads(part)["total"] for part in parts.values()), 600)
+        self.assertEqual(
+            self.dashboards,
+            {key: build_dashboard(part, now=NOW) for key, part in parts.items()},
+        )
+
+    def test_rollup_matches_whole_export(self):
+        whole = build_dashboard(self.raw, now=NOW)
+        self.assertEqual(self.rollup["summary"], whole["summary"])
+        self.assertIn(999, {driver["id"] for driver in whole["drivers"]})
+        earnings = self.rollup["earnings"]
+        self.assertAlmostEqual(earnings["total"], whole["earnings"]["total"])
+        self.assertAlmostEqual(earnings["taxYear"], whole["earnings"]["taxYear"])
+        self.assertEqual(earnings["bookings"], whole["earnings"]["bookings"])
+        for period, points in whole["earnings"]["periods"].items():
+            self.assertEqual(
+                [point["date"] for point in earnings["periods"][period]],
+                [point["date"] for point in points],
+            )
+            for merged, point in zip(earnings["periods"][period], points):
+                self.assertAlmostEqual(merged["value"], point["value"])
+        self.assertEqual([part["id"] for part in self.rollup["parts"]], [100, 101, 102])
+
+    def test_by_owner(self):
+        rollup, dashboards = build_portfolio(self.raw, "owner", now=NOW, workers=1)
+        self.assertEqual(list(dashboards), [0, 1])
+        self.assertEqual(rollup["partition"], "owner")
+        self.assertEqual(rollup["summary"], self.rollup["summary"])
+
+
+if __name__ == "__main__":
+    unittest.main()
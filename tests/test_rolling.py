@@ -0,0 +1,28 @@
+import random
+import unittest
+from statistics import mean
+
+from src.rolling import rolling_means
+
+
+class RollingMeansTest(unittest.TestCase):
+    def test_matches_slice_means_for_any_window(self):
+        rng = random.Random(7)
+        values = [rng.randrange(0, 86400) for _ in range(400)]
+        windows = (1, 7, 30, 180, 365, 500)
+        means = rolling_means(values, windows, scale=86400)
+        for window in windows:
+            self.assertEqual(len(means[window]), len(values))
+            for index, value in enumerate(means[window]):
+                if index + 1 < window:
+                    self.assertIsNone(value)
+                else:
+                    expected = mean(values[index - window + 1 : index + 1]) / 86400
+                    self.assertAlmostEqual(value, expected, places=12)
+
+    def test_empty_series(self):
+        self.assertEqual(rolling_means([], (7,)), {7: []})
+
+
+if __name__ == "__main__":
+    unittest.main()
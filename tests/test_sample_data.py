@@ -0,0 +1,51 @@
+import unittest
+from datetime import datetime, timedelta
+
+from tests.sample_data import LONDON, synthetic
+
+
+def stays(data):
+    return [
+        (
+            datetime.fromisoformat(item["start_date"]),
+            datetime.fromisoformat(item["end_date"]),
+            item["status"],
+        )
+        for item in data["items"]
+    ]
+
+
+class SyntheticTest(unittest.TestCase):
+    def test_defaults_are_reproducible(self):
+        self.assertEqual(synthetic(50, seed=3), synthetic(50, seed=3))
+        self.assertNotEqual(synthetic(50, seed=3), synthetic(50, seed=4))
+
+    def test_options(self):
+        data = synthetic(
+            2000, drivers=40, cancelled=0.5, multi_day=0.2, dst=0.1, zone=LONDON
+        )
+        rows = stays(data)
+        self.assertEqual(len({item["driver_id"] for item in data["items"]}), 40)
+        self.assertAlmostEqual(
+            sum(status == "cancelled" for _, _, status in rows) / len(rows),
+            0.5,
+            delta=0.05,
+        )
+        longest = max(end - start for start, end, _ in stays(synthetic(2000)))
+        self.assertLess(longest, timedelta(days=2))
+        multi_day = sum(end - start > timedelta(days=2) for start, end, _ in rows)
+        self.assertGreater(multi_day / len(rows), 0.1)
+        crossing = sum(start.utcoffset() != end.utcoffset() for start, end, _ in rows)
+        self.assertGreater(crossing / len(rows), 0.08)
+        self.assertTrue(all(start < end for start, end, _ in rows))
+
+    def test_density_spreads_starts(self):
+        def span(data):
+            starts = [start for start, _, _ in stays(data)]
+            return max(starts) - min(starts)
+
+        self.assertLess(span(synthetic(500, density=4)), span(synthetic(500)) / 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
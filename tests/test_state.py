@@ -0,0 +1,67 @@
+import copy
+import io
+import json
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src.dashboard import build_dashboard, build_dashboard_incremental
+from src.state import Changes, DashboardState
+from tests.sample_data import synthetic
+
+NOW = datetime(2026, 6, 28, 15, 0, tzinfo=ZoneInfo("Europe/London"))
+
+
+def source(data: dict) -> io.BytesIO:
+    return io.BytesIO(json.dumps(data).encode())
+
+
+class IncrementalDashboardTest(unittest.TestCase):
+    def test_incremental_matches_full_rebuild(self):
+        before = synthetic(400, drivers=15, seed=1)
+        after = copy.deepcopy(before)
+        after["items"][3]["driver"]["data"]["phone_number"] = "07999 999999"
+        after["items"][10]["status"] = "cancelled"
+        after["items"][20]["space_owner_earnings"]["data"]["pennies"] += 150
+        after["items"][20]["space_owner_earnings"]["data"]["value"] += 1.5
+        del after["items"][30]
+        after["items"].extend(synthetic(405, drivers=18, seed=2)["items"][400:])
+        after["total"] = len(after["items"])
+
+        state = DashboardState()
+        build_dashboard_incremental(source(before), state, now=NOW)
+        restored = DashboardState.loads(state.dumps())
+        dashboard, changes = build_dashboard_incremental(
+            source(after), restored, now=NOW
+        )
+
+        self.assertEqual(changes, Changes(added=5, changed=3, removed=1, unchanged=396))
+        self.assertEqual(dashboard, build_dashboard(json.dumps(after), now=NOW))
+
+    def test_unread_fields_do_not_count_as_changes(self):
+        before = synthetic(20, drivers=4, seed=3)
+        after = copy.deepcopy(before)
+        after["items"][0]["photos"] = ["https://example.com/drive.jpg"]
+        after["items"][1]["driver"]["data"]["first_name"] = "Renamed"
+
+        state = DashboardState()
+        build_dashboard_incremental(source(before), state, now=NOW)
+        _, changes = build_dashboard_incremental(source(after), state, now=NOW)
+        self.assertEqual(changes, Changes(added=0, changed=0, removed=0, unchanged=20))
+        _, changes = build_dashboard_incremental(source(after), state, now=NOW)
+        self.assertEqual(changes.unchanged, 20)
+
+    def test_empty_state_is_a_full_rebuild(self):
+        data = synthetic(50, drivers=5)
+        dashboard, changes = build_dashboard_incremental(
+            source(data), DashboardState(), now=NOW
+        )
+        self.assertEqual(changes, Changes(added=50, changed=0, removed=0, unchanged=0))
+        self.assertEqual(dashboard, build_dashboard(json.dumps(data), now=NOW))
+
+    def test_other_state_versions_are_ignored(self):
+        self.assertEqual(DashboardState.loads('{"version": 0}').records, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
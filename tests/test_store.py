@@ -0,0 +1,96 @@
+import copy
+import tempfile
+import unittest
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+from src.bookings.models import BookingResponse
+from src.dashboard import _drivers, _earnings, _vehicles
+from src.store import BookingStore
+from tests.sample_data import booking, payload, synthetic
+
+TODAY = date(2026, 6, 28)
+
+
+class BookingStoreTest(unittest.TestCase):
+    def assertMatchesSections(self, store, bookings):
+        active = [booking for booking in bookings if booking.status != "cancelled"]
+        self.assertEqual(store.earnings(TODAY), _earnings(active, TODAY))
+        self.assertEqual(store.drivers(), _drivers(bookings))
+        self.assertEqual(store.vehicles(), _vehicles(bookings))
+
+    def test_sample_data(self):
+        bookings = BookingResponse.model_validate(payload()).items
+        store = BookingStore()
+        self.addCleanup(store.close)
+        self.assertEqual(store.upsert(bookings), len(bookings))
+        self.assertMatchesSections(store, bookings)
+
+    def test_upserts_across_batches(self):
+        data = synthetic(500, drivers=15)
+        bookings = BookingResponse.model_validate(data).items
+        store = BookingStore()
+        self.addCleanup(store.close)
+        store.upsert(bookings, batch_size=64)
+        self.assertMatchesSections(store, bookings)
+
+        later = copy.deepcopy(data)
+        for item in later["items"][::7]:
+            item["status"] = "cancelled"
+        for item in later["items"][::11]:
+            item["space_owner_earnings"]["data"]["pennies"] += 150
+            item["driver"]["data"]["name"] = "Renamed Driver"
+        updated = BookingResponse.model_validate(later).items
+        store.upsert(updated[::-1], batch_size=64)
+        self.assertMatchesSections(store, updated[::-1])
+        count = store.connection.execute("SELECT count(*) FROM bookings").fetchone()
+        self.assertEqual(count, (500,))
+
+    def test_re_registered_vehicles_and_tied_drivers(self):
+        start = datetime(2026, 6, 1, 9, tzinfo=UTC)
+        items = [
+            booking(
+                number,
+                start + timedelta(days=number),
+                start + timedelta(days=number, hours=2),
+                driver_id,
+                "Same Name",
+                "same@example.com",
+                None,
+                f"REG{number}",
+                "Ford",
+                "Focus",
+                10.0,
+            )
+            for number, driver_id in enumerate((9, 8, 7, 9, 8, 7), 1)
+        ]
+        bookings = BookingResponse.model_validate(
+            {"fetchedAt": "2026-06-28T13:18:00Z", "total": 6, "items": items}
+        ).items
+        store = BookingStore()
+        self.addCleanup(store.close)
+        store.upsert(bookings, batch_size=4)
+        self.assertMatchesSections(store, bookings)
+        drivers = store.drivers()
+        self.assertEqual([driver["id"] for driver in drivers], [9, 8, 7])
+        self.assertEqual(drivers[0]["vehicles"], ["REG1", "REG4"])
+
+    def test_empty_store(self):
+        store = BookingStore()
+        self.addCleanup(store.close)
+        self.assertMatchesSections(store, [])
+
+    def test_other_schema_versions_start_empty(self):
+        path = Path(self.enterContext(tempfile.TemporaryDirectory()), "bookings.db")
+        store = BookingStore(path)
+        store.upsert(BookingResponse.model_validate(payload()).items)
+        store.connection.execute("PRAGMA user_version = 1")
+        store.close()
+        store = BookingStore(path)
+        self.addCleanup(store.close)
+        count = store.connection.execute("SELECT count(*) FROM bookings").fetchone()
+        self.assertEqual(count, (0,))
+
+
+if __name__ == "__main__":
+    unittest.main()
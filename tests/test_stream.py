@@ -0,0 +1,41 @@
+import io
+import json
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src.bookings.stream import BookingStream
+from src.dashboard import build_dashboard, build_dashboard_stream
+from tests.sample_data import payload, synthetic
+
+NOW = datetime(2026, 6, 28, 15, 0, tzinfo=ZoneInfo("Europe/London"))
+
+
+class BookingStreamTest(unittest.TestCase):
+    def test_small_chunks_and_any_field_order(self):
+        data = payload()
+        raw = json.dumps(
+            {"items": data["items"], "total": 22, "fetchedAt": data["fetchedAt"]},
+            indent=2,
+        ).encode()
+        for chunk_size in (1, 13, 4096):
+            stream = BookingStream(io.BytesIO(raw), mode="full", chunk_size=chunk_size)
+            self.assertEqual([booking.id for booking in stream], list(range(100, 122)))
+            self.assertEqual(stream.total, 22)
+            self.assertEqual(stream.fetchedAt.isoformat(), "2026-06-28T13:18:00+00:00")
+
+    def test_dashboard_matches_in_memory_build(self):
+        raw = json.dumps(synthetic(300, drivers=12)).encode()
+        self.assertEqual(
+            build_dashboard_stream(io.BytesIO(raw), now=NOW),
+            build_dashboard(raw, now=NOW),
+        )
+
+    def test_truncated_export(self):
+        raw = json.dumps(payload()).encode()
+        with self.assertRaises(ValueError):
+            list(BookingStream(io.BytesIO(raw[:-200])))
+
+
+if __name__ == "__main__":
+    unittest.main()
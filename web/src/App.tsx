@@ -1,9 +1,10 @@
-import { useEffect, useState } from "react";
+import { useCallback, useEffect, useMemo, useRef, useState } from "react";
 import { BarChart3, CalendarDays, Camera, CarFront, Database, Monitor, Moon, RefreshCw, Sun, UsersRound } from "lucide-react";
 import { Bookings, Drivers, Earnings, Occupancy, RawData } from "./views";
 import { Observations } from "./ObservationTimeline";
 import { relative } from "./format";
-import type { Dashboard } from "./types";
+import { bookingRows } from "./columnar";
+import type { Booking, BookingColumns, BookingHistory, BookingMonth, Dashboard } from "./types";
 
 const views = {
   bookings: { label: "Bookings", icon: CalendarDays, component: Bookings },
@@ -16,27 +17,119 @@ const views = {
 type View = keyof typeof views;
 type Theme = "system" | "light" | "dark";
 
+function json<T>(response: Response): Promise<T> {
+  return response.ok ? response.json() : Promise.reject(new Error(`Data request failed (${response.status})`));
+}
+
+function bookingsEndpoint(month: string) {
+  if (import.meta.env.DEV) return `${import.meta.env.BASE_URL}bookings/${month}.json`;
+  return `${import.meta.env.BASE_URL}api/bookings?month=${encodeURIComponent(month)}`;
+}
+
+type Freshness = Pick<Dashboard, "fetchedAt" | "generatedAt">;
+type Payload = Omit<Dashboard, "bookings"> & { bookings?: Dashboard["bookings"] | BookingColumns };
+type Index = Omit<Dashboard, "bookings">;
+type Shards = Map<string, Booking[]>;
+
+// Booking months fetched with the dashboard: this London month, the ones before it up to RECENT_MONTHS, and any later ones.
+const RECENT_MONTHS = 3;
+const londonMonth = new Intl.DateTimeFormat("en-CA", { timeZone: "Europe/London", year: "numeric", month: "2-digit" });
+
+function recentMonths(months: string[], now = new Date()) {
+  const [year, month] = londonMonth.format(now).split("-").map(Number);
+  const cutoff = new Date(Date.UTC(year, month - RECENT_MONTHS, 1)).toISOString().slice(0, 7);
+  const recent = months.filter((listed) => listed >= cutoff);
+  return recent.length ? recent : months.slice(-1);
+}
+
+// A shard from another build than the loaded index, whose rows would refer to the wrong drivers and vehicles.
+class StaleIndex extends Error {}
+
+async function fetchMonth(month: string, index: Index): Promise<Booking[]> {
+  const shard = await fetch(bookingsEndpoint(month), { cache: "no-store" }).then((response) => json<BookingMonth>(response));
+  if (shard.tablesVersion !== index.tablesVersion) throw new StaleIndex(`Bookings for ${month} are from another build`);
+  return bookingRows(shard.bookings, index);
+}
+
+// A sharded dashboard lists its booking months; fetch the recent ones in parallel and leave the rest for
+// when a view asks for them. An unsharded dashboard keeps its rows under "". Schema 3 dashboards and
+// schema 2 shards store the rows by column.
+async function withBookings(payload: Payload): Promise<[Index, Shards]> {
+  const { bookings, ...index } = payload;
+  if (!payload.bookingMonths) return [{ ...index, schemaVersion: 2 }, new Map([["", bookingRows(bookings ?? [], index)]])];
+  const months = recentMonths(payload.bookingMonths.map(({ month }) => month));
+  const rows = await Promise.all(months.map((month) => fetchMonth(month, index)));
+  return [{ ...index, schemaVersion: 2 }, new Map(months.map((month, position) => [month, rows[position]] as const))];
+}
+
+// Rewritten on every build, unlike the dashboard, which is only uploaded when its content changes.
+function fetchFreshness(): Promise<Freshness | undefined> {
+  const endpoint = import.meta.env.DEV ? "meta.json" : "api/meta";
+  return fetch(`${import.meta.env.BASE_URL}${endpoint}`, { cache: "no-store" })
+    .then((response) => json<Freshness>(response))
+    .catch(() => undefined);
+}
+
 function initialView(): View {
   const hash = location.hash.slice(1);
   return hash in views ? hash as View : "bookings";
 }
 
 export default function App() {
-  const [data, setData] = useState<Dashboard>();
+  const [index, setIndex] = useState<Index>();
+  const [shards, setShards] = useState<Shards>(() => new Map());
+  const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
+  const [freshness, setFreshness] = useState<Freshness>();
   const [view, setView] = useState<View>(initialView);
   const [theme, setTheme] = useState<Theme>(() => (localStorage.getItem("theme") as Theme) || "system");
   const [, tick] = useState(0);
+  const loaded = useRef(shards);
+  const fetching = useRef(new Set<string>());
+  const generation = useRef(0);
+  loaded.current = shards;
 
-  const load = () => {
+  // The dashboard is refetched once if a shard turns out to be from a newer build, as while one is being published.
+  const load = (retries = 1) => {
     setError("");
+    generation.current += 1;
+    fetchFreshness().then(setFreshness);
     const endpoint = import.meta.env.DEV ? "dashboard.json" : "api/dashboard";
     fetch(`${import.meta.env.BASE_URL}${endpoint}`, { cache: "no-store" })
-      .then((response) => response.ok ? response.json() : Promise.reject(new Error(`Data request failed (${response.status})`)))
-      .then((payload: Dashboard) => payload.schemaVersion === 2 ? setData(payload) : Promise.reject(new Error("Unsupported dashboard data")))
-      .catch((reason) => setError(reason.message));
+      .then((response) => json<Payload>(response))
+      .then((payload) => [2, 3].includes(payload.schemaVersion) ? withBookings(payload) : Promise.reject(new Error("Unsupported dashboard data")))
+      .then(([nextIndex, nextShards]) => { setShards(nextShards); setIndex(nextIndex); })
+      .catch((reason) => reason instanceof StaleIndex && retries > 0 ? load(retries - 1) : setError(reason.message));
   };
 
+  const listed = useMemo(() => index?.bookingMonths?.map(({ month }) => month) ?? [], [index]);
+  // A month that fails to load stays pending, so the views offer it again. One built against a newer index
+  // reloads the dashboard, and with it the months already loaded.
+  const loadMonths = useCallback((months?: string[]) => {
+    if (!index) return;
+    const missing = (months ?? listed).filter((month) => listed.includes(month) && !loaded.current.has(month) && !fetching.current.has(month));
+    if (!missing.length) return;
+    const current = generation.current;
+    missing.forEach((month) => fetching.current.add(month));
+    setLoading(true);
+    Promise.all(missing.map((month) => fetchMonth(month, index)))
+      .then((rows) => {
+        if (current !== generation.current) return;
+        setShards((previous) => new Map([...previous, ...missing.map((month, position) => [month, rows[position]] as const)]));
+      })
+      .catch((reason) => { if (reason instanceof StaleIndex && current === generation.current) load(); })
+      .finally(() => {
+        missing.forEach((month) => fetching.current.delete(month));
+        setLoading(fetching.current.size > 0);
+      });
+  }, [index, listed]);
+
+  const data = useMemo<Dashboard | undefined>(() => index && {
+    ...index,
+    bookings: index.bookingMonths ? index.bookingMonths.flatMap(({ month }) => shards.get(month) ?? []) : shards.get("") ?? [],
+  }, [index, shards]);
+  const history: BookingHistory = { pending: listed.filter((month) => !shards.has(month)), loading, load: loadMonths };
+
   useEffect(load, []);
   useEffect(() => { const timer = setInterval(() => tick((value) => value + 1), 60_000); return () => clearInterval(timer); }, []);
   useEffect(() => {
@@ -61,16 +154,16 @@ export default function App() {
     return () => removeEventListener("hashchange", onHashChange);
   }, []);
 
-  if (!data) return <main className="centre-state"><div className="brand-mark">JP</div>{error ? <><h1>Couldn’t load the dashboard</h1><p>{error}</p><button onClick={load}>Try again</button></> : <><div className="loader" /><p>Preparing your space…</p></>}</main>;
+  if (!data) return <main className="centre-state"><div className="brand-mark">JP</div>{error ? <><h1>Couldn’t load the dashboard</h1><p>{error}</p><button onClick={() => load()}>Try again</button></> : <><div className="loader" /><p>Preparing your space…</p></>}</main>;
 
   const Page = views[view].component;
   return <div className="shell">
     <header className="topbar">
       <a className="brand" href="#bookings"><span className="brand-mark">JP</span><span>JustPark Earnings<small>Private dashboard</small></span></a>
-      <div className="topbar-actions"><ThemePicker value={theme} onChange={setTheme} /><div className="freshness"><span /><div><strong>Data updated {relative(data.fetchedAt)}</strong><small>{data.summary.bookings} bookings · {data.summary.drivers} drivers</small></div><button className="icon-button" onClick={load} aria-label="Refresh"><RefreshCw size={17} /></button></div></div>
+      <div className="topbar-actions"><ThemePicker value={theme} onChange={setTheme} /><div className="freshness"><span /><div><strong>Data updated {relative(freshness?.fetchedAt ?? data.fetchedAt)}</strong><small>{data.summary.bookings} bookings · {data.summary.drivers} drivers</small></div><button className="icon-button" onClick={() => load()} aria-label="Refresh"><RefreshCw size={17} /></button></div></div>
     </header>
     <nav>{Object.entries(views).map(([key, item]) => <button key={key} className={view === key ? "active" : ""} onClick={() => { setView(key as View); location.hash = key; scrollTo({ top: 0, behavior: "smooth" }); }}><item.icon size={18} /><span>{item.label}</span></button>)}</nav>
-    <main><Page data={data} /></main>
+    <main><Page data={data} history={history} /></main>
     <footer>Private dashboard · Europe/London</footer>
   </div>;
 }
@@ -1,6 +1,6 @@
 import { Fragment, useEffect, useLayoutEffect, useMemo, useRef, useState, type CSSProperties } from "react";
 import { Drawer } from "./components";
-import type { Booking, Dashboard, Observation, ObservationMonth } from "./types";
+import type { Booking, Observation, ObservationMonth, PageProps } from "./types";
 
 const LONDON = "Europe/London";
 const LOAD_DAYS = 14;
@@ -62,7 +62,7 @@ function inBooking(observation: Observation, booking: Booking) {
   return Date.parse(booking.start) <= time && time < Date.parse(booking.end);
 }
 
-export function Observations({ data }: { data: Dashboard }) {
+export function Observations({ data, history }: PageProps) {
   const today = useMemo(() => londonParts(new Date()).key, []);
   const [days, setDays] = useState(() => datesBetween(addDays(today, -INITIAL_PAST_DAYS), addDays(today, WINDOW_DAYS - INITIAL_PAST_DAYS - 1)));
   const [months, setMonths] = useState<Map<string, ObservationMonth>>(() => new Map());
@@ -78,6 +78,7 @@ export function Observations({ data }: { data: Dashboard }) {
 
   useEffect(() => {
     const needed = [...new Set([...days, tableDay].map((day) => day.slice(0, 7)))];
+    history.load(needed);
     needed.forEach((month) => {
       if (months.has(month) || fetching.current.has(month)) return;
       fetching.current.add(month);
@@ -94,7 +95,7 @@ export function Observations({ data }: { data: Dashboard }) {
         .catch(() => setMonths((current) => new Map(current).set(month, { schemaVersion: 1, month, generatedAt: new Date().toISOString(), observations: [] })))
         .finally(() => fetching.current.delete(month));
     });
-  }, [days, months, tableDay]);
+  }, [days, months, tableDay, history.load]);
 
   useLayoutEffect(() => {
     if (!positioned.current && scroller.current) {
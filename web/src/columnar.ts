@@ -0,0 +1,50 @@
+import type { Booking, BookingColumns, Dashboard } from "./types";
+
+const numberColumns = ["id", "earnings", "paid"] as const;
+const textColumns = ["status", "title", "bookingType"] as const;
+
+// The dashboard tables booking rows refer to; a shard's are those of its dashboard index.
+export type BookingTables = Pick<Dashboard, "drivers" | "vehicles">;
+
+function pad(value: number) {
+  return String(value).padStart(2, "0");
+}
+
+// Epoch seconds back to the ISO string they were reported as, e.g. 2026-03-29T02:30:00+01:00.
+function isoString(seconds: number, offset: number) {
+  const local = new Date((seconds + offset) * 1000).toISOString().slice(0, 19);
+  const minutes = Math.abs(offset) / 60;
+  return `${local}${offset < 0 ? "-" : "+"}${pad(Math.floor(minutes / 60))}:${pad(minutes % 60)}`;
+}
+
+// Rebuild the row objects of a schema 3 dashboard or schema 2 booking shard.
+export function decodeBookings(block: BookingColumns, { drivers, vehicles }: BookingTables): Booking[] {
+  const { columns, dictionaries } = block;
+  const rows = Array.from({ length: block.length }, (_, index) => {
+    const driver = drivers[columns.driverIndex[index]];
+    const vehicle = vehicles[columns.vehicleIndex[index]];
+    const row: Record<string, unknown> = {
+      start: isoString(columns.start[index], columns.startOffset[index]),
+      end: isoString(columns.end[index], columns.endOffset[index]),
+      driverId: driver.id,
+      driverName: driver.name,
+      driverEmail: driver.email,
+      driverPhone: driver.phone,
+      vehicleId: vehicle.id,
+      registration: vehicle.registration,
+      vehicle: [vehicle.make, vehicle.model].filter(Boolean).join(" "),
+      vehicleColour: vehicle.colour,
+    };
+    for (const column of numberColumns) row[column] = columns[column][index];
+    for (const column of textColumns) row[column] = dictionaries[column][columns[column][index]];
+    return row;
+  });
+  for (const [key, pairs] of Object.entries(block.overrides)) {
+    for (const [position, value] of pairs ?? []) rows[position][key] = value;
+  }
+  return rows as unknown as Booking[];
+}
+
+export function bookingRows(bookings: Booking[] | BookingColumns, tables: BookingTables): Booking[] {
+  return Array.isArray(bookings) ? bookings : decodeBookings(bookings, tables);
+}
@@ -1,5 +1,6 @@
 import type { ReactNode } from "react";
-import { Search, X } from "lucide-react";
+import { History, Search, X } from "lucide-react";
+import type { BookingHistory } from "./types";
 
 export function Metric({ label, value, note }: { label: string; value: ReactNode; note?: string }) {
   return (
@@ -37,6 +38,16 @@ export function Empty({ children }: { children: ReactNode }) {
   return <div className="empty">{children}</div>;
 }
 
+export function EarlierBookings({ history }: { history: BookingHistory }) {
+  if (!history.pending.length) return null;
+  return (
+    <button className="history-button" disabled={history.loading} onClick={() => history.load()}>
+      <History size={15} />
+      {history.loading ? "Loading earlier bookings…" : `Load ${history.pending.length} earlier ${history.pending.length === 1 ? "month" : "months"}`}
+    </button>
+  );
+}
+
 export function Drawer({ title, children, close }: { title: string; children: ReactNode; close: () => void }) {
   return (
     <div className="scrim" onMouseDown={close}>
@@ -68,12 +68,37 @@ export interface Vehicle {
 export type SeriesPoint = { date: string; value: number };
 export type RollingPoint = { date: string } & Record<string, number | string | null>;
 
+type NumberColumn = "id" | "earnings" | "paid" | "start" | "startOffset" | "end" | "endOffset" | "driverIndex" | "vehicleIndex";
+type TextColumn = "status" | "title" | "bookingType";
+
+// Booking rows stored by column (dashboard schema 3, booking shard schema 2); text columns index their
+// dictionary, driverIndex and vehicleIndex the dashboard's drivers and vehicles, and overrides hold the
+// [position, value] pairs of rows whose booking showed other details than the tables' latest ones.
+export interface BookingColumns {
+  length: number;
+  columns: Record<NumberColumn | TextColumn, number[]>;
+  dictionaries: Record<TextColumn, (string | null)[]>;
+  overrides: Partial<Record<keyof Booking, [number, string | number | null][]>>;
+}
+
+export interface BookingMonth {
+  schemaVersion: 1 | 2;
+  month: string;
+  generatedAt: string;
+  // Digest of the index tables that column-encoded rows refer to
+  tablesVersion?: string;
+  bookings: Booking[] | BookingColumns;
+}
+
 export interface Dashboard {
   schemaVersion: number;
   fetchedAt: string;
   generatedAt: string;
   summary: { bookings: number; cancelled: number; drivers: number };
   bookings: Booking[];
+  // Set on schema 3 documents, matching that of their booking shards
+  tablesVersion?: string;
+  bookingMonths?: { month: string; count: number }[];
   earnings: {
     total: number;
     taxYear: number;
@@ -96,4 +121,18 @@ export interface Dashboard {
     longestStay?: { driver: string; hours: number; date: string };
   };
   vehicles: Vehicle[];
+  // Decoding and section timings from --profile, taken before the dashboard is encoded
+  buildStats?: {
+    totalSeconds: number;
+    stages: Record<string, { seconds: number; peakBytes?: number }>;
+  };
 }
+
+// Booking months of a sharded dashboard not fetched yet; `load` fetches the given ones, or all of them.
+export interface BookingHistory {
+  pending: string[];
+  loading: boolean;
+  load: (months?: string[]) => void;
+}
+
+export type PageProps = { data: Dashboard; history: BookingHistory };
@@ -1,4 +1,4 @@
-import { useRef, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import FullCalendar from "@fullcalendar/react";
 import dayGridPlugin from "@fullcalendar/daygrid";
 import {
@@ -6,10 +6,10 @@ import {
   ResponsiveContainer, Tooltip, XAxis, YAxis,
 } from "recharts";
 import { CalendarDays, Clock3, Mail, Phone, Repeat2, Sparkles, UsersRound } from "lucide-react";
-import { DataTable, Drawer, Empty, Metric, SearchBox, Segmented, type Column } from "./components";
+import { DataTable, Drawer, EarlierBookings, Empty, Metric, SearchBox, Segmented, type Column } from "./components";
 import { ContinuousWeekCalendar } from "./ContinuousWeekCalendar";
 import { chartDate, dateTime, duration, money, percent, shortDate } from "./format";
-import type { Booking, Dashboard, Driver, OccupancySignal, Period, Vehicle } from "./types";
+import type { Booking, Driver, OccupancySignal, PageProps, Period, Vehicle } from "./types";
 
 const tooltip = { border: "1px solid var(--line)", borderRadius: 14, background: "var(--panel)", color: "var(--ink)", boxShadow: "var(--shadow)" };
 
@@ -19,7 +19,15 @@ function isSingleDay(start: string, end: string) {
   return first.getFullYear() === last.getFullYear() && first.getMonth() === last.getMonth() && first.getDate() === last.getDate();
 }
 
-export function Bookings({ data }: { data: Dashboard }) {
+function monthsShown(start: Date, end: Date) {
+  const months: string[] = [];
+  for (let day = new Date(start.getFullYear(), start.getMonth(), 1); day < end; day.setMonth(day.getMonth() + 1)) {
+    months.push(`${day.getFullYear()}-${String(day.getMonth() + 1).padStart(2, "0")}`);
+  }
+  return months;
+}
+
+export function Bookings({ data, history }: PageProps) {
   const monthCalendar = useRef<FullCalendar>(null);
   const [selected, setSelected] = useState<Booking>();
   const [query, setQuery] = useState("");
@@ -40,7 +48,7 @@ export function Bookings({ data }: { data: Dashboard }) {
 
   return <>
     <div className="panel calendar-panel">
-      <div className="calendar-options"><span>Bookings calendar</span><label className="check"><input type="checkbox" checked={cancelled} onChange={(e) => setCancelled(e.target.checked)} /> Show cancelled</label></div>
+      <div className="calendar-options"><span>Bookings calendar</span><div className="calendar-actions"><EarlierBookings history={history} /><label className="check"><input type="checkbox" checked={cancelled} onChange={(e) => setCancelled(e.target.checked)} /> Show cancelled</label></div></div>
       {calendarMode === "week" ? <ContinuousWeekCalendar bookings={rows} initialDate={calendarDate} onSelect={setSelected} onMonth={(date) => { setCalendarDate(date); setCalendarMode("month"); }} /> :
         <FullCalendar
           ref={monthCalendar}
@@ -62,6 +70,7 @@ export function Bookings({ data }: { data: Dashboard }) {
           headerToolbar={{ left: "prev,next today", center: "title", right: "continuousWeek,dayGridMonth" }}
           buttonText={{ week: "Week", month: "Month", today: "Today" }}
           events={monthEvents}
+          datesSet={({ start, end }) => history.load(monthsShown(start, end))}
           eventContent={({ event, timeText, view }) => view.type === "dayGridMonth" && event.extendedProps.singleDay
             ? <span className="calendar-registration">{event.extendedProps.registration}</span>
             : <><b>{timeText}</b> {event.title}</>}
@@ -101,7 +110,7 @@ function BookingDetail({ booking, close }: { booking: Booking; close: () => void
   </Drawer>;
 }
 
-export function Earnings({ data }: { data: Dashboard }) {
+export function Earnings({ data }: PageProps) {
   const [period, setPeriod] = useState<Period>("week");
   const series = data.earnings.periods[period];
   return <>
@@ -119,7 +128,7 @@ export function Earnings({ data }: { data: Dashboard }) {
   </>;
 }
 
-export function Occupancy({ data }: { data: Dashboard }) {
+export function Occupancy({ data }: PageProps) {
   const [signal, setSignal] = useState<OccupancySignal>("minutes");
   const [windows, setWindows] = useState([7, 30]);
   const colours = ["#2d6c5b", "#d99662", "#6b78a8", "#a65d71"];
@@ -141,11 +150,13 @@ export function Occupancy({ data }: { data: Dashboard }) {
   </>;
 }
 
-export function Drivers({ data }: { data: Dashboard }) {
+export function Drivers({ data, history }: PageProps) {
   const [selected, setSelected] = useState<Driver>();
   const [query, setQuery] = useState("");
   const rows = data.drivers.filter((driver) => `${driver.name} ${driver.email} ${driver.vehicles}`.toLowerCase().includes(query.toLowerCase()));
   const h = data.driverHighlights;
+  // A driver's history chart spans every month, so opening one fetches the rest.
+  useEffect(() => { if (selected) history.load(); }, [selected, history.load]);
   return <>
     <div className="highlights">
       <article className="highlight feature"><Repeat2 /><span>Repeat drivers</span><strong>{percent(h.repeatRate)}</strong><small>{percent(h.returningRevenueShare)} of revenue comes from them</small></article>
@@ -194,12 +205,12 @@ function driverHistory(bookings: Booking[]) {
   return [...months].sort(([a], [b]) => a.localeCompare(b)).map(([date, count]) => ({ date, bookings: count }));
 }
 
-export function RawData({ data }: { data: Dashboard }) {
+export function RawData({ data, history }: PageProps) {
   const [table, setTable] = useState<"bookings" | "drivers" | "vehicles">("bookings");
   const [query, setQuery] = useState("");
   const match = (row: object) => JSON.stringify(row).toLowerCase().includes(query.toLowerCase());
   return <>
-    <div className="panel"><div className="panel-title"><Segmented options={["bookings", "drivers", "vehicles"] as const} value={table} onChange={(value) => { setTable(value); setQuery(""); }} format={(v) => v[0].toUpperCase() + v.slice(1)} /><SearchBox value={query} onChange={setQuery} /></div>
+    <div className="panel"><div className="panel-title"><Segmented options={["bookings", "drivers", "vehicles"] as const} value={table} onChange={(value) => { setTable(value); setQuery(""); }} format={(v) => v[0].toUpperCase() + v.slice(1)} /><div className="calendar-actions">{table === "bookings" && <EarlierBookings history={history} />}<SearchBox value={query} onChange={setQuery} /></div></div>
       {table === "bookings" && <DataTable rows={data.bookings.filter(match)} columns={bookingColumns} />}
       {table === "drivers" && <DataTable rows={data.drivers.filter(match)} columns={driverColumns} />}
       {table === "vehicles" && <DataTable rows={data.vehicles.filter(match)} columns={vehicleColumns} />}